@@ -0,0 +1,199 @@
+##Purpose**: Dashboard KPIs computed in SQL so only small result frames leave the database
+
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from app.cache import cached
+from app.db import borrow
+from app.dtypes import domain_frame
+from app.rollups import rollup_counts
+from app.summary_tables import summary_table_for
+from app.timestamps import DATE_FORMAT, TIMESTAMP_FORMAT
+
+# Columns each table may be grouped by (table and column names are never taken from user input)
+GROUP_COLUMNS = {
+    "cyber_incidents": {"status", "severity", "category"},
+    "it_tickets": {"status", "priority", "assigned_to"},
+    "metadata": {"uploaded_by", "name"},
+}
+
+
+def _check_columns(table, columns):
+    allowed = GROUP_COLUMNS.get(table, set())
+    unknown = [column for column in columns if column not in allowed]
+    if unknown:
+        raise ValueError(f"Cannot group {table} by: {', '.join(unknown)}")
+
+
+def _day_bounds(day, fmt=TIMESTAMP_FORMAT):
+    """Start (inclusive) and end (exclusive) of a day as canonical strings."""
+    start = datetime(day.year, day.month, day.day)
+    return start.strftime(fmt), (start + timedelta(days=1)).strftime(fmt)
+
+
+def table_columns(conn, table):
+    """Column names of a table, read from the schema rather than from its rows."""
+    with borrow(conn) as conn:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def table_frame(conn, table, columns=None):
+    """Whole table (or the given columns) as a DataFrame with its declared dtypes (see app.dtypes)."""
+    with borrow(conn) as conn:
+        known = table_columns(conn, table)
+        columns = list(columns or known)
+        unknown = [column for column in columns if column not in known]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+        df = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {table}", conn)
+    return domain_frame(df, table)
+
+
+def counts_by(conn, table, columns):
+    """
+    Row counts grouped by one or more columns, largest first.
+
+    Groupings covered by a trigger-maintained summary table are read from it,
+    so the cost depends on the number of groups rather than rows.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        table: Table name
+        columns: Column name or list of column names (see GROUP_COLUMNS)
+
+    Returns:
+        DataFrame: the group columns plus a "count" column
+    """
+    if isinstance(columns, str):
+        columns = [columns]
+    _check_columns(table, columns)
+    group = ", ".join(columns)
+    summary_table = summary_table_for(table, columns)
+    if summary_table:
+        query = f"SELECT {group}, SUM(n) AS count FROM {summary_table} GROUP BY {group} ORDER BY count DESC"
+    else:
+        query = f"SELECT {group}, COUNT(*) AS count FROM {table} GROUP BY {group} ORDER BY count DESC"
+    with borrow(conn) as conn:
+        return pd.read_sql_query(query, conn)
+
+
+# Cyber incidents
+@cached("cyber_incidents")
+def incident_counts_by(conn, column):
+    """Incident counts per status, severity or category."""
+    return counts_by(conn, "cyber_incidents", column)
+
+
+@cached("cyber_incidents")
+def incident_summary(conn=None):
+    """
+    Total, open and closed incident counts.
+
+    Derived from one GROUP BY over the status index; "open" matches the
+    status case-insensitively, like the dashboard always has.
+    """
+    by_status = incident_counts_by(conn, "status")
+    total = int(by_status["count"].sum())
+    open_count = int(by_status.loc[by_status["status"].str.lower() == "open", "count"].sum())
+    return {"total": total, "open": open_count, "closed": total - open_count}
+
+
+@cached("cyber_incidents")
+def incident_volume(conn, grain="day", start=None, end=None, by=()):
+    """Incidents per hour/day/week in [start, end), optionally split by severity and/or category."""
+    return rollup_counts(conn, "cyber_incidents", grain, start, end, by)
+
+
+# IT tickets
+@cached("it_tickets")
+def ticket_counts_by(conn, column):
+    """Ticket counts per status, priority or assigned_to."""
+    return counts_by(conn, "it_tickets", column)
+
+
+@cached("it_tickets", per_day=True)
+def ticket_summary(conn=None, today=None):
+    """
+    Total tickets, summed resolution hours, open tickets and tickets created today.
+
+    The first three come from the ticket_counts summary table; "created today"
+    is a range scan on the created_at index.
+    """
+    start, end = _day_bounds(today or date.today())
+    with borrow(conn) as conn:
+        total, total_resolution, open_count = conn.execute(
+            """
+            SELECT COALESCE(SUM(n), 0),
+                   COALESCE(SUM(total_resolution_hours), 0),
+                   COALESCE(SUM(CASE WHEN status = 'Open' THEN n END), 0)
+            FROM ticket_counts
+            """
+        ).fetchone()
+        created_today = conn.execute(
+            "SELECT COUNT(*) FROM it_tickets WHERE created_at >= ? AND created_at < ?", (start, end)
+        ).fetchone()[0]
+    return {
+        "total": total,
+        "total_resolution_hours": total_resolution,
+        "open": open_count,
+        "created_today": created_today,
+    }
+
+
+@cached("it_tickets")
+def priority_status_counts(conn=None):
+    """Long-form (priority, status, count) frame for the priority x status crosstab."""
+    return counts_by(conn, "it_tickets", ["priority", "status"])
+
+
+@cached("it_tickets")
+def priority_status_percentages(conn=None):
+    """Percentage of each status within each priority (rows sum to 100)."""
+    counts = priority_status_counts(conn)
+    if counts.empty:
+        return pd.DataFrame()
+    table = counts.pivot_table(index="priority", columns="status", values="count", fill_value=0)
+    table.columns.name = "status"
+    return table.div(table.sum(axis=1), axis=0).mul(100).round(1)
+
+
+@cached("it_tickets")
+def daily_ticket_counts(conn=None):
+    """Tickets created per day, oldest first (read from the daily rollups)."""
+    df = rollup_counts(conn, "it_tickets", "day")
+    df = df.rename(columns={"bucket": "created_date", "count": "Ticket_Count"})
+    df["created_date"] = pd.to_datetime(df["created_date"], format=DATE_FORMAT).dt.date
+    return df
+
+
+@cached("it_tickets")
+def ticket_volume(conn, grain="day", start=None, end=None, by=()):
+    """Tickets created per hour/day/week in [start, end), optionally split by priority and/or status."""
+    return rollup_counts(conn, "it_tickets", grain, start, end, by)
+
+
+# Dataset metadata
+@cached("metadata")
+def metadata_counts_by(conn, column):
+    """Dataset counts per uploader or name."""
+    return counts_by(conn, "metadata", column)
+
+
+@cached("metadata", per_day=True)
+def metadata_summary(conn=None, today=None):
+    """Total datasets, total rows tracked and datasets uploaded today."""
+    today = (today or date.today()).strftime(DATE_FORMAT)
+    with borrow(conn) as conn:
+        total, total_rows = conn.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM metadata").fetchone()
+        uploaded_today = conn.execute("SELECT COUNT(*) FROM metadata WHERE upload_date = ?", (today,)).fetchone()[0]
+    return {"total": total, "total_rows": total_rows, "uploaded_today": uploaded_today}
+
+
+@cached("metadata")
+def dataset_columns_by_name(conn=None, limit=50):
+    """Name and column count of the widest datasets, for the column-count chart."""
+    with borrow(conn) as conn:
+        return pd.read_sql_query(
+            "SELECT name, columns FROM metadata ORDER BY columns DESC LIMIT ?", conn, params=(limit,)
+        )
@@ -0,0 +1,472 @@
+##Purpose**: Move old closed incidents and resolved tickets into an attached archive database
+#
+# Terminal-status rows older than ARCHIVE_AFTER_DAYS are copied to
+# <database>_archive.db and deleted from the live ("hot") tables in small
+# batches, so the pages, search and live frames only ever scan recent and
+# open work. The summary and rollup counters keep counting archived rows,
+# so KPIs and trend charts still cover the whole history. Row-level history
+# is read through the {table}_history views (hot UNION ALL archived).
+#
+# With ARCHIVE_PARTITION_GRAIN set (or --partitions), archived rows go to one
+# file per year or month instead (see app.db.PartitionRouter): history_frame()
+# then reads only the periods a time range needs, and each period's file can
+# be vacuumed or backed up on its own. Readers take the grain from the
+# partition files on disk, so they find the rows whichever grain was used.
+#
+# Archiving is opt-in: run the CLI below (e.g. from cron), or set
+# ARCHIVE_IN_BACKGROUND so ensure_schema starts an ArchiveScheduler. Lookups,
+# edits and deletes by ID (app.repository) see archived rows as read-only.
+#
+# Archive by hand, or look after the partition files:
+#     python -m app.archive [path/to/database.db] [--days 180] [--batch 500] [--partitions month]
+#     python -m app.archive [path/to/database.db] --list
+#     python -m app.archive [path/to/database.db] --vacuum 2024-03 --backup 2024-03 backups/
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from app.db import (ARCHIVE_SCHEMA, DB_PATH, PartitionRouter, borrow, connection, has_table, partition_grain_of,
+                    partitions_directory)
+from app.dtypes import domain_frame
+from app.rollups import ROLLUP_TABLES
+from app.rollups import count_rows_into as count_into_rollup
+from app.summary_tables import SUMMARY_TABLES
+from app.summary_tables import count_rows_into as count_into_summary
+from app.timestamps import TIMESTAMP_FORMAT
+
+# Archived table -> (key column, age column, terminal statuses)
+ARCHIVE_TABLES = {
+    "cyber_incidents": ("incident_id", "timestamp", ("Closed", "Resolved")),
+    "it_tickets": ("ticket_id", "created_at", ("Closed", "Resolved")),
+}
+
+# Terminal-status rows older than this many days are archived
+ARCHIVE_AFTER_DAYS = 180
+
+# Rows moved per transaction (about 60 ms of write lock per batch at 100k hot rows)
+ARCHIVE_BATCH_ROWS = 500
+
+# None keeps the archive in one file; "year" or "month" partitions it by the age column.
+# Once partition files exist their grain wins (see resolve_partition_grain).
+ARCHIVE_PARTITION_GRAIN = None
+
+# Let ensure_schema start a background archiver (off: archive with the CLI below)
+ARCHIVE_IN_BACKGROUND = False
+
+# How often the background archiver started by ensure_schema runs
+ARCHIVE_INTERVAL_SECONDS = 3600
+
+# Pause between batches, so writers queued on the lock get their turn
+ARCHIVE_PAUSE_SECONDS = 0.01
+
+
+def archive_path(database):
+    """Archive file kept next to a database file: <name>_archive.db."""
+    database = Path(database)
+    return database.with_name(f"{database.stem}_archive{database.suffix or '.db'}")
+
+
+def history_view(table):
+    """Name of the TEMP view over the hot and archived rows of `table`."""
+    return f"{table}_history"
+
+
+def _database_file(conn):
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def _open_read_only(path):
+    """Separate read-only connection to an archive or partition file."""
+    return sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+
+
+def resolve_partition_grain(database, requested=None):
+    """
+    Grain the archive of `database` is partitioned by (None = one archive file).
+
+    Partition files already on disk decide; `requested` only applies until
+    there are some. Archiving at another grain than the stored one is
+    refused, since readers would not find those files.
+    """
+    stored = partition_grain_of(database)
+    if stored and requested and requested != stored:
+        raise ValueError(f"The archive of {database} is partitioned by {stored}, not {requested}")
+    return stored or requested
+
+
+def _partition_router(database):
+    """PartitionRouter over the existing partition files of `database`, or None if it has none."""
+    if not partitions_directory(database).exists():
+        return None
+    # Only the undated partition so far: it is found at either grain
+    return PartitionRouter(database, partition_grain_of(database) or "month")
+
+
+def _attached(conn):
+    return any(row[1] == ARCHIVE_SCHEMA for row in conn.execute("PRAGMA database_list"))
+
+
+def _create_archive_tables(conn):
+    """Archive copies of the archived tables (same columns, in the same order) and their indexes."""
+    for table, (_, age_column, _) in ARCHIVE_TABLES.items():
+        if has_table(conn, table, ARCHIVE_SCHEMA):
+            continue
+        create_sql = conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        create_sql = re.sub(r'^CREATE TABLE\s+"?\w+"?', f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{table}",
+                            create_sql, count=1)
+        conn.execute(create_sql)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_{table}_{age_column} "
+                     f"ON {table}({age_column})")
+
+
+def _create_history_views(conn, attached):
+    """(Re)create the TEMP {table}_history views for the current attach state."""
+    # query_only (read-only pools) also blocks TEMP objects; the file itself stays read-only
+    query_only = conn.execute("PRAGMA query_only").fetchone()[0]
+    if query_only:
+        conn.execute("PRAGMA query_only = OFF")
+    try:
+        for table in ARCHIVE_TABLES:
+            select = f"SELECT * FROM main.{table}"
+            if attached:
+                select += f" UNION ALL SELECT * FROM {ARCHIVE_SCHEMA}.{table}"
+            conn.execute(f"DROP VIEW IF EXISTS temp.{history_view(table)}")
+            conn.execute(f"CREATE TEMP VIEW {history_view(table)} AS {select}")
+    finally:
+        if query_only:
+            conn.execute("PRAGMA query_only = ON")
+
+
+def attach_archive(conn, create=None):
+    """
+    Attach the database's archive (once per connection) and create the history views.
+
+    Args:
+        conn: Database connection outside any transaction (SQLite cannot
+            ATTACH inside one, and committing the caller's would end it early)
+        create: Create the archive file if it does not exist (defaults to
+            True for read-write connections)
+
+    Returns:
+        bool: Whether the archive is attached. Without one the history views
+        cover only the hot tables.
+    """
+    if _attached(conn):
+        return True
+    read_only = bool(conn.execute("PRAGMA query_only").fetchone()[0])
+    create = not read_only if create is None else create
+    path = archive_path(_database_file(conn))
+    if not path.exists() and not create:
+        _create_history_views(conn, attached=False)
+        return False
+
+    if conn.in_transaction:
+        raise RuntimeError("Cannot attach the archive inside an open transaction; commit or roll back first")
+    # Read-only pools open the database as a URI, so the archive is opened the same way
+    target = f"{path.resolve().as_uri()}?mode=ro" if read_only else str(path)
+    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (target,))
+    if not read_only:
+        conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.journal_mode = WAL")
+        conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.synchronous = NORMAL")
+        _create_archive_tables(conn)
+        conn.commit()
+    _create_history_views(conn, attached=True)
+    return True
+
+
+def _archive_file(conn):
+    """The archive file of the database `conn` is open on, or None if there is none yet."""
+    database = _database_file(conn)
+    path = archive_path(database) if database else None
+    return path if path and path.exists() else None
+
+
+def archive_files(conn):
+    """Existing archive and partition files of the database `conn` is open on (empty until anything is archived)."""
+    database = _database_file(conn)
+    if not database:
+        return []  # in-memory databases have no archive
+    router = _partition_router(database)
+    paths = [archive_path(database)] + ([router.path_for(key) for key in router.keys()] if router else [])
+    return [path for path in paths if path.exists()]
+
+
+def archived_row(conn, table, key_value, columns=None):
+    """
+    The archived row of `table` with primary key `key_value`, or None if it is not archived.
+
+    The archive (or partition) files are read through their own read-only
+    connection rather than attached, since ATTACH would commit a
+    transaction the caller has open on `conn`.
+    """
+    key = ARCHIVE_TABLES[table][0]
+    select = ", ".join(columns) if columns else "*"
+    for path in archive_files(conn):
+        with closing(_open_read_only(path)) as archive:
+            row = None
+            if has_table(archive, table):
+                row = archive.execute(f"SELECT {select} FROM {table} WHERE {key} = ?", (key_value,)).fetchone()
+        if row is not None:
+            return row
+    return None
+
+
+def drop_archived(conn, table, staging):
+    """
+    Delete the rows of a loader's staging table whose key is already archived.
+
+    Called by app.ingest and app.sync before each batch is written, so rows
+    moved to the archive (file or partitions) are not loaded back into the
+    hot table. Returns the number of staged rows dropped.
+    """
+    files = archive_files(conn) if table in ARCHIVE_TABLES else []
+    if not files:
+        return 0
+    key = ARCHIVE_TABLES[table][0]
+    in_list = f"{key} IN (SELECT value FROM json_each(?))"
+    staged = json.dumps([row[0] for row in conn.execute(f"SELECT {key} FROM {staging}")])
+    archived = []
+    for path in files:
+        with closing(_open_read_only(path)) as archive:
+            if has_table(archive, table):
+                archived += [row[0] for row in archive.execute(f"SELECT {key} FROM {table} WHERE {in_list}", (staged,))]
+    if not archived:
+        return 0
+    return conn.execute(f"DELETE FROM {staging} WHERE {in_list}", (json.dumps(archived),)).rowcount
+
+
+def _keep_counted(cursor, table, keys_json):
+    """Count rows about to leave the hot table once more, so their deletion leaves the counters unchanged."""
+    key = ARCHIVE_TABLES[table][0]
+    source = f"main.{table}"
+    where = f"{key} IN (SELECT value FROM json_each(?))"
+    for name, (base, _, _) in SUMMARY_TABLES.items():
+        if base == table:
+            count_into_summary(cursor, name, source, where, (keys_json,))
+    for name, (base, _, _) in ROLLUP_TABLES.items():
+        if base == table:
+            count_into_rollup(cursor, name, source, where, (keys_json,))
+
+
+def archive_table(conn, table, older_than_days=ARCHIVE_AFTER_DAYS, batch_rows=ARCHIVE_BATCH_ROWS,
+                  pause_seconds=ARCHIVE_PAUSE_SECONDS, now=None, partition_grain=ARCHIVE_PARTITION_GRAIN):
+    """
+    Move the terminal-status rows of `table` older than `older_than_days` to the archive.
+
+    Each batch of up to `batch_rows` rows is copied, deleted and re-counted
+    in one short BEGIN IMMEDIATE transaction. A batch interrupted between the
+    archive (or partition) commit and the main one - they are separate files -
+    leaves rows in both; the next run finds them again and only deletes the
+    hot copy.
+
+    Returns:
+        int: Rows moved
+    """
+    key, age_column, statuses = ARCHIVE_TABLES[table]
+    cutoff = ((now or datetime.now()) - timedelta(days=older_than_days)).strftime(TIMESTAMP_FORMAT)
+    select_keys = (
+        f"SELECT {key} FROM main.{table} "
+        f"WHERE status IN ({', '.join('?' * len(statuses))}) AND {age_column} < ? LIMIT ?"
+    )
+    moved = 0
+    with borrow(conn) as conn:
+        if conn.in_transaction:
+            raise RuntimeError("archive_table() commits each batch itself; call it outside a transaction")
+        partition_grain = resolve_partition_grain(_database_file(conn), partition_grain)
+        router = PartitionRouter(_database_file(conn), partition_grain) if partition_grain else None
+        if router is None:
+            attach_archive(conn)
+        cursor = conn.cursor()
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                keys = [row[0] for row in cursor.execute(select_keys, (*statuses, cutoff, int(batch_rows)))]
+                if not keys:
+                    conn.commit()
+                    break
+                keys_json = json.dumps(keys)
+                in_batch = f"{key} IN (SELECT value FROM json_each(?))"
+                if router is None:
+                    cursor.execute(
+                        f"INSERT INTO {ARCHIVE_SCHEMA}.{table} SELECT * FROM main.{table} WHERE {in_batch} "
+                        f"ON CONFLICT({key}) DO NOTHING",
+                        (keys_json,),
+                    )
+                else:
+                    rows = cursor.execute(f"SELECT * FROM main.{table} WHERE {in_batch}", (keys_json,)).fetchall()
+                    router.insert(table, [column[0] for column in cursor.description], rows, conn)
+                _keep_counted(cursor, table, keys_json)
+                cursor.execute(f"DELETE FROM main.{table} WHERE {in_batch}", (keys_json,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            moved += len(keys)
+            if len(keys) < batch_rows:
+                break
+            time.sleep(pause_seconds)
+    return moved
+
+
+def archive_rows(conn=None, tables=None, older_than_days=ARCHIVE_AFTER_DAYS, batch_rows=ARCHIVE_BATCH_ROWS,
+                 pause_seconds=ARCHIVE_PAUSE_SECONDS, partition_grain=ARCHIVE_PARTITION_GRAIN):
+    """
+    Archive every table in ARCHIVE_TABLES (or the given ones); see archive_table.
+
+    Returns:
+        dict: table -> rows moved
+    """
+    moved = {}
+    with borrow(conn) as conn:
+        for table in tables or ARCHIVE_TABLES:
+            moved[table] = archive_table(conn, table, older_than_days, batch_rows, pause_seconds,
+                                         partition_grain=partition_grain)
+    print(f"✅ Archived {', '.join(f'{table} ({n} rows)' for table, n in moved.items())}")
+    return moved
+
+
+def archive_counts(conn=None):
+    """Hot and archived row counts per archived table (archive file and partition files)."""
+    counts = {}
+    with borrow(conn) as conn:
+        path = _archive_file(conn)
+        router = _partition_router(_database_file(conn))
+        partitions = router.stats() if router else []
+        for table in ARCHIVE_TABLES:
+            hot = conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+            archived = sum(partition[table] for partition in partitions)
+            if path:
+                with closing(_open_read_only(path)) as archive:
+                    if has_table(archive, table):
+                        archived += archive.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            counts[table] = {"hot": hot, "archived": archived}
+    return counts
+
+
+def history_frame(conn, table, start=None, end=None, columns=None):
+    """
+    Hot and archived rows of `table` with start <= age column < end, oldest first.
+
+    Archived rows come from the partitions the range overlaps when the
+    archive is partitioned, otherwise from the archive file.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        table: One of ARCHIVE_TABLES
+        start, end: Time range (canonical strings, dates or datetimes); None = open
+        columns: Columns to return (defaults to all)
+
+    Returns:
+        DataFrame with the table's declared dtypes (see app.dtypes)
+    """
+    _, age_column, _ = ARCHIVE_TABLES[table]
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{age_column} >= ?")
+        params.append(str(start))
+    if end is not None:
+        conditions.append(f"{age_column} < ?")
+        params.append(str(end))
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    select = ", ".join(columns) if columns else "*"
+
+    with borrow(conn) as conn:
+        frames = [pd.read_sql_query(f"SELECT {select} FROM main.{table}{where}", conn, params=params)]
+        # Archived rows are read through connections of their own, so a caller's transaction is left alone
+        path = _archive_file(conn)
+        if path:
+            with closing(_open_read_only(path)) as archive:
+                if has_table(archive, table):
+                    frames.append(pd.read_sql_query(f"SELECT {select} FROM {table}{where}", archive, params=params))
+        router = _partition_router(_database_file(conn))
+        if router:
+            names, rows = router.query(table, start, end, columns, conn=conn)
+            frames.append(pd.DataFrame.from_records(rows, columns=names))
+    frames = [frame for frame in frames if not frame.empty] or frames[:1]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if age_column in df.columns:
+        df = df.sort_values(age_column, kind="stable", ignore_index=True)
+    return domain_frame(df, table)
+
+
+class ArchiveScheduler(threading.Thread):
+    """Background thread that calls archive_rows() at start and then on a fixed interval."""
+
+    def __init__(self, db_path=DB_PATH, interval_seconds=ARCHIVE_INTERVAL_SECONDS, older_than_days=ARCHIVE_AFTER_DAYS,
+                 partition_grain=ARCHIVE_PARTITION_GRAIN):
+        super().__init__(name="sqlite-archive", daemon=True)
+        self.db_path = db_path
+        self.interval_seconds = interval_seconds
+        self.older_than_days = older_than_days
+        self.partition_grain = partition_grain
+        self.last_result = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                with connection(self.db_path) as conn:
+                    self.last_result = archive_rows(conn, older_than_days=self.older_than_days,
+                                                    partition_grain=self.partition_grain)
+            except Exception as e:
+                # Keep the thread alive: the next run may succeed (e.g. once a lock is released)
+                print(f"Archiving of {self.db_path} failed: {e}")
+            if self._stop_event.wait(self.interval_seconds):
+                break
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def schedule_archiving(db_path=DB_PATH, interval_seconds=ARCHIVE_INTERVAL_SECONDS, older_than_days=ARCHIVE_AFTER_DAYS):
+    """Start (and return) a background ArchiveScheduler for a database."""
+    scheduler = ArchiveScheduler(db_path, interval_seconds, older_than_days)
+    scheduler.start()
+    return scheduler
+
+
+if __name__ == "__main__":
+    # create_all_tables rather than ensure_schema, which may also start a background archiver
+    from app.schema import create_all_tables
+
+    parser = argparse.ArgumentParser(description="Move old closed/resolved rows into the archive database.")
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="archive rows older than this")
+    parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH_ROWS, help="rows moved per transaction")
+    parser.add_argument("--partitions", choices=["year", "month"], default=ARCHIVE_PARTITION_GRAIN,
+                        help="archive into one file per year/month")
+    parser.add_argument("--list", action="store_true", help="only list the partition files")
+    parser.add_argument("--vacuum", metavar="KEY", help="only VACUUM one partition (e.g. 2024-03)")
+    parser.add_argument("--backup", nargs=2, metavar=("KEY", "DIR"), help="only back up one partition into DIR")
+    args = parser.parse_args()
+
+    if args.list or args.vacuum or args.backup:
+        router = _partition_router(args.db)
+        if router is None:
+            parser.error(f"{args.db} has no partition files")
+        if args.vacuum:
+            router.vacuum(args.vacuum)
+            print(f"✅ Vacuumed partition {args.vacuum}")
+        if args.backup:
+            key, directory = args.backup
+            print(f"✅ Partition {key} backed up to {router.backup(key, Path(directory) / router.path_for(key).name)}")
+        for partition in router.stats():
+            print(f"   {partition['key']}: {partition['cyber_incidents']} incidents, "
+                  f"{partition['it_tickets']} tickets, {partition['bytes'] / 1e6:.1f} MB")
+    else:
+        with connection(args.db) as conn:
+            create_all_tables(conn)
+            archive_rows(conn, older_than_days=args.days, batch_rows=args.batch, partition_grain=args.partitions)
+            for table, counts in archive_counts(conn).items():
+                print(f"   {table}: {counts['hot']} hot, {counts['archived']} archived")
@@ -0,0 +1,141 @@
+##Purpose**: asyncio facade that runs the app's data functions on a bounded thread pool
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import DB_PATH, connection
+
+# Worker threads per database. Each keeps its own pooled connection, so this
+# is also the number of SQLite readers running at once.
+DEFAULT_WORKERS = 4
+
+# Seconds a single call (or a whole gather) may take before it is cancelled
+DEFAULT_TIMEOUT = 30
+
+
+class _Running:
+    """Tracks the connection a call is using so a cancel can interrupt it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conn = None
+        self.cancelled = False
+
+    def interrupt(self):
+        with self.lock:
+            self.cancelled = True
+            if self.conn is not None:
+                self.conn.interrupt()
+
+
+class AsyncDB:
+    """
+    Run `func(conn, *args)` calls for one database file from asyncio code.
+
+    Calls go to a fixed-size thread pool; every worker thread checks out its
+    own pooled connection, so queries for different tables run side by side
+    (WAL lets readers proceed together). Cancelling a call, or hitting its
+    timeout, interrupts the SQLite statement it is running and rolls the
+    worker's transaction back.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="async-db")
+
+    def _call(self, running, func, args, kwargs):
+        with connection(self.db_path) as conn:
+            with running.lock:
+                if running.cancelled:
+                    raise asyncio.CancelledError()
+                running.conn = conn
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                with running.lock:
+                    running.conn = None
+
+    async def run(self, func, *args, timeout=None, **kwargs):
+        """
+        Await `func(conn, *args, **kwargs)` on a worker thread.
+
+        Args:
+            func: App data function taking a connection first
+            timeout: Seconds before the call is cancelled (None = the default;
+                pass 0 for no limit)
+
+        Raises:
+            asyncio.TimeoutError: The call ran past its timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        running = _Running()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._call, running, func, args, kwargs)
+        try:
+            if not timeout:
+                return await future
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Skip the call if it has not started yet, stop it if it has
+            running.interrupt()
+            raise
+
+    async def gather(self, *calls, timeout=None, return_exceptions=False):
+        """
+        Run several calls at once and return their results in order.
+
+        Each call is a function or a (function, *args) tuple. The timeout
+        covers the whole batch; when it expires every unfinished call is
+        cancelled.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        tasks = [self.run(*_as_call(call), timeout=0) for call in calls]
+        batch = asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        if not timeout:
+            return await batch
+        return await asyncio.wait_for(batch, timeout)
+
+    def close(self, wait=True):
+        """Stop the worker threads (their connections are reaped by the pool)."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _as_call(call):
+    if callable(call):
+        return (call,)
+    return tuple(call)
+
+
+# One AsyncDB per database file, shared by the whole process
+_async_dbs = {}
+_async_dbs_lock = threading.Lock()
+
+
+def get_async_db(db_path=DB_PATH):
+    """Return the shared AsyncDB for a database file, creating it on first use."""
+    key = str(db_path)
+    with _async_dbs_lock:
+        db = _async_dbs.get(key)
+        if db is None:
+            db = _async_dbs[key] = AsyncDB(db_path)
+        return db
+
+
+def fetch_many(calls, db_path=DB_PATH, timeout=DEFAULT_TIMEOUT):
+    """
+    Run several data calls concurrently from synchronous code (e.g. a page script).
+
+    Args:
+        calls: dict of name -> function or (function, *args)
+        db_path: Database file the calls read from
+        timeout: Seconds for the whole batch
+
+    Returns:
+        dict: name -> result, in the order given
+    """
+    db = get_async_db(db_path)
+    names = list(calls)
+    results = asyncio.run(db.gather(*calls.values(), timeout=timeout))
+    return dict(zip(names, results))
@@ -0,0 +1,109 @@
+##Purpose**: Shared batch-insert helper used by the incidents, tickets and metadata modules
+
+import sqlite3
+from itertools import islice
+
+from app.db import borrow, owns_transaction
+
+# Rows written per transaction (one fsync per batch instead of per row)
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _iter_rows(rows, columns):
+    """Yield plain tuples in `columns` order from tuples, dicts or a DataFrame."""
+    if hasattr(rows, "itertuples"):
+        frame = rows[list(columns)]
+        # NaN/NaT become NULL and numpy scalars become Python values
+        frame = frame.astype(object).where(frame.notna(), None)
+        yield from frame.itertuples(index=False, name=None)
+        return
+
+    for row in rows:
+        if isinstance(row, dict):
+            yield tuple(row.get(column) for column in columns)
+        else:
+            yield tuple(row)
+
+
+# Errors that reject a single row without breaking the transaction
+ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError)
+
+
+def _is_conflict(error):
+    """True when an IntegrityError is a duplicate key rather than bad data."""
+    message = str(error)
+    return "UNIQUE constraint failed" in message or "PRIMARY KEY" in message
+
+
+def bulk_insert(conn, table, columns, rows, batch_size=DEFAULT_BATCH_SIZE, key_column=None, transform=None):
+    """
+    Insert many rows with executemany, one transaction per batch.
+
+    Batches are committed one by one only when this call checked the
+    connection out itself; inside a caller's transaction they are savepoints
+    the caller commits.
+
+    A batch is first written in a single executemany. If it hits a constraint
+    error the batch is rolled back to its savepoint and replayed row by row so
+    only the offending rows are left out; the rest of the batch still lands.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        table: Target table name
+        columns: Column names, in the order values are supplied
+        rows: Iterable of tuples/dicts, or a pandas DataFrame
+        batch_size: Rows per transaction
+        key_column: Column used to identify rows in the summary (defaults to the first)
+        transform: Optional callable applied to each row tuple before insert
+
+    Returns:
+        dict: inserted, skipped and failed counts, plus the skipped keys
+        (duplicate IDs) and (key, error) pairs for failed rows
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    key_index = columns.index(key_column) if key_column else 0
+    insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    summary = {"inserted": 0, "skipped": 0, "failed": 0, "conflicts": [], "errors": []}
+    row_iter = _iter_rows(rows, columns)
+    if transform is not None:
+        row_iter = map(transform, row_iter)
+
+    with borrow(conn) as conn:
+        cursor = conn.cursor()
+        while True:
+            batch = list(islice(row_iter, batch_size))
+            if not batch:
+                break
+
+            if not conn.in_transaction:
+                # Otherwise the savepoint would be the outermost transaction and RELEASE would commit it
+                cursor.execute("BEGIN")
+            cursor.execute("SAVEPOINT bulk_batch")
+            try:
+                cursor.executemany(insert_sql, batch)
+                summary["inserted"] += len(batch)
+            except ROW_ERRORS:
+                # Replay the batch row by row to isolate the bad rows
+                cursor.execute("ROLLBACK TO bulk_batch")
+                for row in batch:
+                    try:
+                        cursor.execute(insert_sql, row)
+                        summary["inserted"] += 1
+                    except ROW_ERRORS as e:
+                        if isinstance(e, sqlite3.IntegrityError) and _is_conflict(e):
+                            summary["skipped"] += 1
+                            summary["conflicts"].append(row[key_index])
+                        else:
+                            summary["failed"] += 1
+                            key = row[key_index] if len(row) > key_index else None
+                            summary["errors"].append((key, str(e)))
+            cursor.execute("RELEASE bulk_batch")
+            # One transaction per batch only on our own checkout; a caller's transaction is theirs to commit
+            if owns_transaction(conn):
+                conn.commit()
+
+    print(f"{table}: inserted {summary['inserted']}, skipped {summary['skipped']} duplicate(s), "
+          f"failed {summary['failed']}")
+    return summary
@@ -0,0 +1,221 @@
+##Purpose**: Process-wide cache for dashboard reads, invalidated per table on write
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from app.db import borrow
+
+# Tables whose writes bump a counter in data_versions (from schema version 5
+# the counters are the newest change-feed seq per table, see app.changes)
+VERSIONED_TABLES = ("cyber_incidents", "it_tickets", "metadata")
+
+# Cached results kept across all pages and sessions of the server process
+DEFAULT_CACHE_SIZE = 256
+
+# Connections whose version snapshot is remembered (oldest dropped first)
+_SNAPSHOT_LIMIT = 64
+
+
+def create_data_versions_table(conn):
+    """
+    Create the data_versions table and the triggers that bump it on every write.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS data_versions (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """
+    cursor.execute(create_table_sql)
+
+    for table in VERSIONED_TABLES:
+        cursor.execute("INSERT OR IGNORE INTO data_versions (table_name, version) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+            END
+            """)
+
+
+# id(conn) -> (conn, data_version, total_changes, database file, versions)
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def _snapshot(conn):
+    """
+    Database file and table versions as seen by `conn`.
+
+    PRAGMA data_version only changes when another connection commits and
+    total_changes only when this one writes, so while both are unchanged the
+    remembered versions are still current and data_versions is not read.
+    """
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    total_changes = conn.total_changes
+    with _snapshots_lock:
+        snapshot = _snapshots.get(id(conn))
+    if snapshot and snapshot[0] is conn and snapshot[1:3] == (data_version, total_changes):
+        return snapshot[3], snapshot[4]
+
+    database = snapshot[3] if snapshot and snapshot[0] is conn else _database_file(conn)
+    try:
+        versions = dict(conn.execute("SELECT table_name, version FROM data_versions").fetchall())
+    except sqlite3.OperationalError:
+        # Schema older than version 4: no counters, so nothing can be cached
+        return database, None
+    with _snapshots_lock:
+        _snapshots[id(conn)] = (conn, data_version, total_changes, database, versions)
+        _snapshots.move_to_end(id(conn))
+        while len(_snapshots) > _SNAPSHOT_LIMIT:
+            _snapshots.popitem(last=False)
+    return database, versions
+
+
+def _database_file(conn):
+    for _, name, path in conn.execute("PRAGMA database_list").fetchall():
+        if name == "main":
+            return path
+    return ""
+
+
+def table_versions(conn, tables):
+    """Current write counter of each table, as a tuple in `tables` order."""
+    with borrow(conn) as conn:
+        _, versions = _snapshot(conn)
+    return tuple((versions or {}).get(table, 0) for table in tables)
+
+
+def _freeze(value):
+    """Make list/dict arguments hashable so they can be part of a cache key."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def _copy(value):
+    """Hand out copies so callers can format cached frames in place."""
+    if hasattr(value, "copy") and not isinstance(value, (str, bytes)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy(item) for item in value)
+    return value
+
+
+class QueryCache:
+    """
+    LRU of query results, each stored with the versions of the tables it read.
+
+    An entry is served while those versions are unchanged; a write to one
+    table only makes the entries that read that table stale.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evicted": 0}
+
+    def get_or_load(self, conn, tables, key, loader):
+        """
+        Return the cached result for `key`, calling loader(conn) if it is missing or stale.
+
+        Args:
+            conn: Database connection (None borrows a pooled one)
+            tables: Tables the loader reads
+            key: Hashable description of the query and its arguments
+            loader: Callable taking the connection and returning the result
+        """
+        tables = tuple(tables)
+        with borrow(conn) as conn:
+            if conn.in_transaction:
+                # Uncommitted writes could still roll back; do not cache what they show
+                return loader(conn)
+            database, versions = _snapshot(conn)
+            if versions is None:
+                return loader(conn)
+            current = tuple(versions.get(table, 0) for table in tables)
+            full_key = (database, key)
+
+            with self._lock:
+                entry = self._entries.get(full_key)
+                if entry is not None and entry[1] == current:
+                    self._entries.move_to_end(full_key)
+                    self._stats["hits"] += 1
+                    return _copy(entry[2])
+                self._stats["stale" if entry is not None else "misses"] += 1
+
+            value = loader(conn)
+
+        with self._lock:
+            self._entries[full_key] = (tables, current, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+        return _copy(value)
+
+    def invalidate(self, table=None):
+        """Drop the entries that read `table` (every entry if table is None)."""
+        with self._lock:
+            if table is None:
+                self._entries.clear()
+                return
+            for full_key in [k for k, entry in self._entries.items() if table in entry[0]]:
+                del self._entries[full_key]
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        return stats
+
+
+# One cache shared by every page and session of the process
+_cache = QueryCache()
+
+
+def cached_call(conn, tables, func, *args, **kwargs):
+    """Call func(conn, *args, **kwargs) through the shared cache."""
+    key = (func.__module__, func.__qualname__, _freeze(args), _freeze(kwargs))
+    return _cache.get_or_load(conn, tables, key, lambda conn: func(conn, *args, **kwargs))
+
+
+def cached(*tables, per_day=False):
+    """
+    Decorator for read helpers taking the connection as first argument.
+
+    Args:
+        tables: Tables the helper reads
+        per_day: Also key on today's date, for helpers that count "today"
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(conn=None, *args, **kwargs):
+            if per_day and kwargs.get("today") is None and not args:
+                kwargs["today"] = date.today()
+            return cached_call(conn, tables, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hit/miss counters of the shared cache."""
+    return _cache.stats()
+
+
+def clear_cache(table=None):
+    """Drop cached results for one table, or all of them."""
+    _cache.invalidate(table)
@@ -0,0 +1,220 @@
+##Purpose**: Trigger-written change feed that dashboards poll for live updates
+
+import threading
+
+import pandas as pd
+
+from app.analytics import table_frame
+from app.db import borrow
+from app.dtypes import align_categories, domain_frame
+from app.snapshots import read_snapshot
+
+# Tracked table -> primary key recorded in the feed
+CHANGE_KEYS = {
+    "cyber_incidents": "incident_id",
+    "it_tickets": "ticket_id",
+    "metadata": "dataset_id",
+}
+
+# Rows kept in the feed when it is pruned at server start
+CHANGE_LOG_ROWS = 100000
+
+
+def create_changes_table(conn):
+    """
+    Create the changes table and the triggers that append to it.
+
+    seq is AUTOINCREMENT so it never goes backwards or gets reused, even after
+    the newest rows are pruned; a reader's "last seen" seq stays meaningful.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+    cursor.execute(create_table_sql)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_changes_table_seq ON changes(table_name, seq)")
+
+    for table, key in CHANGE_KEYS.items():
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_changes_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', NEW.{key}, 'insert');
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_changes_update AFTER UPDATE ON {table}
+        BEGIN
+            INSERT INTO changes (table_name, row_id, op) SELECT '{table}', OLD.{key}, 'delete' WHERE OLD.{key} IS NOT NEW.{key};
+            INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', NEW.{key}, 'update');
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_changes_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', OLD.{key}, 'delete');
+        END
+        """)
+
+
+def version_counters_from_changes(conn):
+    """
+    Replace the data_versions counter table with a view over the change feed.
+
+    Every write already appends to changes, so the newest seq per table is a
+    write counter; this drops the second set of per-row triggers.
+    """
+    cursor = conn.cursor()
+    for table in CHANGE_KEYS:
+        for event in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version_{event}")
+    cursor.execute("DROP TABLE IF EXISTS data_versions")
+    # One MAX() index seek per table rather than a GROUP BY over the whole feed
+    tables = ", ".join(f"('{table}')" for table in CHANGE_KEYS)
+    cursor.execute(f"""
+    CREATE VIEW IF NOT EXISTS data_versions AS
+        SELECT column1 AS table_name,
+               COALESCE((SELECT MAX(seq) FROM changes WHERE changes.table_name = column1), 0) AS version
+        FROM (VALUES {tables})
+    """)
+
+
+def latest_change(conn=None, tables=None):
+    """Newest seq in the feed (for `tables` only, if given); 0 when empty."""
+    with borrow(conn) as conn:
+        if tables is None:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        # One index seek per table on (table_name, seq)
+        return max(
+            conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes WHERE table_name = ?", (table,)).fetchone()[0]
+            for table in tables
+        )
+
+
+def changes_since(conn, seq, table=None):
+    """
+    Changes after `seq`, oldest first.
+
+    Returns:
+        list: (seq, table_name, row_id, op) tuples
+    """
+    with borrow(conn) as conn:
+        if table is None:
+            return conn.execute(
+                "SELECT seq, table_name, row_id, op FROM changes WHERE seq > ? ORDER BY seq", (seq,)
+            ).fetchall()
+        return conn.execute(
+            "SELECT seq, table_name, row_id, op FROM changes WHERE table_name = ? AND seq > ? ORDER BY seq",
+            (table, seq),
+        ).fetchall()
+
+
+def prune_changes(conn=None, keep_rows=CHANGE_LOG_ROWS):
+    """Delete all but the newest `keep_rows` changes. Returns the number deleted."""
+    with borrow(conn) as conn:
+        cursor = conn.execute(
+            "DELETE FROM changes WHERE seq <= (SELECT COALESCE(MAX(seq), 0) FROM changes) - ?", (keep_rows,)
+        )
+        return cursor.rowcount
+
+
+class LiveTable:
+    """
+    A table held in memory as a DataFrame and kept current from the change feed.
+
+    The first refresh starts from the table's Arrow snapshot when there is
+    one (see app.snapshots), otherwise it reads the whole table; after that
+    each refresh reads the feed after the last seen seq and re-selects only
+    the rows it names.
+    """
+
+    def __init__(self, table, columns=None):
+        self.table = table
+        self.key = CHANGE_KEYS[table]
+        # The key is always loaded, since changes are matched on it
+        self.columns = list(dict.fromkeys(list(columns) + [self.key])) if columns else None
+        self.frame = None
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def _reload(self, conn):
+        self.seq = latest_change(conn)
+        self.frame = table_frame(conn, self.table, self.columns)
+
+    def _load_snapshot(self, conn):
+        snapshot = read_snapshot(conn.execute("PRAGMA database_list").fetchone()[2], self.table, self.columns)
+        # A snapshot newer than the feed belongs to a replaced database
+        if snapshot is None or snapshot[0] > latest_change(conn):
+            return False
+        self.seq, self.frame = snapshot
+        return True
+
+    def refresh(self, conn=None):
+        """Bring the frame up to date and return a copy of it."""
+        with self._lock, borrow(conn) as conn:
+            if self.frame is None and not self._load_snapshot(conn):
+                self._reload(conn)
+                return self.frame.copy()
+
+            changes = changes_since(conn, self.seq, self.table)
+            if not changes:
+                return self.frame.copy()
+            # seq has no gaps, so a feed starting after seq + 1 has been pruned
+            oldest_kept = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if oldest_kept > self.seq + 1:
+                # Pruned past our position: some changes are gone, read everything again
+                self._reload(conn)
+                return self.frame.copy()
+
+            changed_ids = list(dict.fromkeys(row_id for _, _, row_id, _ in changes))
+            fresh = self._select(conn, changed_ids)
+            kept = self.frame[~self.frame[self.key].isin(changed_ids)]
+            if fresh.empty:
+                frame = kept
+            elif kept.empty:
+                # Nothing to keep (e.g. an empty snapshot): the fresh rows carry the real dtypes
+                frame = fresh
+            else:
+                frame = pd.concat(align_categories(kept.copy(), fresh), ignore_index=True)
+            self.frame = frame.sort_values(self.key, ignore_index=True)
+            self.seq = changes[-1][0]
+            return self.frame.copy()
+
+    def _select(self, conn, ids):
+        """Current rows for `ids` (deleted ones are simply absent)."""
+        frames = []
+        columns = self.columns or list(self.frame.columns)
+        select = ", ".join(columns)
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            query = f"SELECT {select} FROM {self.table} WHERE {self.key} IN ({', '.join('?' * len(chunk))})"
+            frames.append(pd.read_sql_query(query, conn, params=chunk))
+        fresh = pd.concat(frames, ignore_index=True)[columns]
+        return domain_frame(fresh, self.table)
+
+
+# (database file, table, columns) -> LiveTable shared by every session
+_live_tables = {}
+_live_tables_lock = threading.Lock()
+
+
+def live_table_frame(conn, table, columns=None):
+    """Current contents of `table` from a process-wide LiveTable."""
+    with borrow(conn) as conn:
+        database = conn.execute("PRAGMA database_list").fetchone()[2]
+        key = (database, table, tuple(columns or ()))
+        with _live_tables_lock:
+            live = _live_tables.get(key)
+            if live is None:
+                live = _live_tables[key] = LiveTable(table, columns)
+        return live.refresh(conn)
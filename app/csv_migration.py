@@ -0,0 +1,186 @@
+##Purpose**: Streaming, resumable CSV -> SQLite migration shared by all domain tables
+
+import csv
+import time
+from pathlib import Path
+
+from app.db import borrow, has_table, owns_transaction
+from app.schema import create_migration_state_table
+
+# Upper bound on raw CSV bytes held in memory per chunk
+DEFAULT_MEMORY_BUDGET = 8 * 1024 * 1024
+
+# Print a progress line at most this often (seconds)
+PROGRESS_INTERVAL = 2.0
+
+
+def _read_records(f, start, encoding):
+    """
+    Yield (record, end_offset) pairs from a binary CSV file starting at `start`.
+
+    end_offset is the byte position just after the record, so it is a safe
+    place to resume from (quoted fields spanning several lines included).
+    """
+    f.seek(start)
+    offset = start
+
+    def lines():
+        nonlocal offset
+        for raw in iter(f.readline, b""):
+            offset += len(raw)
+            yield raw.decode(encoding)
+
+    for record in csv.reader(lines()):
+        yield record, offset
+
+
+def _load_state(conn, source, table):
+    row = conn.execute(
+        "SELECT byte_offset, row_number, file_size, status FROM migration_state WHERE source = ? AND target_table = ?",
+        (source, table),
+    ).fetchone()
+    return row
+
+
+def _save_state(conn, source, table, byte_offset, row_number, file_size, status):
+    conn.execute(
+        """
+        INSERT INTO migration_state (source, target_table, byte_offset, row_number, file_size, status, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(source, target_table) DO UPDATE SET
+            byte_offset = excluded.byte_offset,
+            row_number = excluded.row_number,
+            file_size = excluded.file_size,
+            status = excluded.status,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (source, table, byte_offset, row_number, file_size, status),
+    )
+
+
+def _upsert_sql(table, columns, key_column, on_conflict):
+    """INSERT ... ON CONFLICT statement for one chunk."""
+    insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    if on_conflict == "ignore":
+        return insert_sql + f" ON CONFLICT({key_column}) DO NOTHING"
+    if on_conflict == "update":
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != key_column)
+        return insert_sql + f" ON CONFLICT({key_column}) DO UPDATE SET {updates}"
+    raise ValueError("on_conflict must be 'ignore' or 'update'")
+
+
+def migrate_csv(conn, filepath, table, columns, key_column, memory_budget_bytes=DEFAULT_MEMORY_BUDGET,
+                resume=True, on_conflict="ignore", transform=None, encoding="utf-8"):
+    """
+    Stream a CSV file into a table in bounded-memory chunks.
+
+    Each chunk is upserted and its checkpoint (byte offset + row number) is
+    written to migration_state in the same transaction, so a crash leaves
+    either the whole chunk and its checkpoint or neither. A rerun seeks
+    straight to the checkpoint; rows already present are not duplicated.
+
+    Chunks are only committed one by one on a connection this function
+    borrowed itself. On a connection passed in, everything stays in the
+    caller's transaction until the caller commits.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        filepath: CSV file whose header names the table columns
+        table: Target table name
+        columns: Table columns to load, in insert order
+        key_column: Primary key used for the ON CONFLICT clause
+        memory_budget_bytes: Raw CSV bytes buffered per chunk
+        resume: Continue from the saved checkpoint (False restarts at row 0)
+        on_conflict: "ignore" keeps existing rows, "update" overwrites them
+        transform: Optional callable applied to each row tuple before insert
+        encoding: CSV text encoding
+
+    Returns:
+        dict: rows read, rows written, rows already present, elapsed seconds
+        and rows/sec, or None if the file does not exist
+    """
+    filepath = Path(filepath)
+    if not filepath.exists():
+        print(f"File not found: {filepath}")
+        print(f"   No {table} to migrate.")
+        return None
+
+    source = str(filepath.resolve())
+    file_size = filepath.stat().st_size
+    upsert_sql = _upsert_sql(table, columns, key_column, on_conflict)
+
+    with borrow(conn) as conn:
+        # Normally created by create_all_tables; only databases set up some other way need it here
+        if not has_table(conn, "migration_state"):
+            create_migration_state_table(conn)
+
+        with open(filepath, "rb") as f:
+            header_line = f.readline()
+            header = next(csv.reader([header_line.decode(encoding).lstrip("\ufeff")]))
+            missing = [column for column in columns if column not in header]
+            if missing:
+                raise ValueError(f"{filepath.name} is missing column(s): {', '.join(missing)}")
+            positions = [header.index(column) for column in columns]
+
+            start_offset, row_number = len(header_line), 0
+            state = _load_state(conn, source, table) if resume else None
+            if state is not None:
+                saved_offset, saved_rows, _, saved_status = state
+                if saved_offset > file_size:
+                    print(f"{filepath.name} is smaller than the saved checkpoint; restarting from the first row.")
+                elif saved_offset == file_size and saved_status == "complete":
+                    print(f"{filepath.name} already migrated into {table} ({saved_rows} rows).")
+                    return {"rows_read": 0, "rows_written": 0, "rows_existing": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+                else:
+                    start_offset, row_number = max(saved_offset, start_offset), saved_rows
+                    if row_number:
+                        print(f"Resuming {filepath.name} after row {row_number} (byte {start_offset}).")
+
+            started = last_report = time.perf_counter()
+            rows_read = rows_written = 0
+            chunk, chunk_start, offset = [], start_offset, start_offset
+
+            def flush():
+                nonlocal chunk, chunk_start, rows_written
+                # rowcount counts the upserted rows only, not what the triggers write
+                rows_written += conn.executemany(upsert_sql, chunk).rowcount
+                _save_state(conn, source, table, offset, row_number, file_size, "running")
+                if owns_transaction(conn):
+                    conn.commit()
+                chunk, chunk_start = [], offset
+
+            for record, offset in _read_records(f, start_offset, encoding):
+                if not record:
+                    continue
+                row = tuple((record[i] if i < len(record) and record[i] != "" else None) for i in positions)
+                if transform is not None:
+                    row = transform(row)
+                chunk.append(row)
+                rows_read += 1
+                row_number += 1
+
+                if offset - chunk_start >= memory_budget_bytes:
+                    flush()
+                    now = time.perf_counter()
+                    if now - last_report >= PROGRESS_INTERVAL:
+                        rate = rows_read / (now - started)
+                        print(f"   {table}: {row_number:,} rows ({offset / file_size:.0%}) at {rate:,.0f} rows/sec")
+                        last_report = now
+
+            if chunk:
+                flush()
+            _save_state(conn, source, table, file_size, row_number, file_size, "complete")
+            if owns_transaction(conn):
+                conn.commit()
+
+    elapsed = time.perf_counter() - started
+    rate = rows_read / elapsed if elapsed else 0.0
+    print(f"Migrated {rows_written} {table} from {filepath.name} "
+          f"({rows_read - rows_written} already present, {rate:,.0f} rows/sec)")
+    return {
+        "rows_read": rows_read,
+        "rows_written": rows_written,
+        "rows_existing": rows_read - rows_written,
+        "seconds": elapsed,
+        "rows_per_sec": rate,
+    }
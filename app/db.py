@@ -1,6 +1,12 @@
+import atexit
+import re
 import sqlite3
+import threading
+from contextlib import closing, contextmanager
 from pathlib import Path
 
+from app.query_metrics import connection_factory
+
 #PROJECT_ROOT = Path(__file__).resolve().parent[1]
 
 # Define the directory where the database file will be stored
@@ -9,15 +15,637 @@ DATA_DIR = Path('DATA')
 # Define the full path to the SQLite database file
 DB_PATH = DATA_DIR / "intelligence_platform.db"
 
-# Used to create a connection if it does not exist
-conn = sqlite3.connect(DB_PATH)
+# PRAGMAs applied once to every new pooled connection
+CONNECTION_PRAGMAS = {
+    "foreign_keys": "ON",
+    "cache_size": -16000,      # negative value = size in KiB (~16 MB page cache)
+    "temp_store": "MEMORY",
+}
+
+# Database-open modes. "wal" lets dashboard readers keep reading while a form
+# writes; "rollback" is SQLite's default journal, where a writer blocks readers.
+JOURNAL_MODES = {
+    "wal": {"journal_mode": "WAL"},
+    "rollback": {"journal_mode": "DELETE"},
+}
+DEFAULT_MODE = "wal"
+
+# How long a connection waits on a locked database before raising
+# "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+# NORMAL is safe with WAL (a power cut can lose the last commits but never
+# corrupts the file) and avoids an fsync on every commit
+SYNCHRONOUS = "NORMAL"
+
+# Pages in the WAL file before SQLite checkpoints it automatically
+WAL_AUTOCHECKPOINT_PAGES = 1000
+
+# Read-only mode for dashboard reads: the file is opened with a mode=ro URI
+# (the journal mode is whatever the writers set), SQLite maps up to
+# mmap_size bytes of it so pages are read straight from the OS cache, and
+# query_only rejects any write that slips through.
+READ_ONLY_MODE = "readonly"
+READ_ONLY_PRAGMAS = {
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64000,      # ~64 MB page cache
+    "temp_store": "MEMORY",
+    "query_only": "ON",
+}
+
+# Schema name the archive database is attached under (see app.archive)
+ARCHIVE_SCHEMA = "archive"
+
+# Optional time partitioning (see PartitionRouter): partition key format per
+# grain, and the column each partitioned table is split on
+PARTITION_GRAINS = {"year": "%Y", "month": "%Y-%m"}
+PARTITION_KEY_PATTERNS = {"year": r"\d{4}", "month": r"\d{4}-\d{2}"}
+PARTITIONED_TABLES = {"cyber_incidents": "timestamp", "it_tickets": "created_at"}
+
+# Partition for rows without a time (e.g. incidents whose time is unknown)
+UNDATED_PARTITION = "undated"
+
+# Prepared statements kept per connection (sqlite3 defaults to 128). The
+# repositories reuse one SQL string per statement, so each is parsed once.
+STATEMENT_CACHE_SIZE = 256
+
+
+def open_mode_pragmas(mode=DEFAULT_MODE, synchronous=SYNCHRONOUS,
+                      busy_timeout_ms=BUSY_TIMEOUT_MS,
+                      autocheckpoint_pages=WAL_AUTOCHECKPOINT_PAGES):
+    """Build the PRAGMA set for a database-open mode."""
+    if mode == READ_ONLY_MODE:
+        pragmas = dict(READ_ONLY_PRAGMAS)
+        pragmas["busy_timeout"] = int(busy_timeout_ms)
+        return pragmas
+    if mode not in JOURNAL_MODES:
+        modes = ", ".join([*JOURNAL_MODES, READ_ONLY_MODE])
+        raise ValueError(f"Unknown database mode '{mode}'. Use one of: {modes}")
+
+    pragmas = dict(CONNECTION_PRAGMAS)
+    pragmas.update(JOURNAL_MODES[mode])
+    pragmas["busy_timeout"] = int(busy_timeout_ms)
+    pragmas["synchronous"] = synchronous
+    if mode == "wal":
+        pragmas["wal_autocheckpoint"] = int(autocheckpoint_pages)
+    return pragmas
+
+
+class ConnectionPool:
+    """
+    Hands out one long-lived SQLite connection per thread for a database file.
+
+    A connection is opened the first time a thread checks one out and is then
+    reused by every later checkout on that thread, so nested helpers share the
+    same connection and transaction instead of opening their own. Connections
+    left behind by finished threads (e.g. old Streamlit script runs) are closed
+    the next time the pool opens a connection.
+    """
+
+    def __init__(self, db_path=DB_PATH, pragmas=None, mode=DEFAULT_MODE):
+        self.db_path = str(db_path)
+        self.mode = mode
+        self.pragmas = dict(open_mode_pragmas(mode) if pragmas is None else pragmas)
+        self.busy_timeout_ms = int(self.pragmas.get("busy_timeout", BUSY_TIMEOUT_MS))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._generation = 0
+        self._stats = {
+            "opened": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "reused": 0,
+            "commits": 0,
+            "rollbacks": 0,
+        }
+
+    def _open(self):
+        """Open and tune a new connection for the calling thread."""
+        read_only = self.mode == READ_ONLY_MODE
+        if read_only:
+            # The file must already exist; a read-only open never creates it
+            target = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        else:
+            target = self.db_path
+            if self.db_path != ":memory:":
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            target,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            uri=read_only,
+            # Plain sqlite3.Connection unless app.query_metrics is enabled
+            factory=connection_factory(),
+        )
+        cursor = conn.cursor()
+        for name, value in self.pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+        with self._lock:
+            self._reap_dead_threads()
+            self._connections.append((threading.current_thread(), conn))
+            self._stats["opened"] += 1
+        return conn
+
+    def _reap_dead_threads(self):
+        """Close connections whose owning thread has finished (lock held)."""
+        alive = []
+        for thread, conn in self._connections:
+            if thread.is_alive():
+                alive.append((thread, conn))
+            else:
+                conn.close()
+                self._stats["closed"] += 1
+        self._connections = alive
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out the calling thread's connection.
+
+        The outermost checkout commits on success and rolls back on error;
+        nested checkouts just share the open transaction.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation != self._generation:
+            # The pool was closed since this thread last used it
+            conn = None
+        with self._lock:
+            self._stats["checkouts"] += 1
+            if conn is not None:
+                self._stats["reused"] += 1
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.generation = self._generation
+            self._local.depth = 0
+
+        self._local.depth += 1
+        try:
+            yield conn
+        except Exception:
+            if self._local.depth == 1:
+                conn.rollback()
+                with self._lock:
+                    self._stats["rollbacks"] += 1
+            raise
+        else:
+            if self._local.depth == 1 and conn.in_transaction:
+                conn.commit()
+                with self._lock:
+                    self._stats["commits"] += 1
+        finally:
+            self._local.depth -= 1
+
+    def holds(self, conn):
+        """Whether `conn` is one of the connections this pool opened."""
+        with self._lock:
+            return any(pooled is conn for _, pooled in self._connections)
+
+    def depth(self):
+        """How many checkouts of its connection the calling thread currently holds (0 = none)."""
+        if getattr(self._local, "generation", None) != self._generation:
+            return 0
+        return getattr(self._local, "depth", 0)
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open_connections"] = len(self._connections)
+        stats["db_path"] = self.db_path
+        stats["mode"] = self.mode
+        return stats
+
+    def close_all(self):
+        """Close every connection the pool has opened."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._stats["closed"] += len(connections)
+            self._generation += 1
+        for _, conn in connections:
+            conn.close()
+
+
+# One pool per database file, shared by the whole process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_PATH, mode=DEFAULT_MODE):
+    """Return the shared pool for a database file, creating it on first use."""
+    key = (str(Path(db_path).resolve()), mode)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path, mode=mode)
+            _pools[key] = pool
+        return pool
+
+
+def connection(db_path=DB_PATH, mode=DEFAULT_MODE):
+    """Context manager that checks out a pooled connection."""
+    return get_pool(db_path, mode).connection()
+
+
+def read_connection(db_path=DB_PATH):
+    """
+    Check out a pooled read-only connection (see READ_ONLY_PRAGMAS).
+
+    For dashboard and analysis reads; any write through it raises
+    sqlite3.OperationalError. The database must already exist.
+    """
+    return get_pool(db_path, READ_ONLY_MODE).connection()
+
+
+def _is_pooled(conn):
+    with _pools_lock:
+        pools = list(_pools.values())
+    return any(pool.holds(conn) for pool in pools)
+
+
+# Connections whose transaction an outermost borrow() on the calling thread
+# started: pooled ones it checked out ("ids") and plain sqlite3 ones ("raw")
+_borrowed = threading.local()
+
+
+@contextmanager
+def borrow(conn=None, db_path=DB_PATH):
+    """
+    Use the caller's connection if one is given, otherwise a pooled one.
+
+    CRUD helpers use this so they never close a connection they did not open.
+    They only commit a transaction they started: the outermost pooled
+    checkout commits when it ends, and a pooled connection or one with a
+    transaction open is left for the caller to commit. A plain sqlite3
+    connection with no transaction open is committed when the outermost
+    borrow of it ends (rolled back on error), as the helpers always did for
+    callers that never commit themselves. Helpers that commit in chunks
+    check owns_transaction() first.
+    """
+    if conn is not None:
+        raw = _borrowed.__dict__.setdefault("raw", set())
+        if id(conn) in raw or conn.in_transaction or _is_pooled(conn):
+            yield conn
+            return
+        raw.add(id(conn))
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        else:
+            if conn.in_transaction:
+                conn.commit()
+        finally:
+            raw.discard(id(conn))
+        return
+    pool = get_pool(db_path)
+    with pool.connection() as pooled:
+        if pool.depth() > 1:
+            yield pooled
+            return
+        owned = _borrowed.__dict__.setdefault("ids", set())
+        owned.add(id(pooled))
+        try:
+            yield pooled
+        finally:
+            owned.discard(id(pooled))
+
+
+def owns_transaction(conn):
+    """
+    True if an outermost borrow() on this thread started `conn`'s transaction.
+
+    That is a pooled connection it checked out itself, or a plain sqlite3
+    connection passed in with no transaction open (see borrow). Only then can
+    a helper commit part-way (e.g. once per batch) without ending a
+    transaction its caller has open.
+    """
+    return id(conn) in getattr(_borrowed, "ids", ()) or id(conn) in getattr(_borrowed, "raw", ())
+
+
+def connect_database(db_path=DB_PATH, mode=DEFAULT_MODE):
+    """Return the calling thread's pooled connection (kept open by the pool)."""
+    pool = get_pool(db_path, mode)
+    with pool.connection() as conn:
+        return conn
+
+
+def partitions_directory(db_path):
+    """Directory the partition files of a database live in: <name>_partitions/."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_partitions")
+
+
+def partition_grain_of(db_path):
+    """
+    Grain ("year" or "month") of the partition files next to a database, or None.
+
+    The grain is read off the file names, so every reader finds the layout
+    the archiver wrote. None until a dated partition exists (the undated
+    one is named the same at either grain).
+    """
+    directory = partitions_directory(db_path)
+    if not directory.exists():
+        return None
+    keys = [path.stem for path in directory.glob("*.db")]
+    for grain, pattern in PARTITION_KEY_PATTERNS.items():
+        if any(re.fullmatch(pattern, key) for key in keys):
+            return grain
+    return None
+
+
+class PartitionRouter:
+    """
+    Splits the rows of PARTITIONED_TABLES across one SQLite file per year or month.
+
+    Partition files live in <database>_partitions/<key>.db (key "2025" or
+    "2025-03") and hold both tables with the main database's column layout.
+    Each is a complete database, so an old period can be vacuumed, backed up
+    or copied to slow storage without touching the others.
+
+    insert() sends each row to the partition of its time column (new rows
+    land in the current one); query() attaches only the partitions a time
+    range overlaps, at most the connection's ATTACH limit at a time.
+    """
+
+    def __init__(self, db_path=DB_PATH, grain="month"):
+        if grain not in PARTITION_GRAINS:
+            raise ValueError(f"Unknown partition grain '{grain}'. Use one of: {', '.join(PARTITION_GRAINS)}")
+        self.db_path = Path(db_path)
+        self.grain = grain
+        self.directory = partitions_directory(self.db_path)
+        # Characters of a canonical timestamp that make up the key ("2025" / "2025-03")
+        self._width = 4 if grain == "year" else 7
+        self._pattern = re.compile(PARTITION_KEY_PATTERNS[grain])
+
+    def key_for(self, value):
+        """
+        Partition key of a time value (canonical string, date or datetime).
+
+        None and values with no canonical date - stored placeholders such as
+        '00:00.0' that app.timestamps could not parse - go to UNDATED_PARTITION.
+        """
+        if value is None:
+            return UNDATED_PARTITION
+        key = str(value)[:self._width]
+        return key if self._pattern.fullmatch(key) else UNDATED_PARTITION
+
+    def path_for(self, key):
+        return self.directory / f"{key}.db"
+
+    def keys(self):
+        """Keys of the partition files that exist, oldest first (undated last)."""
+        if not self.directory.exists():
+            return []
+        found = [path.stem for path in self.directory.glob("*.db")]
+        return sorted(key for key in found if self._pattern.fullmatch(key)) + (
+            [UNDATED_PARTITION] if UNDATED_PARTITION in found else [])
+
+    def keys_between(self, start=None, end=None):
+        """
+        Existing partitions a [start, end) time range can have rows in.
+
+        With no bounds at all the undated partition is included too; any
+        bound excludes it, since its rows match no time range.
+        """
+        keys = [key for key in self.keys() if key != UNDATED_PARTITION]
+        if start is not None:
+            first = str(start)[:self._width]
+            keys = [key for key in keys if key >= first]
+        if end is not None:
+            # A partition starts at its key padded to a full date; it overlaps if it starts before `end`
+            keys = [key for key in keys if f"{key}-01-01"[:10] < str(end)]
+        if start is None and end is None and UNDATED_PARTITION in self.keys():
+            keys.append(UNDATED_PARTITION)
+        return keys
+
+    def _create_tables(self, conn, source):
+        """Give a partition file the partitioned tables (columns copied from `source`) and a time index."""
+        for table, time_column in PARTITIONED_TABLES.items():
+            create_sql = source.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()[0]
+            conn.execute(re.sub(r'^CREATE TABLE\s+"?\w+"?', f"CREATE TABLE IF NOT EXISTS {table}", create_sql, count=1))
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{time_column} ON {table}({time_column})")
+
+    def insert(self, table, columns, rows, conn=None):
+        """
+        Write rows to the partitions their time column belongs to.
+
+        Each partition's rows are written in one transaction of its own.
+        Rows whose key already exists in the partition are skipped, so a
+        retried batch does not duplicate anything.
+
+        Args:
+            table: One of PARTITIONED_TABLES
+            columns: Column names, in the order of each row tuple
+            rows: Iterable of row tuples
+            conn: Connection to the main database (for the table layout)
+
+        Returns:
+            dict: partition key -> rows written
+        """
+        position = list(columns).index(PARTITIONED_TABLES[table])
+        by_key = {}
+        for row in rows:
+            by_key.setdefault(self.key_for(row[position]), []).append(tuple(row))
+
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+               "ON CONFLICT DO NOTHING")
+        written = {}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with borrow(conn, self.db_path) as source:
+            for key, key_rows in by_key.items():
+                with connection(self.path_for(key)) as partition:
+                    self._create_tables(partition, source)
+                    written[key] = partition.executemany(sql, key_rows).rowcount
+        return written
+
+    @contextmanager
+    def attached(self, conn, keys):
+        """
+        Attach partitions to `conn` as part_<key> for the duration of the block; yields the schema names.
+
+        SQLite cannot ATTACH inside a transaction, and committing the
+        caller's would end it early, so an open transaction is refused.
+        """
+        if conn.in_transaction:
+            raise RuntimeError("Cannot attach partitions inside an open transaction; commit or roll back first")
+        read_only = bool(conn.execute("PRAGMA query_only").fetchone()[0])
+        schemas = []
+        try:
+            for key in keys:
+                schema = f"part_{key.replace('-', '_')}"
+                path = self.path_for(key)
+                # Read-only pools open files as URIs, so partitions are attached the same way
+                target = f"{path.resolve().as_uri()}?mode=ro" if read_only else str(path)
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (target,))
+                schemas.append(schema)
+            yield schemas
+        finally:
+            for schema in schemas:
+                conn.execute(f"DETACH DATABASE {schema}")
+
+    def query(self, table, start=None, end=None, columns=None, where=None, params=(), conn=None):
+        """
+        Rows of `table` with start <= time < end, read from the partitions that can hold them.
+
+        Partitions are attached read-only to a connection of their own (so
+        a transaction open on `conn` is left alone), a group at a time up to
+        its ATTACH limit, and read with one UNION ALL per group, oldest first.
+
+        Args:
+            table: One of PARTITIONED_TABLES
+            start, end: Time range (canonical strings, dates or datetimes); None = open
+            columns: Columns to return (defaults to all)
+            where: Extra SQL condition over the table's columns, with `params`
+            conn: Connection to the main database, for the column names (None borrows a pooled one)
+
+        Returns:
+            tuple: (column names, list of row tuples)
+        """
+        time_column = PARTITIONED_TABLES[table]
+        conditions, bounds = [], []
+        if start is not None:
+            conditions.append(f"{time_column} >= ?")
+            bounds.append(str(start))
+        if end is not None:
+            conditions.append(f"{time_column} < ?")
+            bounds.append(str(end))
+        if where:
+            conditions.append(f"({where})")
+        condition = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        select = ", ".join(columns) if columns else "*"
+
+        keys = self.keys_between(start, end)
+        rows = []
+        with borrow(conn, self.db_path) as conn:
+            names = list(columns or (row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")))
+        with closing(sqlite3.connect("file::memory:", uri=True)) as reader:
+            reader.execute("PRAGMA query_only = ON")  # attached() then opens the partitions read-only
+            group_size = max(1, reader.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED))
+            for first in range(0, len(keys), group_size):
+                with self.attached(reader, keys[first:first + group_size]) as schemas:
+                    sql = " UNION ALL ".join(f"SELECT {select} FROM {schema}.{table}{condition}" for schema in schemas)
+                    cursor = reader.execute(sql, (list(bounds) + list(params)) * len(schemas))
+                    names = [description[0] for description in cursor.description]
+                    rows.extend(cursor.fetchall())
+        return names, rows
+
+    def vacuum(self, key):
+        """VACUUM one partition file (rewrites only that period's data)."""
+        with closing(sqlite3.connect(self.path_for(key))) as conn:
+            conn.execute("VACUUM")
+
+    def backup(self, key, target):
+        """Copy one partition to `target` with SQLite's online backup (safe while it is in use)."""
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        source = sqlite3.connect(self.path_for(key))
+        destination = sqlite3.connect(target)
+        try:
+            source.backup(destination)
+        finally:
+            destination.close()
+            source.close()
+        return target
+
+    def stats(self):
+        """Rows per table and file size of every partition."""
+        stats = []
+        for key in self.keys():
+            path = self.path_for(key)
+            with closing(sqlite3.connect(path)) as conn:
+                rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                        for table in PARTITIONED_TABLES}
+            stats.append({"key": key, "path": str(path), "bytes": path.stat().st_size, **rows})
+        return stats
+
+
+def has_table(conn, table, schema="main"):
+    """Whether `schema` (main, temp or an attached database) has a table named `table`."""
+    try:
+        row = conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    except sqlite3.OperationalError:
+        # The schema is not attached on this connection
+        return False
+    return row.fetchone() is not None
+
+
+def checkpoint(conn, mode="PASSIVE"):
+    """
+    Copy committed WAL frames back into the main database file.
+
+    PASSIVE never blocks readers or writers; TRUNCATE also resets the WAL file
+    to zero bytes but waits for readers to finish.
+
+    Returns:
+        tuple: (busy, wal_frames, checkpointed_frames)
+    """
+    mode = mode.upper()
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"Unknown checkpoint mode '{mode}'.")
+    return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+
+class CheckpointScheduler(threading.Thread):
+    """
+    Background thread that checkpoints a WAL database on a fixed interval.
+
+    Auto-checkpoints only run on commit, so a quiet period after a burst of
+    writes can leave a large WAL behind; this keeps it short. Every
+    ``truncate_every`` runs a TRUNCATE checkpoint shrinks the file again.
+    """
+
+    def __init__(self, db_path=DB_PATH, interval_seconds=60, truncate_every=10):
+        super().__init__(name="sqlite-checkpoint", daemon=True)
+        self.db_path = db_path
+        self.interval_seconds = interval_seconds
+        self.truncate_every = truncate_every
+        self.runs = 0
+        self.last_result = None
+        self._stop_event = threading.Event()
 
+    def run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            self.runs += 1
+            mode = "TRUNCATE" if self.truncate_every and self.runs % self.truncate_every == 0 else "PASSIVE"
+            try:
+                with connection(self.db_path) as conn:
+                    self.last_result = checkpoint(conn, mode)
+            except sqlite3.Error as e:
+                print(f"Checkpoint of {self.db_path} failed: {e}")
 
+    def stop(self):
+        self._stop_event.set()
 
 
+def schedule_checkpoints(db_path=DB_PATH, interval_seconds=60, truncate_every=10):
+    """Start (and return) a background CheckpointScheduler for a database."""
+    scheduler = CheckpointScheduler(db_path, interval_seconds, truncate_every)
+    scheduler.start()
+    return scheduler
 
 
+def pool_stats():
+    """Statistics for every pool opened in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
 
 
+def close_all_pools():
+    """Close every pooled connection, e.g. at interpreter shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
 
 
+atexit.register(close_all_pools)
@@ -0,0 +1,71 @@
+##Purpose**: Declared pandas dtypes for the domain tables' low-cardinality columns
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+from app.timestamps import TIMESTAMP_COLUMNS, typed_frame
+
+# Columns with a handful of distinct values, loaded as pandas "category":
+# one small integer code per row plus a single copy of each distinct string,
+# so value_counts / crosstab / filters compare integers instead of strings.
+CATEGORY_COLUMNS = {
+    "cyber_incidents": ["severity", "category", "status"],
+    "it_tickets": ["priority", "status", "assigned_to"],
+    "metadata": ["uploaded_by"],
+}
+
+# Columns whose values have a natural order; they load as ordered
+# categories so sorting and comparisons follow it (unknown values go last)
+CATEGORY_ORDERS = {
+    "severity": ["Low", "Medium", "High", "Critical"],
+    "priority": ["Low", "Medium", "High", "Critical"],
+}
+
+
+def category_dtype(column, values):
+    """CategoricalDtype for `column` covering `values` (declared order first, if any)."""
+    present = pd.unique(pd.Series(values).dropna())
+    order = CATEGORY_ORDERS.get(column)
+    if order is None:
+        return CategoricalDtype(sorted(present))
+    extra = sorted(value for value in present if value not in order)
+    return CategoricalDtype(order + extra, ordered=True)
+
+
+def categorize(df, table):
+    """Convert the declared category columns of a frame in place and return it."""
+    for column in CATEGORY_COLUMNS.get(table, ()):
+        if column in df.columns and not isinstance(df[column].dtype, CategoricalDtype):
+            # One factorize pass over the strings, then a cheap recode of the integer codes
+            codes = df[column].astype("category")
+            dtype = category_dtype(column, codes.cat.categories)
+            df[column] = codes.cat.set_categories(dtype.categories, ordered=dtype.ordered)
+    return df
+
+
+def domain_frame(df, table):
+    """Apply every declared dtype of `table` (typed timestamps, categories) to a freshly read frame."""
+    if table in TIMESTAMP_COLUMNS:
+        typed_frame(df, table)
+    return categorize(df, table)
+
+
+def align_categories(*frames):
+    """
+    Give the category columns of several frames the same categories (in place).
+
+    pd.concat keeps a category column only when every piece has identical
+    categories; otherwise it falls back to object strings.
+    """
+    columns = set.intersection(*(
+        {column for column in frame.columns if isinstance(frame[column].dtype, CategoricalDtype)}
+        for frame in frames
+    ))
+    for column in columns:
+        dtypes = [frame[column].dtype for frame in frames]
+        if all(dtype == dtypes[0] for dtype in dtypes):
+            continue
+        categories = category_dtype(column, [value for dtype in dtypes for value in dtype.categories])
+        for frame in frames:
+            frame[column] = frame[column].cat.set_categories(categories.categories, ordered=categories.ordered)
+    return frames
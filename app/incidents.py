@@ -1,101 +1,97 @@
 ##Purpose**: All functions for managing cyber incidents
 
-import pandas as pd
-#from app.db import DATA_DIR
-import sqlite3
+from app.bulk import DEFAULT_BATCH_SIZE
+from app.csv_migration import DEFAULT_MEMORY_BUDGET
+from app.db import DATA_DIR, borrow
+from app.repository import IncidentRepository, incidents
+
+INCIDENT_COLUMNS = list(IncidentRepository.columns)
+
 
 # CREATE / Insert
 def insert_incident(conn, incident_id, timestamp, severity, category, status, description):
     """Insert a new cyber incident based on the CSV schema."""
-    cursor = conn.cursor()
+    with borrow(conn) as conn:
+        incidents.insert(conn, incident_id=incident_id, timestamp=timestamp, severity=severity,
+                         category=category, status=status, description=description)
 
-    cursor.execute("""
-        INSERT INTO cyber_incidents 
-        (incident_id, timestamp, severity, category, status, description)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (incident_id, timestamp, severity, category, status, description))
+    return incident_id
 
-    conn.commit()
-    conn.close()
+# MIGRATE from CSV
+def migrate_all_incidents(conn, filepath=DATA_DIR / "cyber_incidents.csv", memory_budget_bytes=DEFAULT_MEMORY_BUDGET, resume=True):
+    """Stream cyber_incidents.csv into the database, resuming from the last checkpoint."""
+    return incidents.migrate_csv(filepath, memory_budget_bytes=memory_budget_bytes, resume=resume, conn=conn)
 
-    return incident_id
+# Bulk insert
+def insert_incidents_bulk(conn, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insert many incidents in chunked transactions.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        rows: Iterable of tuples/dicts in INCIDENT_COLUMNS order, or a DataFrame
+        batch_size: Rows per transaction
+
+    Returns:
+        dict: inserted / skipped / failed counts; duplicate IDs are listed
+        under "conflicts" and do not abort the rest of the batch
+    """
+    return incidents.insert_many(rows, batch_size, conn=conn)
 
-#def migrate_all_incidents(conn, filepath=DATA_DIR / "cyber_incidents.csv"):
- #  if not filepath.exists():
-#print(f"File not found: {filepath}")
-#print("   No incidents to migrate.")
-#return
-
-    
-    
-#try:
-#        cyber_incidents_data = pd.read_csv(filepath)
- #       num_rows = cyber_incidents_data.shape[0]
-  #      cyber_incidents_data.to_sql('cyber_incidents',conn,if_exists='append',index=False)
-   #     print(f"Migrated {num_rows} cyber_incidents from {filepath.name}")
-    
-#    except Exception as e:
-    #    print(f"Error migrating incidents: {e}")
-    
-    #finally:
-     #   conn.close()
-    
 # READ
-def get_all_incidents(conn):
+def get_all_incidents(conn=None):
     """Get all incidents as DataFrame."""
-
-    df = pd.read_sql_query(
-        "SELECT * FROM cyber_incidents",
-        conn
-    )
-    conn.close()
-    return df
+    return incidents.frame(conn=conn)
 
 # UPDATE
 def update_incident_status(conn, incident_id, new_status):
     """ Update the status of an incident.  """
-    cursor = conn.cursor()
-
-
-    update_query = "UPDATE cyber_incidents SET status = ? WHERE incidents_id = ?"
-    cursor.execute(update_query, (new_status, incident_id))
-
-    if cursor.rowcount > 0:
-        conn.commit()
-        print(f"Updated status for incident ID {incident_id} to '{new_status}'.")
-    
-        cursor.execute("SELECT * FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
-        update_record = cursor.fetchone()
-        print(f"Updated record details: {update_record}")
-    else:
-        print(f"Warning: No incident found with ID {incident_id}.")
-    conn.close()
+    with borrow(conn) as conn:
+        if incidents.update(incident_id, conn, status=new_status) > 0:
+            print(f"Updated status for incident ID {incident_id} to '{new_status}'.")
+            print(f"Updated record details: {incidents.get(incident_id, conn=conn)}")
+        elif incidents.is_archived(incident_id, conn):
+            print(f"Warning: Incident ID {incident_id} is archived and read-only; status not changed.")
+        else:
+            print(f"Warning: No incident found with ID {incident_id}.")
 
 # DELETE
 def delete_incident(conn, incident_id):
     """Delete an incident from the database"""
-    cursor = conn.cursor()
-
-    # Define the DELETE query
-    delete_query = "DELETE FROM cyber_incidents WHERE incident_id = ?"
-        
-    # Execute the query
-    cursor.execute(delete_query, (incident_id,))
-        
-    rows_deleted = cursor.rowcount
-    
-     # 5. Commit the changes
-    if rows_deleted > 0:
-        conn.commit()
-        print(f"Successfully deleted {rows_deleted} incident(s) with ID: {incident_id}")
-    else:
-        print(f"No incident found with ID: {incident_id}. Nothing deleted.")
-            
-     # 6. Ensure the connection is closed
-    if conn:
-        conn.close()
-
-
-
-
-    # Part 8 . Analytical Queries (The Big 6)
+    with borrow(conn) as conn:
+        rows_deleted = incidents.delete(incident_id, conn)
+
+        if rows_deleted > 0:
+            print(f"Successfully deleted {rows_deleted} incident(s) with ID: {incident_id}")
+        elif incidents.is_archived(incident_id, conn):
+            print(f"Incident ID {incident_id} is archived and read-only. Nothing deleted.")
+        else:
+            print(f"No incident found with ID: {incident_id}. Nothing deleted.")
+
+
+# BULK UPDATE / DELETE (one statement, one transaction)
+def update_incident_status_bulk(conn, new_status, incident_ids=None, filters=None):
+    """
+    Set the status of many incidents at once.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        new_status: Status to set
+        incident_ids: IDs to update
+        filters: dict of column -> value or list of values the incidents must match
+
+    Returns:
+        int: Number of incidents updated
+    """
+    with borrow(conn) as conn:
+        updated = incidents.update_many(incident_ids, filters, conn, status=new_status)
+    print(f"Updated status of {updated} incident(s) to '{new_status}'.")
+    return updated
+
+
+def delete_incidents_bulk(conn, incident_ids=None, filters=None):
+    """Delete many incidents (by ID list and/or filters, as above). Returns the number deleted."""
+    with borrow(conn) as conn:
+        rows_deleted = incidents.delete_many(incident_ids, filters, conn)
+    print(f"Successfully deleted {rows_deleted} incident(s).")
+    return rows_deleted
@@ -0,0 +1,427 @@
+##Purpose**: Parallel CSV ingestion for multi-GB incident and ticket exports
+#
+# The file is cut into byte ranges that end on line boundaries. A process
+# pool parses and validates the ranges and puts batches of rows on a bounded
+# queue; the calling process is the single writer and commits them in large
+# transactions. Workers block when the queue is full, so memory stays at
+# about QUEUE_BATCHES * BATCH_ROWS rows however big the file is.
+#
+# Row-by-row, the summary, rollup, FTS and change-feed triggers cost more
+# than parsing. Each writer transaction therefore stages its rows in a TEMP
+# table, drops those INSERT triggers, does their work with one set-based
+# statement each, inserts the rows and re-creates the triggers before it
+# commits. Other connections never see the triggers missing. Rows whose key
+# is already in the archive (see app.archive) are dropped from the staging
+# table first, so archived rows are not loaded back into the hot table.
+#
+# Ranges are cut at the first newline after each split point, so a quoted
+# field containing a newline can be cut in two. Such records fail validation
+# (wrong field count) and are reported instead of loaded; use
+# migrate_csv() for exports with multi-line fields.
+#
+#     python -m app.ingest export.csv cyber_incidents [path/to/database.db] [--workers 4] [--parse-only]
+
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import queue
+import time
+from pathlib import Path
+
+from app.archive import drop_archived
+from app.changes import CHANGE_KEYS
+from app.db import DB_PATH, borrow, connection
+from app.repository import datasets, incidents, tickets
+from app.rollups import ROLLUP_TABLES
+from app.rollups import count_rows_into as count_into_rollup
+from app.search import SEARCH_TABLES
+from app.summary_tables import SUMMARY_TABLES
+from app.summary_tables import count_rows_into as count_into_summary
+
+# Table -> repository giving its columns, key and row normalization
+REPOSITORIES = {repository.table: repository for repository in (incidents, tickets, datasets)}
+
+# Target size of the byte range each parse task reads
+SPLIT_BYTES = 16 * 1024 * 1024
+
+# Rows per batch a worker puts on the queue
+BATCH_ROWS = 20_000
+
+# Batches waiting for the writer before the workers block
+QUEUE_BATCHES = 8
+
+# Rows per writer transaction
+COMMIT_ROWS = 500_000
+
+# Rejected records kept (per parse task) to show in the report
+INVALID_SAMPLES = 5
+
+# Seconds the writer waits on the queue before checking the workers are alive
+POLL_SECONDS = 1.0
+
+_worker = {}
+
+
+def split_ranges(filepath, split_bytes=SPLIT_BYTES, start=0):
+    """(start, end) byte ranges covering the file from `start`, each ending just after a newline."""
+    size = Path(filepath).stat().st_size
+    ranges = []
+    with open(filepath, "rb") as f:
+        while start < size:
+            end = start + split_bytes
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            end = min(end, size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _init_worker(batches, filepath, table, positions, width, encoding, batch_rows):
+    _worker.update(batches=batches, filepath=filepath, repository=REPOSITORIES[table], positions=positions,
+                   width=width, encoding=encoding, batch_rows=batch_rows)
+
+
+def _parse_range(byte_range):
+    """
+    Parse one byte range in a worker, putting batches of valid rows on the queue.
+
+    A record is valid if it has the header's field count and an integer key.
+    Always ends with a ("done", stats) message, or ("error", text) if the
+    range could not be read.
+    """
+    batches = _worker["batches"]
+    try:
+        started = time.perf_counter()
+        repository, positions, width = _worker["repository"], _worker["positions"], _worker["width"]
+        key_position = repository.columns.index(repository.key)
+        start, end = byte_range
+        with open(_worker["filepath"], "rb") as f:
+            f.seek(start)
+            text = f.read(end - start).decode(_worker["encoding"])
+
+        rows, invalid, samples = 0, 0, []
+        blocked = 0.0
+        batch = []
+        for record in csv.reader(io.StringIO(text, newline="")):
+            if not record:
+                continue
+            try:
+                if len(record) != width:
+                    raise ValueError("wrong field count")
+                row = [(record[i] if record[i] != "" else None) for i in positions]
+                row[key_position] = int(row[key_position])
+                row = repository._normalize_row(row)
+            except (TypeError, ValueError):
+                invalid += 1
+                if len(samples) < INVALID_SAMPLES:
+                    samples.append(",".join(record)[:200])
+                continue
+            batch.append(row)
+            rows += 1
+            if len(batch) >= _worker["batch_rows"]:
+                put_started = time.perf_counter()
+                batches.put(("rows", batch))
+                blocked += time.perf_counter() - put_started
+                batch = []
+        if batch:
+            put_started = time.perf_counter()
+            batches.put(("rows", batch))
+            blocked += time.perf_counter() - put_started
+
+        seconds = time.perf_counter() - started
+        batches.put(("done", {"rows": rows, "invalid": invalid, "samples": samples, "bytes": end - start,
+                              "parse_seconds": seconds - blocked, "blocked_seconds": blocked}))
+    except Exception as e:
+        batches.put(("error", f"bytes {byte_range[0]}-{byte_range[1]}: {e!r}"))
+
+
+def replaced_triggers(conn, table):
+    """
+    (name, sql, kind, target) of the INSERT triggers on `table` whose work the writer does set-based.
+
+    Keyed by what each one maintains; triggers not created (older schemas)
+    are simply absent, and any other trigger on the table keeps firing.
+    """
+    expected = {}
+    for name, (base, _, _) in SUMMARY_TABLES.items():
+        if base == table:
+            expected[f"trg_{name}_insert"] = ("summary", name)
+    for name, (base, _, _) in ROLLUP_TABLES.items():
+        if base == table:
+            expected[f"trg_{name}_insert"] = ("rollup", name)
+    if table in SEARCH_TABLES:
+        expected[f"trg_{SEARCH_TABLES[table][0]}_insert"] = ("search", SEARCH_TABLES[table][0])
+    if table in CHANGE_KEYS:
+        expected[f"trg_{table}_changes_insert"] = ("changes", table)
+
+    rows = conn.execute("SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+                        (table,)).fetchall()
+    return [(name, sql, *expected[name]) for name, sql in rows if name in expected]
+
+
+def create_staging_table(conn, table, key):
+    """TEMP table with the target's columns, declared types and key (so duplicates collapse as they would in it)."""
+    staging = f"ingest_{table}"
+    columns = conn.execute(f"PRAGMA main.table_info({table})").fetchall()
+    definitions = ", ".join(f"{name} {declared_type}" for _, name, declared_type, *_ in columns)
+    conn.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+    conn.execute(f"CREATE TEMP TABLE {staging} ({definitions}, PRIMARY KEY ({key}))")
+    conn.commit()
+    return f"temp.{staging}"
+
+
+def staging_insert_sql(staging, columns, key, on_conflict):
+    """executemany() statement adding rows to the staging table; a repeated key keeps the first or last row."""
+    sql = f"INSERT INTO {staging} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) ON CONFLICT({key}) "
+    if on_conflict == "ignore":
+        return sql + "DO NOTHING"
+    return sql + "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in columns if column != key)
+
+
+def flush_staging(conn, table, key, columns, staging, triggers, on_conflict):
+    """
+    Move the staged rows into `table` in one BEGIN IMMEDIATE transaction.
+
+    New rows (keys not yet in the table) are counted into the summary and
+    rollup tables, indexed and logged in the change feed set-based, with
+    the triggers that would have done it row by row dropped for the
+    duration. Existing rows are left alone or, with "update", overwritten
+    where a value differs (their UPDATE triggers still fire).
+
+    Returns:
+        tuple: (rows inserted, existing rows updated)
+    """
+    column_list = ", ".join(columns)
+    new = f"{key} NOT IN (SELECT {key} FROM main.{table})"
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        conn.commit()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        inserted = cursor.execute(f"SELECT COUNT(*) FROM {staging} WHERE {new}").fetchone()[0]
+        for name, _, kind, target in triggers:
+            cursor.execute(f"DROP TRIGGER {name}")
+            if kind == "summary":
+                count_into_summary(cursor, target, staging, new)
+            elif kind == "rollup":
+                count_into_rollup(cursor, target, staging, new)
+            elif kind == "search":
+                cursor.execute(f"INSERT INTO {target} (rowid, description) "
+                               f"SELECT {key}, description FROM {staging} WHERE {new}")
+            elif kind == "changes":
+                cursor.execute(f"INSERT INTO changes (table_name, row_id, op) "
+                               f"SELECT '{table}', {key}, 'insert' FROM {staging} WHERE {new} ORDER BY {key}")
+        conflict = "DO NOTHING"
+        if on_conflict == "update":
+            values = [column for column in columns if column != key]
+            conflict = (f"DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in values)} "
+                        f"WHERE ({', '.join(values)}) IS NOT ({', '.join(f'excluded.{column}' for column in values)})")
+        # WHERE true: without it SQLite would read ON CONFLICT as a join constraint
+        written = cursor.execute(f"INSERT INTO main.{table} ({column_list}) SELECT {column_list} FROM {staging} "
+                                 f"WHERE true ON CONFLICT({key}) {conflict}").rowcount
+        for _, sql, _, _ in triggers:
+            cursor.execute(sql)
+        cursor.execute(f"DELETE FROM {staging}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return inserted, written - inserted
+
+
+def ingest_csv(conn, filepath, table, workers=None, split_bytes=SPLIT_BYTES, batch_rows=BATCH_ROWS,
+               queue_batches=QUEUE_BATCHES, commit_rows=COMMIT_ROWS, on_conflict="ignore", encoding="utf-8",
+               parse_only=False):
+    """
+    Load a large CSV export into `table` with a pool of parse workers and one writer.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        filepath: CSV file whose header names the table columns
+        table: Target table (a key of REPOSITORIES)
+        workers: Parse processes (default: one per CPU)
+        split_bytes: Target bytes per parse task
+        batch_rows: Rows per batch on the queue
+        queue_batches: Queue bound, in batches
+        commit_rows: Rows per writer transaction
+        on_conflict: "ignore" keeps existing rows, "update" overwrites them
+        encoding: CSV text encoding
+        parse_only: Parse and validate but discard the rows (measures the parse phase alone)
+
+    Returns:
+        dict: Row counts (written, already present, archived and so
+        skipped, rejected), rejected samples and seconds/throughput per
+        stage (split, parse, write), or None if the file does not exist
+    """
+    if on_conflict not in ("ignore", "update"):
+        raise ValueError("on_conflict must be 'ignore' or 'update'")
+    filepath = Path(filepath)
+    if not filepath.exists():
+        print(f"File not found: {filepath}")
+        return None
+    repository = REPOSITORIES[table]
+    columns, key = list(repository.columns), repository.key
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    with open(filepath, "rb") as f:
+        header_line = f.readline()
+    header = next(csv.reader([header_line.decode(encoding).lstrip("\ufeff")]))
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError(f"{filepath.name} is missing column(s): {', '.join(missing)}")
+    positions = [header.index(column) for column in columns]
+    ranges = split_ranges(filepath, split_bytes, start=len(header_line))
+    split_seconds = time.perf_counter() - started
+
+    totals = {"rows": 0, "invalid": 0, "bytes": 0, "parse_seconds": 0.0, "blocked_seconds": 0.0}
+    samples = []
+    inserted = archived = staged = 0
+    write_seconds = wait_seconds = 0.0
+    parse_started = time.perf_counter()
+    parse_finished = parse_started
+
+    with borrow(conn) as conn:
+        if not parse_only:
+            staging = create_staging_table(conn, table, key)
+            triggers = replaced_triggers(conn, table)
+            stage_sql = staging_insert_sql(staging, columns, key, on_conflict)
+
+        batches = multiprocessing.Queue(maxsize=queue_batches)
+        pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                    initargs=(batches, str(filepath), table, positions, len(header), encoding,
+                                              batch_rows))
+        try:
+            tasks = pool.map_async(_parse_range, ranges)
+            finished = 0
+            while finished < len(ranges):
+                waited = time.perf_counter()
+                try:
+                    kind, payload = batches.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    wait_seconds += time.perf_counter() - waited
+                    if tasks.ready() and not tasks.successful():
+                        tasks.get()
+                    continue
+                wait_seconds += time.perf_counter() - waited
+
+                if kind == "error":
+                    raise RuntimeError(f"Parsing {filepath.name} failed at {payload}")
+                if kind == "done":
+                    finished += 1
+                    for name in totals:
+                        totals[name] += payload[name]
+                    samples.extend(payload["samples"][:INVALID_SAMPLES - len(samples)])
+                    parse_finished = time.perf_counter()
+                    continue
+                if parse_only:
+                    continue
+
+                write_started = time.perf_counter()
+                conn.executemany(stage_sql, payload)
+                conn.commit()
+                staged += len(payload)
+                if staged >= commit_rows:
+                    archived += drop_archived(conn, table, staging)
+                    inserted += flush_staging(conn, table, key, columns, staging, triggers, on_conflict)[0]
+                    staged = 0
+                write_seconds += time.perf_counter() - write_started
+
+            if staged:
+                write_started = time.perf_counter()
+                archived += drop_archived(conn, table, staging)
+                inserted += flush_staging(conn, table, key, columns, staging, triggers, on_conflict)[0]
+                write_seconds += time.perf_counter() - write_started
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+            if not parse_only:
+                conn.execute(f"DROP TABLE IF EXISTS {staging}")
+                conn.commit()
+
+    elapsed = time.perf_counter() - started
+    parse_wall = parse_finished - parse_started
+    rows = totals["rows"]
+
+    def rate(seconds):
+        return round(rows / seconds) if seconds else 0
+
+    report = {
+        "table": table,
+        "rows_read": rows,
+        "rows_invalid": totals["invalid"],
+        "invalid_samples": samples,
+        "rows_written": inserted,
+        "rows_existing": 0 if parse_only else rows - inserted - archived,
+        "rows_archived": archived,
+        "workers": workers,
+        "ranges": len(ranges),
+        "split": {"seconds": round(split_seconds, 3)},
+        "parse": {
+            "seconds": round(parse_wall, 3),
+            "rows_per_sec": rate(parse_wall),
+            # What one worker manages while parsing (time blocked on a full queue excluded)
+            "rows_per_sec_per_worker": rate(totals["parse_seconds"]),
+            "worker_seconds": round(totals["parse_seconds"], 3),
+            "blocked_seconds": round(totals["blocked_seconds"], 3),
+            "mb_per_sec": round(totals["bytes"] / 1e6 / parse_wall, 1) if parse_wall else 0,
+        },
+        "write": {
+            "seconds": round(write_seconds, 3),
+            "rows_per_sec": rate(write_seconds),
+            "waiting_seconds": round(wait_seconds, 3),
+        },
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": rate(elapsed),
+    }
+    print(f"Ingested {inserted} {table} from {filepath.name} "
+          f"({report['rows_existing']} already present, {archived} archived, {totals['invalid']} rejected, "
+          f"{report['rows_per_sec']:,} rows/sec)")
+    return report
+
+
+def format_report(report):
+    """Readable per-stage throughput lines for an ingest_csv() result."""
+    parse, write = report["parse"], report["write"]
+    lines = [
+        f"{report['table']}: {report['rows_read']:,} rows read, {report['rows_written']:,} written, "
+        f"{report['rows_existing']:,} already present, {report['rows_archived']:,} archived (skipped), "
+        f"{report['rows_invalid']:,} rejected",
+        f"  split  {report['split']['seconds']:>8.2f}s  {report['ranges']} ranges",
+        f"  parse  {parse['seconds']:>8.2f}s  {parse['rows_per_sec']:>10,} rows/s  {parse['mb_per_sec']} MB/s  "
+        f"({report['workers']} workers at {parse['rows_per_sec_per_worker']:,} rows/s each, "
+        f"{parse['blocked_seconds']:.1f}s blocked on the queue)",
+        f"  write  {write['seconds']:>8.2f}s  {write['rows_per_sec']:>10,} rows/s  "
+        f"({write['waiting_seconds']:.1f}s waiting for batches)",
+        f"  total  {report['seconds']:>8.2f}s  {report['rows_per_sec']:>10,} rows/s",
+    ]
+    lines += [f"  rejected: {sample}" for sample in report["invalid_samples"]]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # create_all_tables rather than ensure_schema, which would also start the background threads
+    from app.schema import create_all_tables
+
+    parser = argparse.ArgumentParser(description="Load a large CSV export with parallel parse workers.")
+    parser.add_argument("csv")
+    parser.add_argument("table", choices=sorted(REPOSITORIES))
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="parse processes (default: one per CPU)")
+    parser.add_argument("--commit-rows", type=int, default=COMMIT_ROWS, help="rows per writer transaction")
+    parser.add_argument("--update", action="store_true", help="overwrite existing rows instead of keeping them")
+    parser.add_argument("--parse-only", action="store_true", help="parse and validate without writing")
+    args = parser.parse_args()
+
+    with connection(args.db) as conn:
+        create_all_tables(conn)
+        result = ingest_csv(conn, args.csv, args.table, workers=args.workers, commit_rows=args.commit_rows,
+                            on_conflict="update" if args.update else "ignore", parse_only=args.parse_only)
+    if result:
+        print(format_report(result))
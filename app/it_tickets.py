@@ -1,99 +1,96 @@
+from app.bulk import DEFAULT_BATCH_SIZE
+from app.csv_migration import DEFAULT_MEMORY_BUDGET
+from app.db import DATA_DIR, borrow
+from app.repository import TicketRepository, tickets
 
-import pandas as pd
-# from app.db import connect_database, DATA_DIR
-import sqlite3
-
+TICKET_COLUMNS = list(TicketRepository.columns)
 
 
 # Insert
 def insert_it_tickets(conn, ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours):
     """Insert a new it ticket based on the CSV schema."""
-    cursor = conn.cursor()
+    with borrow(conn) as conn:
+        tickets.insert(conn, ticket_id=ticket_id, priority=priority, description=description, status=status,
+                       assigned_to=assigned_to, created_at=created_at, resolution_time_hours=resolution_time_hours)
 
-    cursor.execute("""
-        INSERT INTO it_tickets 
-        (ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours))
+    return ticket_id
 
-    conn.commit()
-    conn.close()
+# Migrate from CSV
+def migrate_it_tickets(conn, filepath=DATA_DIR / "it_tickets.csv", memory_budget_bytes=DEFAULT_MEMORY_BUDGET, resume=True):
+    """Stream it_tickets.csv into the database, resuming from the last checkpoint."""
+    return tickets.migrate_csv(filepath, memory_budget_bytes=memory_budget_bytes, resume=resume, conn=conn)
 
-    return ticket_id
+# Bulk insert
+def insert_it_tickets_bulk(conn, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insert many it tickets in chunked transactions.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        rows: Iterable of tuples/dicts in TICKET_COLUMNS order, or a DataFrame
+        batch_size: Rows per transaction
+
+    Returns:
+        dict: inserted / skipped / failed counts; duplicate IDs are listed
+        under "conflicts" and do not abort the rest of the batch
+    """
+    return tickets.insert_many(rows, batch_size, conn=conn)
 
-'''
-def migrate_it_tickets(conn, filepath=DATA_DIR / "it_tickets.csv"):
-    if not filepath.exists():
-        print(f"File not found: {filepath}")
-        print("   No incidents to migrate.")
-        return
-
-    conn = connect_database()
-    
-    try:
-        metadata_data = pd.read_csv(filepath)
-        num_rows = metadata_data.shape[0]
-        metadata_data.to_sql('it_tickets',conn,if_exists='append',index=False)
-        print(f"Migrated {num_rows} it_tickets from {filepath.name}")
-    
-    except Exception as e:
-        print(f"Error migrating it_tickets: {e}")
-    
-    finally:
-        conn.close()
-'''
-    
-    
-def get_all_it_tickets(conn):
+
+def get_all_it_tickets(conn=None):
     """Get all tickets as DataFrame."""
-    df = pd.read_sql_query(
-        "SELECT * FROM it_tickets",
-        conn
-    )
-    conn.close()
-    return df
+    return tickets.frame(conn=conn)
 
 # UPDATE
 def update_ticket_status(conn, ticket_id, updated_status):
     """ Update the status of an ticket.  """
-    cursor = conn.cursor()
-
-
-    update_query = "UPDATE it_tickets SET status = ? WHERE ticket_id = ?"
-    cursor.execute(update_query, (updated_status, ticket_id))
-
-    if cursor.rowcount > 0:
-        conn.commit()
-        print(f"Updated status for ticket ID {ticket_id} to '{updated_status}'.")
-    
-        cursor.execute("SELECT * FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
-        update_record = cursor.fetchone()
-        print(f"Updated record details: {update_record}")
-    else:
-        print(f"Warning: No ticket found with ID {ticket_id}.")
-    conn.close()
+    with borrow(conn) as conn:
+        if tickets.update(ticket_id, conn, status=updated_status) > 0:
+            print(f"Updated status for ticket ID {ticket_id} to '{updated_status}'.")
+            print(f"Updated record details: {tickets.get(ticket_id, conn=conn)}")
+        elif tickets.is_archived(ticket_id, conn):
+            print(f"Warning: Ticket ID {ticket_id} is archived and read-only; status not changed.")
+        else:
+            print(f"Warning: No ticket found with ID {ticket_id}.")
 
 
 # DELETE
 def delete_ticket(conn, ticket_id):
     """Delete an ticket from the database"""
-    cursor = conn.cursor()
-
-    # Define the DELETE query
-    delete_query = "DELETE FROM it_tickets WHERE ticket_id = ?"
-        
-    # Execute the query
-    cursor.execute(delete_query, (ticket_id,))
-        
-    rows_deleted = cursor.rowcount
-    
-     # 5. Commit the changes
-    if rows_deleted > 0:
-        conn.commit()
-        print(f"Successfully deleted {rows_deleted} incident(s) with ID: {ticket_id}")
-    else:
-        print(f"No incident found with ID: {ticket_id}. Nothing deleted.")
-            
-     # 6. Ensure the connection is closed
-    if conn:
-        conn.close()
+    with borrow(conn) as conn:
+        rows_deleted = tickets.delete(ticket_id, conn)
+
+        if rows_deleted > 0:
+            print(f"Successfully deleted {rows_deleted} ticket(s) with ID: {ticket_id}")
+        elif tickets.is_archived(ticket_id, conn):
+            print(f"Ticket ID {ticket_id} is archived and read-only. Nothing deleted.")
+        else:
+            print(f"No ticket found with ID: {ticket_id}. Nothing deleted.")
+
+
+# BULK UPDATE / DELETE (one statement, one transaction)
+def update_ticket_status_bulk(conn, updated_status, ticket_ids=None, filters=None):
+    """
+    Set the status of many tickets at once.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        updated_status: Status to set
+        ticket_ids: IDs to update
+        filters: dict of column -> value or list of values the tickets must match
+
+    Returns:
+        int: Number of tickets updated
+    """
+    with borrow(conn) as conn:
+        updated = tickets.update_many(ticket_ids, filters, conn, status=updated_status)
+    print(f"Updated status of {updated} ticket(s) to '{updated_status}'.")
+    return updated
+
+
+def delete_tickets_bulk(conn, ticket_ids=None, filters=None):
+    """Delete many tickets (by ID list and/or filters, as above). Returns the number deleted."""
+    with borrow(conn) as conn:
+        rows_deleted = tickets.delete_many(ticket_ids, filters, conn)
+    print(f"Successfully deleted {rows_deleted} ticket(s).")
+    return rows_deleted
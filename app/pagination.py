@@ -0,0 +1,144 @@
+##Purpose**: Keyset pagination for the dashboards' raw data tables
+
+import pandas as pd
+
+from app.analytics import table_columns
+from app.archive import ARCHIVE_TABLES, archive_files
+from app.db import borrow
+from app.summary_tables import summary_table_for
+from app.timestamps import typed_frame
+
+# Primary key each table is paged on (also the tie-breaker for other sort orders)
+PAGE_KEYS = {
+    "it_tickets": "ticket_id",
+    "cyber_incidents": "incident_id",
+    "metadata": "dataset_id",
+}
+
+DEFAULT_PAGE_SIZE = 50
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def _nullable_columns(conn, table):
+    """Columns of `table` that may hold NULL, from the schema (the primary key never does)."""
+    return {name for _, name, _, notnull, _, pk in conn.execute(f"PRAGMA table_info({table})") if not notnull and not pk}
+
+
+def _after_cursor(column, key, cursor, descending, nullable):
+    """
+    WHERE clause and parameters for the rows after a (sort value, key) cursor.
+
+    SQLite sorts NULLs first ascending and last descending, and a row-value
+    comparison with NULL is never true, so NULL sort values get their own
+    branch: otherwise paging would stop at the first row without a value.
+    """
+    value, last_key = cursor
+    compare = "<" if descending else ">"
+    if value is None:
+        where = f"({column} IS NULL AND {key} {compare} ?)"
+        if not descending:
+            where += f" OR {column} IS NOT NULL"
+        return f"WHERE {where}", [last_key]
+    where = f"({column}, {key}) {compare} (?, ?)"
+    if descending and nullable:
+        where += f" OR {column} IS NULL"
+    return f"WHERE {where}", [value, last_key]
+
+
+def fetch_page(conn, table, page_size=DEFAULT_PAGE_SIZE, sort_column=None, descending=False, after=None, columns=None):
+    """
+    Fetch one page of rows ordered by `sort_column`, then by the primary key.
+
+    Instead of OFFSET (which reads and discards every earlier row) the page
+    starts strictly after a cursor - the (sort value, key) of the last row of
+    the previous page - so each page costs an index seek plus `page_size` rows.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        table: Table name (see PAGE_KEYS)
+        page_size: Rows per page
+        sort_column: Column to sort by (defaults to the primary key)
+        descending: Sort largest first
+        after: Cursor returned for the previous page, or None for the first page
+        columns: Columns to return (defaults to all)
+
+    Returns:
+        tuple: (DataFrame, next_cursor) where next_cursor is None on the last page
+    """
+    if table not in PAGE_KEYS:
+        raise ValueError(f"No page key defined for table '{table}'")
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    key = PAGE_KEYS[table]
+
+    with borrow(conn) as conn:
+        known = table_columns(conn, table)
+        sort_column = sort_column or key
+        columns = list(columns or known)
+        unknown = [column for column in columns + [sort_column] if column not in known]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+
+        direction, compare = ("DESC", "<") if descending else ("ASC", ">")
+        select = ", ".join(dict.fromkeys(columns + [key]))
+        where, params = "", []
+        if sort_column == key:
+            order = f"{key} {direction}"
+            if after is not None:
+                where, params = f"WHERE {key} {compare} ?", [after[1]]
+        else:
+            order = f"{sort_column} {direction}, {key} {direction}"
+            if after is not None:
+                nullable = sort_column in _nullable_columns(conn, table)
+                where, params = _after_cursor(sort_column, key, after, descending, nullable)
+
+        query = f"SELECT {select}, {sort_column} AS _sort_value FROM {table} {where} ORDER BY {order} LIMIT ?"
+        params.append(page_size + 1)
+        df = pd.read_sql_query(query, conn, params=params)
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        next_cursor = (_plain(last["_sort_value"]), _plain(last[key]))
+    df = df.drop(columns=["_sort_value"])[columns].reset_index(drop=True)
+    return typed_frame(df, table), next_cursor
+
+
+def _plain(value):
+    """numpy scalar -> Python value (NaN/None -> None), so cursors bind as SQLite parameters."""
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def estimate_row_count(conn, table):
+    """
+    Cheap row count for the pager.
+
+    Uses the trigger-maintained summary table (exact) when the table has one,
+    then the planner statistics from ANALYZE/PRAGMA optimize, and only falls
+    back to COUNT(*) when neither is available. Once rows have been archived
+    the summary tables still count them, so the (small) hot table is counted
+    instead: the pager only pages hot rows.
+
+    Returns:
+        tuple: (row_count, is_exact)
+    """
+    with borrow(conn) as conn:
+        if table in ARCHIVE_TABLES and archive_files(conn):
+            return conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0], True
+
+        summary_table = summary_table_for(table)
+        if summary_table:
+            return conn.execute(f"SELECT COALESCE(SUM(n), 0) FROM {summary_table}").fetchone()[0], True
+
+        has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ).fetchone()
+        if has_stats:
+            row = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,)).fetchone()
+            if row and row[0]:
+                return int(row[0].split()[0]), False
+
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0], True
@@ -0,0 +1,315 @@
+##Purpose**: Per-statement query timings, rows and call sites, plus a slow-query log
+#
+# Off by default: pooled connections are then plain sqlite3 connections and
+# nothing here runs. enable_query_metrics() makes connections opened after
+# it time every statement (close_all_pools() re-opens the existing ones):
+#
+#     from app.query_metrics import enable_query_metrics, query_stats, slow_queries
+#     enable_query_metrics(slow_ms=50)
+#     ...
+#     query_stats(limit=10)    # slowest statements by total time
+#     slow_queries()           # recent statements over 50 ms, with their plans
+
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket holds the rest
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# Statements slower than this go to the slow-query log
+SLOW_QUERY_MS = 100
+
+# Slow queries kept in memory (oldest dropped first)
+SLOW_QUERY_LOG_SIZE = 200
+
+# Project frames recorded as a statement's call site, innermost first
+CALL_SITE_DEPTH = 2
+
+# Only statements of these kinds can be prefixed with EXPLAIN QUERY PLAN
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+# Frames in these files are skipped, so a call site names the code that asked for the query
+_SKIPPED_FILES = {str(Path(__file__).resolve()), str(Path(__file__).resolve().with_name("db.py"))}
+
+_enabled = False
+_slow_ms = SLOW_QUERY_MS
+_log_path = None
+_lock = threading.Lock()
+_statements = {}
+_slow_log = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def enable_query_metrics(slow_ms=SLOW_QUERY_MS, log_path=None):
+    """
+    Start timing statements on connections opened from now on.
+
+    Args:
+        slow_ms: Threshold for the slow-query log, in milliseconds
+        log_path: Optional file slow queries are also appended to
+    """
+    global _enabled, _slow_ms, _log_path
+    _slow_ms = slow_ms
+    _log_path = Path(log_path) if log_path else None
+    _enabled = True
+
+
+def disable_query_metrics():
+    """Stop recording (instrumented connections still open become pass-through)."""
+    global _enabled
+    _enabled = False
+
+
+def query_metrics_enabled():
+    return _enabled
+
+
+def connection_factory():
+    """Connection class the pools open: instrumented only while metrics are on."""
+    return InstrumentedConnection if _enabled else sqlite3.Connection
+
+
+def _call_site():
+    """'file:line function' of the nearest project frames outside this module and app.db."""
+    sites = []
+    frame = sys._getframe(2)
+    while frame is not None and len(sites) < CALL_SITE_DEPTH:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PROJECT_ROOT) and filename not in _SKIPPED_FILES:
+            relative = filename[len(_PROJECT_ROOT) + 1:]
+            sites.append(f"{relative}:{frame.f_lineno} {frame.f_code.co_name}")
+        frame = frame.f_back
+    return " <- ".join(sites) or "<outside the project>"
+
+
+def _explain(conn, sql, params):
+    """EXPLAIN QUERY PLAN lines for a statement, or None if it cannot be explained."""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        # A plain cursor, so the EXPLAIN itself is not recorded
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except (sqlite3.Error, ValueError):
+        return None
+    depth = {0: 0}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, 0) + 1
+        lines.append("  " * (depth[node_id] - 1) + detail)
+    return lines
+
+
+def _record(conn, sql, params, elapsed, rows, site):
+    """Add one finished statement to the per-statement metrics (and the slow log)."""
+    if not _enabled:
+        return
+    ms = elapsed * 1000
+    key = " ".join(sql.split())
+    with _lock:
+        stats = _statements.get(key)
+        if stats is None:
+            stats = _statements[key] = {
+                "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1), "call_sites": Counter(),
+            }
+        stats["calls"] += 1
+        stats["total_ms"] += ms
+        stats["max_ms"] = max(stats["max_ms"], ms)
+        stats["rows"] += max(rows, 0)
+        stats["histogram"][bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        stats["call_sites"][site] += 1
+
+    if ms < _slow_ms:
+        return
+    entry = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "sql": key,
+        "params": repr(params)[:200] if params is not None else None,
+        "ms": round(ms, 3),
+        "rows": rows,
+        "call_site": site,
+        "plan": _explain(conn, sql, params) if params is not None else None,
+    }
+    with _lock:
+        _slow_log.append(entry)
+        if _log_path is not None:
+            with open(_log_path, "a", encoding="utf-8") as log:
+                log.write(format_slow_query(entry) + "\n\n")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from execute() until its rows are used up.
+
+    Time spent fetching counts towards the statement; time the caller spends
+    between fetches does not. A statement is recorded once its rows run out,
+    at the next execute(), or when the cursor is closed or dropped.
+    """
+
+    _pending = None
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            _record(self.connection, *pending)
+
+    def execute(self, sql, parameters=(), /):
+        self._finish()
+        site = _call_site()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = time.perf_counter() - started
+        if self.description is None:
+            # Not a query: rows changed instead of rows returned
+            _record(self.connection, sql, parameters, elapsed, self.rowcount, site)
+        else:
+            self._pending = [sql, parameters, elapsed, 0, site]
+        return self
+
+    def executemany(self, sql, seq_of_parameters, /):
+        self._finish()
+        site = _call_site()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        # No single parameter set to EXPLAIN with, so no plan for these
+        _record(self.connection, sql, None, time.perf_counter() - started, self.rowcount, site)
+        return self
+
+    def executescript(self, sql_script, /):
+        self._finish()
+        site = _call_site()
+        started = time.perf_counter()
+        super().executescript(sql_script)
+        _record(self.connection, sql_script, None, time.perf_counter() - started, -1, site)
+        return self
+
+    def _fetched(self, started, count, done):
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - started
+            self._pending[3] += count
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including the ones execute() creates) are InstrumentedCursors."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script, /):
+        return self.cursor().executescript(sql_script)
+
+
+def _bucket_bound(histogram, fraction):
+    """Upper bound (ms) of the bucket holding the given fraction of calls (None = above the last bound)."""
+    target = fraction * sum(histogram)
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS + (None,), histogram):
+        seen += count
+        if seen >= target:
+            return bound
+    return None
+
+
+def query_stats(order_by="total_ms", limit=None):
+    """
+    Recorded statements, largest `order_by` first.
+
+    Each entry has the normalized SQL, calls, total/mean/max ms, rows
+    returned (or changed), the latency histogram keyed by bucket upper
+    bound, p50_ms / p95_ms (upper bound of the bucket the percentile falls
+    in) and the most frequent call sites.
+    """
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    with _lock:
+        snapshot = [(sql, dict(stats, histogram=list(stats["histogram"]), call_sites=stats["call_sites"].copy()))
+                    for sql, stats in _statements.items()]
+    result = []
+    for sql, stats in snapshot:
+        result.append({
+            "sql": sql,
+            "calls": stats["calls"],
+            "total_ms": round(stats["total_ms"], 3),
+            "mean_ms": round(stats["total_ms"] / stats["calls"], 3),
+            "max_ms": round(stats["max_ms"], 3),
+            "rows": stats["rows"],
+            "p50_ms": _bucket_bound(stats["histogram"], 0.5),
+            "p95_ms": _bucket_bound(stats["histogram"], 0.95),
+            "histogram": {label: count for label, count in zip(labels, stats["histogram"]) if count},
+            "call_sites": dict(stats["call_sites"].most_common(5)),
+        })
+    result.sort(key=lambda entry: entry[order_by], reverse=True)
+    return result[:limit] if limit else result
+
+
+def slow_queries():
+    """Statements over the slow-query threshold, oldest first (see SLOW_QUERY_LOG_SIZE)."""
+    with _lock:
+        return list(_slow_log)
+
+
+def format_slow_query(entry):
+    """Readable multi-line form of one slow_queries() entry."""
+    lines = [f"[{entry['at']}] {entry['ms']:.1f} ms, {entry['rows']} rows - {entry['call_site']}",
+             f"  {entry['sql']}"]
+    if entry["params"]:
+        lines.append(f"  params: {entry['params']}")
+    for detail in entry["plan"] or ():
+        lines.append(f"    {detail}")
+    return "\n".join(lines)
+
+
+def reset_query_metrics():
+    """Forget every recorded statement and slow query."""
+    with _lock:
+        _statements.clear()
+        _slow_log.clear()
@@ -0,0 +1,329 @@
+##Purpose**: One repository per table, shared by the CLI modules and every Streamlit page
+
+import json
+
+import pandas as pd
+
+from app.archive import ARCHIVE_TABLES, archived_row
+from app.bulk import DEFAULT_BATCH_SIZE, bulk_insert
+from app.csv_migration import DEFAULT_MEMORY_BUDGET, migrate_csv
+from app.db import DB_PATH, borrow
+from app.dtypes import domain_frame
+from app.timestamps import TIMESTAMP_COLUMNS, normalize_column
+
+
+class Record:
+    """
+    Compact row object: one slot per selected column, no per-instance __dict__.
+
+    Subclasses are made by record_type(); fields read as attributes
+    (ticket.status) and the record unpacks like the tuple it came from.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row_factory hook."""
+        return cls(*row)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __getitem__(self, index):
+        return getattr(self, self.__slots__[index])
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def _asdict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def record_type(name, columns):
+    """Create a Record subclass with one slot per column."""
+    return type(name, (Record,), {"__slots__": tuple(columns)})
+
+
+class Repository:
+    """
+    CRUD for one table with its SQL built once per repository.
+
+    Every statement string is created the first time it is needed and then
+    reused, so sqlite3's per-connection statement cache always hits and the
+    SQL is parsed once per connection. Reads name their columns through a
+    projection instead of SELECT *, and return Record objects (or a typed
+    DataFrame from frame()).
+
+    Every method takes an optional conn; without one it borrows the pooled
+    connection for the repository's database file.
+    """
+
+    table = None
+    key = None
+    columns = ()
+    # Projection name -> columns it selects ("all" is added automatically)
+    projections = {}
+    record_name = "Record"
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._statements = {}
+        self._record_types = {}
+        self._timestamp_column = TIMESTAMP_COLUMNS.get(self.table, (None, None))[0]
+
+    # --- building blocks ---
+    def _columns(self, projection):
+        if projection == "all":
+            return tuple(self.columns)
+        try:
+            return tuple(self.projections[projection])
+        except KeyError:
+            raise ValueError(f"Unknown projection '{projection}' for {self.table}") from None
+
+    def _record_type(self, projection):
+        record = self._record_types.get(projection)
+        if record is None:
+            suffix = "" if projection == "all" else projection.title().replace("_", "")
+            record = self._record_types[projection] = record_type(self.record_name + suffix, self._columns(projection))
+        return record
+
+    def _sql(self, name, build):
+        """Return the cached statement `name`, building it on first use."""
+        sql = self._statements.get(name)
+        if sql is None:
+            sql = self._statements[name] = build()
+        return sql
+
+    def _check_fields(self, fields):
+        unknown = [column for column in fields if column not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {self.table}: {', '.join(unknown)}")
+
+    def _normalize(self, column, value):
+        if column == self._timestamp_column:
+            return normalize_column(self.table, value)
+        return value
+
+    def _normalize_row(self, row):
+        return tuple(self._normalize(column, value) for column, value in zip(self.columns, row))
+
+    def _connect(self, conn=None):
+        return borrow(conn, self.db_path)
+
+    # --- reads ---
+    def get(self, key, projection="all", conn=None):
+        """One record by primary key (looked up in the archive too, see app.archive), or None."""
+        sql = self._sql(("get", projection), lambda: (
+            f"SELECT {', '.join(self._columns(projection))} FROM {self.table} WHERE {self.key} = ?"
+        ))
+        with self._connect(conn) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = self._record_type(projection).from_row
+            record = cursor.execute(sql, (key,)).fetchone()
+            if record is None and self.table in ARCHIVE_TABLES:
+                row = archived_row(conn, self.table, key, self._columns(projection))
+                record = self._record_type(projection)(*row) if row is not None else None
+            return record
+
+    def exists(self, key, conn=None):
+        sql = self._sql("exists", lambda: f"SELECT 1 FROM {self.table} WHERE {self.key} = ?")
+        with self._connect(conn) as conn:
+            return conn.execute(sql, (key,)).fetchone() is not None
+
+    def is_archived(self, key, conn=None):
+        """Whether the row has been moved to the archive, where it is read-only."""
+        if self.table not in ARCHIVE_TABLES:
+            return False
+        with self._connect(conn) as conn:
+            return archived_row(conn, self.table, key, [self.key]) is not None
+
+    def count(self, conn=None):
+        sql = self._sql("count", lambda: f"SELECT COUNT(*) FROM {self.table}")
+        with self._connect(conn) as conn:
+            return conn.execute(sql).fetchone()[0]
+
+    def all(self, projection="all", conn=None):
+        """Every row as a list of records, in primary-key order."""
+        sql = self._sql(("all", projection), lambda: (
+            f"SELECT {', '.join(self._columns(projection))} FROM {self.table} ORDER BY {self.key}"
+        ))
+        with self._connect(conn) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = self._record_type(projection).from_row
+            return cursor.execute(sql).fetchall()
+
+    def frame(self, projection="all", conn=None):
+        """Every row as a DataFrame with its declared dtypes (typed timestamps, categories)."""
+        sql = self._sql(("frame", projection), lambda: (
+            f"SELECT {', '.join(self._columns(projection))} FROM {self.table}"
+        ))
+        with self._connect(conn) as conn:
+            df = pd.read_sql_query(sql, conn)
+        return domain_frame(df, self.table)
+
+    # --- writes ---
+    def insert(self, conn=None, **values):
+        """Insert one row given as column=value keywords. Returns its key."""
+        self._check_fields(values)
+        columns = tuple(column for column in self.columns if column in values)
+        sql = self._sql(("insert", columns), lambda: (
+            f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        ))
+        params = tuple(self._normalize(column, values[column]) for column in columns)
+        with self._connect(conn) as conn:
+            cursor = conn.execute(sql, params)
+        return values.get(self.key, cursor.lastrowid)
+
+    def insert_many(self, rows, batch_size=DEFAULT_BATCH_SIZE, conn=None):
+        """Insert many rows (tuples/dicts in `columns` order, or a DataFrame); see app.bulk."""
+        with self._connect(conn) as conn:
+            return bulk_insert(conn, self.table, list(self.columns), rows, batch_size,
+                               key_column=self.key, transform=self._normalize_row)
+
+    def update(self, key, conn=None, **fields):
+        """Set the given columns on one row. Returns the number of rows changed (0 or 1; 0 for archived rows)."""
+        if not fields:
+            raise ValueError("update() needs at least one column to set")
+        self._check_fields(fields)
+        columns = tuple(sorted(fields))
+        sql = self._sql(("update", columns), lambda: (
+            f"UPDATE {self.table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE {self.key} = ?"
+        ))
+        params = tuple(self._normalize(column, fields[column]) for column in columns) + (key,)
+        with self._connect(conn) as conn:
+            return conn.execute(sql, params).rowcount
+
+    def delete(self, key, conn=None):
+        """Delete one row. Returns the number of rows deleted (0 or 1; 0 for archived rows)."""
+        sql = self._sql("delete", lambda: f"DELETE FROM {self.table} WHERE {self.key} = ?")
+        with self._connect(conn) as conn:
+            return conn.execute(sql, (key,)).rowcount
+
+    # --- set-based writes ---
+    def _where(self, keys, where):
+        """
+        WHERE clause and parameters selecting rows by key list and/or column filters.
+
+        Every list is bound as one JSON array read back with json_each(), so the
+        SQL text (and its cached statement) does not change with the list length.
+        """
+        if keys is None and not where:
+            raise ValueError("Give a list of keys and/or a filter; refusing to touch every row")
+        self._check_fields(where or {})
+        conditions, params = [], []
+        for column, values in [(self.key, keys)] + list((where or {}).items()):
+            if values is None:
+                continue
+            if hasattr(values, "tolist"):
+                values = values.tolist()  # numpy/pandas -> plain Python values
+            elif not isinstance(values, (list, tuple, set)):
+                values = [values]
+            conditions.append(f"{column} IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([self._normalize(column, value) for value in values], default=str))
+        return " AND ".join(conditions), params
+
+    def update_many(self, keys=None, where=None, conn=None, **fields):
+        """
+        Set the given columns on every selected row in one statement.
+
+        Args:
+            keys: Primary keys of the rows to change
+            where: dict of column -> value or list of values the rows must match
+            conn: Database connection (None borrows a pooled one)
+            **fields: column=value pairs to set
+
+        Returns:
+            int: Number of rows changed
+        """
+        if not fields:
+            raise ValueError("update_many() needs at least one column to set")
+        self._check_fields(fields)
+        columns = tuple(sorted(fields))
+        condition, params = self._where(keys, where)
+        sql = f"UPDATE {self.table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE {condition}"
+        values = tuple(self._normalize(column, fields[column]) for column in columns)
+        with self._connect(conn) as conn:
+            return conn.execute(sql, values + tuple(params)).rowcount
+
+    def delete_many(self, keys=None, where=None, conn=None):
+        """Delete every selected row (see update_many) in one statement. Returns the number deleted."""
+        condition, params = self._where(keys, where)
+        with self._connect(conn) as conn:
+            return conn.execute(f"DELETE FROM {self.table} WHERE {condition}", params).rowcount
+
+    def migrate_csv(self, filepath, memory_budget_bytes=DEFAULT_MEMORY_BUDGET, resume=True, conn=None):
+        """Stream a CSV export into the table; see app.csv_migration."""
+        with self._connect(conn) as conn:
+            return migrate_csv(conn, filepath, self.table, list(self.columns), self.key,
+                               memory_budget_bytes=memory_budget_bytes, resume=resume,
+                               transform=self._normalize_row)
+
+
+class IncidentRepository(Repository):
+    table = "cyber_incidents"
+    key = "incident_id"
+    columns = ("incident_id", "timestamp", "severity", "category", "status", "description")
+    projections = {
+        "summary": ("incident_id", "severity", "category", "status"),
+        "analysis": ("incident_id", "severity", "category", "description", "status"),
+    }
+    record_name = "Incident"
+
+
+class TicketRepository(Repository):
+    table = "it_tickets"
+    key = "ticket_id"
+    columns = ("ticket_id", "priority", "description", "status", "assigned_to", "created_at", "resolution_time_hours")
+    projections = {
+        "summary": ("ticket_id", "priority", "status", "assigned_to"),
+    }
+    record_name = "Ticket"
+
+
+class MetadataRepository(Repository):
+    table = "metadata"
+    key = "dataset_id"
+    columns = ("dataset_id", "name", "rows", "columns", "uploaded_by", "upload_date")
+    projections = {
+        "summary": ("dataset_id", "name", "rows", "columns"),
+    }
+    record_name = "Dataset"
+
+
+class UserRepository(Repository):
+    table = "users"
+    key = "id"
+    columns = ("id", "username", "password_hash", "role", "created_at")
+    projections = {
+        "login": ("username", "password_hash", "role"),
+    }
+    record_name = "User"
+
+    def get_by_username(self, username, projection="all", conn=None):
+        """One user by username, or None."""
+        sql = self._sql(("by_username", projection), lambda: (
+            f"SELECT {', '.join(self._columns(projection))} FROM {self.table} WHERE username = ?"
+        ))
+        with self._connect(conn) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = self._record_type(projection).from_row
+            return cursor.execute(sql, (username,)).fetchone()
+
+
+# Shared repositories for the default database
+incidents = IncidentRepository()
+tickets = TicketRepository()
+datasets = MetadataRepository()
+users = UserRepository()
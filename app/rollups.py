@@ -0,0 +1,229 @@
+##Purpose**: Trigger-maintained hourly/daily/weekly counts behind the trend charts
+#
+# Rebuild them from the base tables (e.g. after editing the database by hand):
+#     python -m app.rollups [path/to/database.db]
+
+import sys
+
+import pandas as pd
+
+from app.db import ARCHIVE_SCHEMA, DB_PATH, borrow, connection, has_table
+
+# Rollup table -> (base table, date/time column, dimension columns)
+ROLLUP_TABLES = {
+    "ticket_rollups": ("it_tickets", "created_at", ("priority", "status")),
+    "incident_rollups": ("cyber_incidents", "timestamp", ("severity", "category")),
+}
+
+# Bucket granularity -> SQL giving the bucket start for a canonical timestamp
+# (NULL for values that are not dates). Weeks start on Monday.
+GRAINS = {
+    "hour": "strftime('%Y-%m-%d %H:00:00', {ts})",
+    "day": "date({ts})",
+    "week": "date({ts}, '-6 days', 'weekday 1')",
+}
+
+
+def rollup_table_for(table):
+    """Name of the rollup table over `table`, or None."""
+    for name, (base, _, _) in ROLLUP_TABLES.items():
+        if base == table:
+            return name
+    return None
+
+
+def _bucket_values(ts):
+    """VALUES list of (grain, bucket) for one timestamp expression."""
+    return ", ".join(f"('{grain}', {expression.format(ts=ts)})" for grain, expression in GRAINS.items())
+
+
+def _create_table_sql(name):
+    _, _, dimensions = ROLLUP_TABLES[name]
+    columns = ["grain TEXT NOT NULL", "bucket TEXT NOT NULL"]
+    columns += [f"{column} TEXT NOT NULL" for column in dimensions]
+    columns.append("n INTEGER NOT NULL DEFAULT 0")
+    return f"""
+    CREATE TABLE IF NOT EXISTS {name} (
+        {', '.join(columns)},
+        PRIMARY KEY (grain, bucket, {', '.join(dimensions)})
+    ) WITHOUT ROWID
+    """
+
+
+def _adjust_sql(name, row, sign):
+    """Trigger statements adding (sign=+1) or removing (sign=-1) one base row from its buckets."""
+    _, ts_column, dimensions = ROLLUP_TABLES[name]
+    ts = f"{row}.{ts_column}"
+    key = ", ".join(["grain", "bucket"] + list(dimensions))
+    if sign > 0:
+        values = ", ".join(["column1", "column2"] + [f"{row}.{column}" for column in dimensions] + ["1"])
+        return (f"INSERT INTO {name} ({key}, n) SELECT {values} FROM (VALUES {_bucket_values(ts)}) "
+                f"WHERE date({ts}) IS NOT NULL ON CONFLICT({key}) DO UPDATE SET n = n + 1;")
+
+    # One statement per grain, so each matches the primary key by equality
+    # (a row-value IN over the VALUES list makes SQLite scan the whole table)
+    statements = []
+    for grain, expression in GRAINS.items():
+        match = " AND ".join([f"grain = '{grain}'", f"bucket = {expression.format(ts=ts)}"]
+                             + [f"{column} = {row}.{column}" for column in dimensions])
+        statements.append(f"UPDATE {name} SET n = n - 1 WHERE {match};")
+        statements.append(f"DELETE FROM {name} WHERE {match} AND n <= 0;")
+    return "\n        ".join(statements)
+
+
+def _trigger_sql(name):
+    """CREATE TRIGGER statements keeping one rollup table in step with its base table."""
+    base, ts_column, dimensions = ROLLUP_TABLES[name]
+    watched = ", ".join([ts_column] + list(dimensions))
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_insert AFTER INSERT ON {base}
+        BEGIN
+            {_adjust_sql(name, "NEW", +1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_delete AFTER DELETE ON {base}
+        BEGIN
+            {_adjust_sql(name, "OLD", -1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_update AFTER UPDATE OF {watched} ON {base}
+        BEGIN
+            {_adjust_sql(name, "OLD", -1)}
+            {_adjust_sql(name, "NEW", +1)}
+        END
+        """,
+    ]
+
+
+def create_rollup_tables(conn):
+    """
+    Create the rollup tables and their triggers, then fill them.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    for name in ROLLUP_TABLES:
+        cursor.execute(_create_table_sql(name))
+        for trigger_sql in _trigger_sql(name):
+            cursor.execute(trigger_sql)
+    rebuild_rollup_tables(conn)
+
+
+def recreate_rollup_triggers(conn):
+    """
+    Drop and re-create the rollup triggers (for databases whose triggers predate a fix).
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    for name in ROLLUP_TABLES:
+        for event in ("insert", "delete", "update"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{name}_{event}")
+        for trigger_sql in _trigger_sql(name):
+            cursor.execute(trigger_sql)
+
+
+def count_rows_into(cursor, name, source, where="1", params=()):
+    """
+    Add the rows of `source` matching `where` to every grain of rollup table `name`.
+
+    Existing buckets grow, so this can top up a table as well as fill it.
+    """
+    _, ts_column, dimensions = ROLLUP_TABLES[name]
+    dimension_list = ", ".join(dimensions)
+    for grain, expression in GRAINS.items():
+        bucket = expression.format(ts=ts_column)
+        cursor.execute(
+            f"INSERT INTO {name} (grain, bucket, {dimension_list}, n) "
+            f"SELECT '{grain}', {bucket} AS bucket, {dimension_list}, COUNT(*) FROM {source} "
+            f"WHERE date({ts_column}) IS NOT NULL AND ({where}) GROUP BY bucket, {dimension_list} "
+            f"ON CONFLICT(grain, bucket, {dimension_list}) DO UPDATE SET n = n + excluded.n",
+            params,
+        )
+
+
+def rebuild_rollup_tables(conn=None):
+    """
+    Recompute every rollup table from its base table (and its archived rows, see app.archive).
+
+    Returns:
+        dict: Number of buckets written per rollup table
+    """
+    buckets = {}
+    with borrow(conn) as conn:
+        cursor = conn.cursor()
+        for name, (base, _, _) in ROLLUP_TABLES.items():
+            cursor.execute(f"DELETE FROM {name}")
+            count_rows_into(cursor, name, f"main.{base}")
+            if has_table(conn, base, ARCHIVE_SCHEMA):
+                count_rows_into(cursor, name, f"{ARCHIVE_SCHEMA}.{base}")
+            buckets[name] = cursor.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+    print(f"✅ Rollup tables rebuilt: {', '.join(f'{name} ({n} buckets)' for name, n in buckets.items())}")
+    return buckets
+
+
+def rollup_counts(conn, table, grain="day", start=None, end=None, by=()):
+    """
+    Row counts per time bucket, oldest first, read from the table's rollups.
+
+    The cost depends on the number of buckets in the range, not on the
+    number of rows underneath.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        table: "it_tickets" or "cyber_incidents"
+        grain: "hour", "day" or "week"
+        start: First bucket to include (date, datetime or canonical string), inclusive
+        end: Last moment to include, exclusive
+        by: Dimension column(s) to keep; counts are summed over the others
+
+    Returns:
+        DataFrame: "bucket", the `by` columns and "count"
+    """
+    name = rollup_table_for(table)
+    if name is None:
+        raise ValueError(f"No rollups are kept for {table}")
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown grain '{grain}'. Use one of: {', '.join(GRAINS)}")
+    if isinstance(by, str):
+        by = [by]
+    dimensions = ROLLUP_TABLES[name][2]
+    unknown = [column for column in by if column not in dimensions]
+    if unknown:
+        raise ValueError(f"Cannot split {table} rollups by: {', '.join(unknown)}")
+
+    where, params = ["grain = ?"], [grain]
+    if start is not None:
+        # Bucket keys are bucket starts, so align `start` down to its bucket
+        where.append(f"bucket >= {GRAINS[grain].format(ts='?')}")
+        params.append(str(start))
+    if end is not None:
+        where.append("bucket < ?")
+        params.append(str(end))
+    group = ", ".join(["bucket"] + list(by))
+    query = f"""
+        SELECT {group}, SUM(n) AS count
+        FROM {name}
+        WHERE {' AND '.join(where)}
+        GROUP BY {group}
+        ORDER BY {group}
+    """
+    with borrow(conn) as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+
+if __name__ == "__main__":
+    from app.archive import attach_archive
+    from app.schema import ensure_schema
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    ensure_schema(db_path)
+    with connection(db_path) as conn:
+        # Archived rows are counted too
+        attach_archive(conn, create=False)
+        rebuild_rollup_tables(conn)
@@ -1,12 +1,113 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.cache import create_data_versions_table
+from app.changes import create_changes_table, prune_changes, version_counters_from_changes
+from app.db import DB_PATH, connection
+from app.rollups import create_rollup_tables, recreate_rollup_triggers
+from app.search import create_search_tables
+from app.snapshots import schedule_snapshots, snapshots_available
+from app.archive import ARCHIVE_IN_BACKGROUND, schedule_archiving
+from app.summary_tables import create_summary_tables
+from app.timestamps import backfill_timestamps
+
+
+# Versioned schema migrations, applied in order on top of the base tables below.
+# Each entry is (version, description, steps); a step is a SQL string or a
+# callable taking the connection. Never edit a released entry - append a new one.
+MIGRATIONS = [
+    (1, "Secondary indexes for dashboard filters", [
+        "CREATE INDEX IF NOT EXISTS idx_incidents_status ON cyber_incidents(status)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_severity_category ON cyber_incidents(severity, category)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON cyber_incidents(timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_priority_status ON it_tickets(priority, status)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assigned_to ON it_tickets(assigned_to)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON it_tickets(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_metadata_uploaded_by ON metadata(uploaded_by)",
+        "CREATE INDEX IF NOT EXISTS idx_metadata_upload_date ON metadata(upload_date)",
+    ]),
+    (2, "Canonical ISO-8601 timestamps; unknown incident times stored as NULL", [
+        # Rebuild cyber_incidents so placeholder times ("00:00.0") can become NULL
+        """
+        CREATE TABLE cyber_incidents_v2 (
+            incident_id INTEGER PRIMARY KEY,
+            timestamp TEXT,
+            severity TEXT NOT NULL,
+            category TEXT NOT NULL,
+            status TEXT NOT NULL,
+            description TEXT
+        )
+        """,
+        "INSERT INTO cyber_incidents_v2 SELECT incident_id, timestamp, severity, category, status, description FROM cyber_incidents",
+        "DROP TABLE cyber_incidents",
+        "ALTER TABLE cyber_incidents_v2 RENAME TO cyber_incidents",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_status ON cyber_incidents(status)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_severity_category ON cyber_incidents(severity, category)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON cyber_incidents(timestamp)",
+        lambda conn: backfill_timestamps(conn, "cyber_incidents"),
+        lambda conn: backfill_timestamps(conn, "it_tickets"),
+        lambda conn: backfill_timestamps(conn, "metadata"),
+    ]),
+    (3, "Trigger-maintained incident_counts and ticket_counts summary tables", [
+        create_summary_tables,
+    ]),
+    (4, "Per-table write counters (data_versions) for cache invalidation", [
+        create_data_versions_table,
+    ]),
+    (5, "Trigger-written change feed; data_versions becomes a view over it", [
+        create_changes_table,
+        version_counters_from_changes,
+    ]),
+    (6, "FTS5 full-text indexes over incident and ticket descriptions", [
+        create_search_tables,
+    ]),
+    (7, "Trigger-maintained hourly/daily/weekly rollups for the trend charts", [
+        create_rollup_tables,
+    ]),
+    (8, "Rollup decrement triggers match buckets by primary key instead of scanning", [
+        recreate_rollup_triggers,
+    ]),
+    (9, "(status, time) indexes the archiver selects old closed/resolved rows with", [
+        "CREATE INDEX IF NOT EXISTS idx_incidents_status_timestamp ON cyber_incidents(status, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status_created_at ON it_tickets(status, created_at)",
+    ]),
+]
 
 
 # defining the functions to create the users, cyber incidents, metadata and it tickets tables 
 def create_all_tables(conn):
-    """Create all tables."""
+    """Create all tables and bring the schema up to the latest version."""
     create_users_table(conn)
     create_cyber_incidents_table(conn)
     create_datasets_metadata_table(conn)
     create_it_tickets_table(conn)
+    create_migration_state_table(conn)
+    create_sync_hashes_table(conn)
+    migrate_schema(conn)
+
+# Databases already brought up to date by this process
+_ready_databases = set()
+_ready_lock = threading.Lock()
+
+
+def ensure_schema(db_path=DB_PATH):
+    """Create/upgrade the schema of a database file once per process."""
+    key = str(Path(db_path).resolve())
+    with _ready_lock:
+        if key in _ready_databases:
+            return
+        with connection(db_path) as conn:
+            create_all_tables(conn)
+            # Trim the change feed once per server start
+            prune_changes(conn)
+        if snapshots_available() and str(db_path) != ":memory:":
+            # Keep the Arrow snapshots the live tables start from current
+            schedule_snapshots(db_path)
+        if ARCHIVE_IN_BACKGROUND and str(db_path) != ":memory:":
+            # Move old closed/resolved rows out of the hot tables (opt-in, see app.archive)
+            schedule_archiving(db_path)
+        _ready_databases.add(key)
 
  # To create the users table with data types and values with sql statements
 def create_users_table(conn):
@@ -112,3 +213,150 @@ def create_it_tickets_table(conn):
     cursor.execute(create_table_sql)
     conn.commit()
     print("✅ it_tickets table created successfully !")
+
+ # To create the migration_state table that records how far each CSV migration has got
+def create_migration_state_table(conn):
+    """
+    Create the migration_state table used to resume CSV migrations.
+
+    One row per (CSV file, target table) holding the byte offset and row
+    number of the last committed chunk.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS migration_state (
+        source TEXT NOT NULL,
+        target_table TEXT NOT NULL,
+        byte_offset INTEGER NOT NULL DEFAULT 0,
+        row_number INTEGER NOT NULL DEFAULT 0,
+        file_size INTEGER,
+        status TEXT NOT NULL DEFAULT 'running',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (source, target_table)
+    );
+    """
+
+    cursor.execute(create_table_sql)
+    conn.commit()
+    print("✅ migration_state table created successfully !")
+
+
+def create_sync_hashes_table(conn):
+    """
+    Create the sync_hashes table used by incremental CSV syncs (app.sync).
+
+    Holds the content hash of every row last synced from an export. Rows are
+    grouped in blocks of consecutive keys, each stored as two int64 arrays
+    (sorted keys, hashes), so a sync loads millions of hashes in one read and
+    rewrites only the blocks holding changed rows.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS sync_hashes (
+        table_name TEXT NOT NULL,
+        block INTEGER NOT NULL,
+        keys BLOB NOT NULL,
+        hashes BLOB NOT NULL,
+        PRIMARY KEY (table_name, block)
+    ) WITHOUT ROWID;
+    """
+
+    cursor.execute(create_table_sql)
+    conn.commit()
+    print("✅ sync_hashes table created successfully !")
+
+ # To create the schema_version table that records every applied schema migration
+def create_schema_version_table(conn):
+    """
+    Create the schema_version table (one row per applied migration).
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """
+
+    cursor.execute(create_table_sql)
+    conn.commit()
+
+
+def get_schema_version(conn):
+    """Return the schema version of a database (0 = base tables only)."""
+    user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    try:
+        recorded = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        recorded = 0
+    return max(user_version, recorded)
+
+
+ # To upgrade an existing database in place, one version at a time
+def migrate_schema(conn, target_version=None):
+    """
+    Apply every pending migration in MIGRATIONS, in order.
+
+    Each migration runs in its own transaction together with its
+    schema_version row and PRAGMA user_version bump, so a failure leaves the
+    database at the last good version.
+
+    Args:
+        conn: Database connection object
+        target_version: Stop after this version (defaults to the latest)
+
+    Returns:
+        int: The schema version after upgrading
+    """
+    create_schema_version_table(conn)
+    current = get_schema_version(conn)
+    if target_version is None:
+        target_version = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+    cursor = conn.cursor()
+    applied = False
+    for version, description, steps in MIGRATIONS:
+        if version <= current or version > target_version:
+            continue
+
+        if conn.in_transaction:
+            conn.commit()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    cursor.execute(step)
+            cursor.execute(
+                "INSERT OR REPLACE INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            print(f"❌ Schema migration {version} ({description}) failed; database left at version {current}.")
+            raise
+
+        current = version
+        applied = True
+        print(f"✅ Schema migrated to version {version}: {description}")
+
+    if applied:
+        # Refresh planner statistics for any new indexes
+        cursor.execute("PRAGMA optimize")
+    return current
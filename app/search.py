@@ -0,0 +1,135 @@
+##Purpose**: FTS5 full-text search over incident and ticket descriptions
+
+import re
+
+import pandas as pd
+
+from app.analytics import GROUP_COLUMNS
+from app.db import borrow
+
+# Base table -> (FTS5 table, key column, columns returned with each hit)
+SEARCH_TABLES = {
+    "cyber_incidents": ("incidents_fts", "incident_id", ["incident_id", "timestamp", "severity", "category", "status"]),
+    "it_tickets": ("tickets_fts", "ticket_id", ["ticket_id", "created_at", "priority", "status", "assigned_to"]),
+}
+
+DEFAULT_SEARCH_LIMIT = 50
+
+# Markers snippet() puts around matched words (Markdown bold for the dashboards)
+HIGHLIGHT_START = "**"
+HIGHLIGHT_END = "**"
+SNIPPET_TOKENS = 16
+
+
+def create_search_tables(conn):
+    """
+    Create the FTS5 indexes over description and the triggers that keep them in sync.
+
+    The indexes are external-content tables: they store only the index and
+    read description back from the base table, keyed by its integer primary
+    key. Existing rows are indexed by a rebuild.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    for table, (fts, key, _) in SEARCH_TABLES.items():
+        cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            description,
+            content='{table}',
+            content_rowid='{key}',
+            tokenize='porter unicode61',
+            prefix='2 3'
+        )
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {fts} (rowid, description) VALUES (NEW.{key}, NEW.description);
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, description) VALUES ('delete', OLD.{key}, OLD.description);
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {key}, description ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, description) VALUES ('delete', OLD.{key}, OLD.description);
+            INSERT INTO {fts} (rowid, description) VALUES (NEW.{key}, NEW.description);
+        END
+        """)
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def match_query(text):
+    """
+    Turn free text from a search box into an FTS5 query.
+
+    Each word is quoted, so punctuation and FTS operators typed by the user
+    are taken literally, and the last word matches as a prefix. Returns None
+    when the text has no words.
+    """
+    terms = re.findall(r"\w+", text or "")
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search(conn, table, query, filters=None, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Rows of `table` whose description matches `query`, best match first.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        table: "cyber_incidents" or "it_tickets"
+        query: Free text (see match_query)
+        filters: Optional dict of column -> value or list of values (see GROUP_COLUMNS)
+        limit: Maximum number of hits
+
+    Returns:
+        DataFrame: the table's display columns, a "snippet" of the description
+        with the matched words highlighted, and the bm25 "rank" (lower is better)
+    """
+    fts, key, columns = SEARCH_TABLES[table]
+    match = match_query(query)
+    if match is None:
+        return pd.DataFrame(columns=columns + ["snippet", "rank"])
+
+    where, params = [f"{fts} MATCH ?"], [match]
+    for column, values in (filters or {}).items():
+        if column not in GROUP_COLUMNS[table]:
+            raise ValueError(f"Cannot filter {table} by: {column}")
+        if values is None or isinstance(values, (list, tuple, set)) and not values:
+            continue
+        values = list(values) if isinstance(values, (list, tuple, set)) else [values]
+        where.append(f"t.{column} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+
+    query_sql = f"""
+        SELECT {', '.join(f't.{column}' for column in columns)},
+               snippet({fts}, 0, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet,
+               bm25({fts}) AS rank
+        FROM {fts}
+        JOIN {table} AS t ON t.{key} = {fts}.rowid
+        WHERE {' AND '.join(where)}
+        ORDER BY rank
+        LIMIT ?
+    """
+    with borrow(conn) as conn:
+        return pd.read_sql_query(query_sql, conn, params=[HIGHLIGHT_START, HIGHLIGHT_END, *params, int(limit)])
+
+
+def search_incidents(conn, query, filters=None, limit=DEFAULT_SEARCH_LIMIT):
+    """Ranked full-text search over cyber_incidents.description."""
+    return search(conn, "cyber_incidents", query, filters, limit)
+
+
+def search_tickets(conn, query, filters=None, limit=DEFAULT_SEARCH_LIMIT):
+    """Ranked full-text search over it_tickets.description."""
+    return search(conn, "it_tickets", query, filters, limit)
@@ -19,13 +19,13 @@ def register_user(username, password, role='user'):
         bcrypt.gensalt()
     ).decode('utf-8')
     
-    # Insert into database
-    insert_user(username, password_hash, role)
+    # Insert into database (borrows a pooled connection)
+    insert_user(None, username, password_hash, role)
     return True, f"User '{username}' registered successfully."
 
 def login_user(username, password):
     """Authenticate user."""
-    user = get_user_by_username(username)
+    user = get_user_by_username(None, username)
     if not user:
         return False, "User not found."
     
@@ -0,0 +1,204 @@
+##Purpose**: Columnar (Arrow IPC) snapshots of the domain tables for fast cold loads
+
+import argparse
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from app.analytics import table_frame
+from app.db import DB_PATH, borrow, connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional: without pyarrow every load simply reads SQLite
+    pa = None
+
+# Tables that get snapshots
+SNAPSHOT_TABLES = ["cyber_incidents", "it_tickets", "metadata"]
+
+# Rewrite a table's snapshot once this many changes have piled up after it
+SNAPSHOT_AFTER_WRITES = 5000
+
+# Schema metadata key holding the change-feed seq the snapshot is current to
+SEQ_KEY = b"changes_seq"
+
+
+def snapshots_available():
+    """True when pyarrow is installed."""
+    return pa is not None
+
+
+def _database_file(conn):
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def _latest_seq(conn, table=None):
+    if table is None:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+    return conn.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM changes WHERE table_name = ?", (table,)
+    ).fetchone()[0]
+
+
+def snapshot_path(database, table):
+    """<db folder>/snapshots/<db name>.<table>.arrow"""
+    database = Path(database)
+    return database.parent / "snapshots" / f"{database.stem}.{table}.arrow"
+
+
+def write_snapshot(conn, table):
+    """
+    Write the whole table to its Arrow IPC file.
+
+    The change-feed seq is read before the table, so any write that lands in
+    between is replayed on load rather than lost. The file is written next to
+    its final name and renamed into place, so readers never see half of one.
+
+    Returns:
+        tuple: (path, seq, rows)
+    """
+    if pa is None:
+        raise ImportError("Snapshots need pyarrow (pip install pyarrow)")
+    with borrow(conn) as conn:
+        database = _database_file(conn)
+        if not database:
+            raise ValueError("Snapshots need a file database, not :memory:")
+        seq = _latest_seq(conn)
+        df = table_frame(conn, table)
+
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+    arrow_table = arrow_table.replace_schema_metadata({
+        **(arrow_table.schema.metadata or {}),
+        SEQ_KEY: str(seq).encode(),
+    })
+    path = snapshot_path(database, table)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".arrow.partial")
+    with pa.OSFile(str(partial), "wb") as sink:
+        # Uncompressed, so the reader can memory-map the buffers without copying
+        with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+    os.replace(partial, path)
+    return path, seq, len(df)
+
+
+def read_snapshot(database, table, columns=None):
+    """
+    Memory-map a table's snapshot.
+
+    Returns:
+        tuple: (seq, DataFrame), or None if there is no usable snapshot
+    """
+    if pa is None or not database:
+        return None
+    path = snapshot_path(database, table)
+    if not path.exists():
+        return None
+    try:
+        with pa.memory_map(str(path), "r") as source:
+            arrow_table = pa.ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    seq = int(arrow_table.schema.metadata[SEQ_KEY])
+    if columns:
+        missing = [column for column in columns if column not in arrow_table.column_names]
+        if missing:
+            return None
+        arrow_table = arrow_table.select(list(columns))
+    return seq, arrow_table.to_pandas()
+
+
+def snapshot_seq(database, table):
+    """Seq a table's snapshot is current to (from its footer only), or None."""
+    if pa is None:
+        return None
+    path = snapshot_path(database, table)
+    if not path.exists():
+        return None
+    try:
+        with pa.memory_map(str(path), "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata
+    except (OSError, pa.ArrowInvalid):
+        return None
+    return int(metadata[SEQ_KEY])
+
+
+def refresh_snapshots(conn=None, tables=None, min_writes=SNAPSHOT_AFTER_WRITES):
+    """
+    Rewrite each snapshot that is missing or `min_writes` changes behind.
+
+    Returns:
+        dict: table -> rows written, for the snapshots that were rewritten
+    """
+    if pa is None:
+        return {}
+    written = {}
+    with borrow(conn) as conn:
+        database = _database_file(conn)
+        for table in tables or SNAPSHOT_TABLES:
+            seq = snapshot_seq(database, table)
+            if seq is not None:
+                behind = conn.execute(
+                    "SELECT COUNT(*) FROM changes WHERE table_name = ? AND seq > ?", (table, seq)
+                ).fetchone()[0]
+                # A seq from a newer feed means the database was replaced
+                if behind < min_writes and seq <= _latest_seq(conn):
+                    continue
+            _, _, rows = write_snapshot(conn, table)
+            written[table] = rows
+    return written
+
+
+class SnapshotScheduler(threading.Thread):
+    """
+    Background thread that calls refresh_snapshots() at start and then on a
+    fixed interval, so snapshots trail the database by at most
+    `min_writes` changes plus one interval.
+    """
+
+    def __init__(self, db_path=DB_PATH, interval_seconds=300, min_writes=SNAPSHOT_AFTER_WRITES):
+        super().__init__(name="sqlite-snapshots", daemon=True)
+        self.db_path = db_path
+        self.interval_seconds = interval_seconds
+        self.min_writes = min_writes
+        self.last_result = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                with connection(self.db_path) as conn:
+                    self.last_result = refresh_snapshots(conn, min_writes=self.min_writes)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Snapshot of {self.db_path} failed: {e}")
+            if self._stop_event.wait(self.interval_seconds):
+                break
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def schedule_snapshots(db_path=DB_PATH, interval_seconds=300, min_writes=SNAPSHOT_AFTER_WRITES):
+    """Start (and return) a background SnapshotScheduler for a database."""
+    scheduler = SnapshotScheduler(db_path, interval_seconds, min_writes)
+    scheduler.start()
+    return scheduler
+
+
+if __name__ == "__main__":
+    # python -m app.snapshots [db] [--force]
+    parser = argparse.ArgumentParser(description="Write Arrow snapshots of the domain tables.")
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("--force", action="store_true", help="rewrite every snapshot")
+    args = parser.parse_args()
+    if pa is None:
+        print("❌ pyarrow is not installed; no snapshots written")
+    else:
+        with connection(args.db) as conn:
+            written = refresh_snapshots(conn, min_writes=0 if args.force else SNAPSHOT_AFTER_WRITES)
+        for table, rows in written.items():
+            print(f"✅ Snapshot of {table}: {rows} rows")
+        if not written:
+            print("✅ Snapshots are up to date")
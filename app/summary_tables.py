@@ -0,0 +1,156 @@
+##Purpose**: Trigger-maintained counter tables behind the dashboard KPIs
+#
+# Rebuild them from the base tables (e.g. after editing the database by hand):
+#     python -m app.summary_tables [path/to/database.db]
+
+import sys
+
+from app.db import ARCHIVE_SCHEMA, DB_PATH, borrow, connection, has_table
+
+# Summary table -> (base table, grouping columns, summed columns)
+SUMMARY_TABLES = {
+    "incident_counts": ("cyber_incidents", ("status", "severity", "category"), ()),
+    "ticket_counts": ("it_tickets", ("priority", "status", "assigned_to"), ("resolution_time_hours",)),
+}
+
+# Name of the running total kept for each summed column
+SUM_COLUMNS = {"resolution_time_hours": "total_resolution_hours"}
+
+
+def summary_table_for(table, columns=()):
+    """Name of the summary table that can answer a GROUP BY on `columns`, or None."""
+    for name, (base, group, _) in SUMMARY_TABLES.items():
+        if base == table and set(columns) <= set(group):
+            return name
+    return None
+
+
+def _create_table_sql(name):
+    _, group, summed = SUMMARY_TABLES[name]
+    columns = [f"{column} TEXT NOT NULL" for column in group]
+    columns.append("n INTEGER NOT NULL DEFAULT 0")
+    columns += [f"{SUM_COLUMNS[column]} INTEGER NOT NULL DEFAULT 0" for column in summed]
+    return f"""
+    CREATE TABLE IF NOT EXISTS {name} (
+        {', '.join(columns)},
+        PRIMARY KEY ({', '.join(group)})
+    ) WITHOUT ROWID
+    """
+
+
+def _adjust_sql(name, row, sign):
+    """Trigger statement adding (sign=+1) or removing (sign=-1) one base row from its group."""
+    _, group, summed = SUMMARY_TABLES[name]
+    if sign > 0:
+        totals = [SUM_COLUMNS[column] for column in summed]
+        insert_columns = ", ".join(list(group) + ["n"] + totals)
+        values = ", ".join([f"{row}.{column}" for column in group] + ["1"]
+                           + [f"COALESCE({row}.{column}, 0)" for column in summed])
+        updates = ", ".join(["n = n + 1"] + [f"{SUM_COLUMNS[column]} = {SUM_COLUMNS[column]} + excluded.{SUM_COLUMNS[column]}"
+                                             for column in summed])
+        return (f"INSERT INTO {name} ({insert_columns}) VALUES ({values}) "
+                f"ON CONFLICT({', '.join(group)}) DO UPDATE SET {updates};")
+
+    updates = ", ".join(["n = n - 1"] + [f"{SUM_COLUMNS[column]} = {SUM_COLUMNS[column]} - COALESCE({row}.{column}, 0)"
+                                         for column in summed])
+    match = " AND ".join(f"{column} = {row}.{column}" for column in group)
+    return (f"UPDATE {name} SET {updates} WHERE {match};\n"
+            f"        DELETE FROM {name} WHERE {match} AND n <= 0;")
+
+
+def _trigger_sql(name):
+    """CREATE TRIGGER statements keeping one summary table in step with its base table."""
+    base, group, summed = SUMMARY_TABLES[name]
+    watched = ", ".join(list(group) + list(summed))
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_insert AFTER INSERT ON {base}
+        BEGIN
+            {_adjust_sql(name, "NEW", +1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_delete AFTER DELETE ON {base}
+        BEGIN
+            {_adjust_sql(name, "OLD", -1)}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{name}_update AFTER UPDATE OF {watched} ON {base}
+        BEGIN
+            {_adjust_sql(name, "OLD", -1)}
+            {_adjust_sql(name, "NEW", +1)}
+        END
+        """,
+    ]
+
+
+def create_summary_tables(conn):
+    """
+    Create the summary tables and their triggers, then fill them.
+
+    Args:
+        conn: Database connection object
+    """
+    cursor = conn.cursor()
+    for name in SUMMARY_TABLES:
+        cursor.execute(_create_table_sql(name))
+        for trigger_sql in _trigger_sql(name):
+            cursor.execute(trigger_sql)
+    rebuild_summary_tables(conn)
+
+
+def count_rows_into(cursor, name, source, where="1", params=()):
+    """
+    Add the rows of `source` matching `where` to summary table `name`.
+
+    Existing groups grow, so this can top up a table as well as fill it.
+    """
+    _, group, summed = SUMMARY_TABLES[name]
+    group_list = ", ".join(group)
+    totals = "".join(f", {SUM_COLUMNS[column]}" for column in summed)
+    sums = "".join(f", COALESCE(SUM({column}), 0)" for column in summed)
+    updates = "".join(f", {SUM_COLUMNS[column]} = {SUM_COLUMNS[column]} + excluded.{SUM_COLUMNS[column]}"
+                      for column in summed)
+    cursor.execute(
+        f"INSERT INTO {name} ({group_list}, n{totals}) "
+        f"SELECT {group_list}, COUNT(*){sums} FROM {source} WHERE {where} GROUP BY {group_list} "
+        f"ON CONFLICT({group_list}) DO UPDATE SET n = n + excluded.n{updates}",
+        params,
+    )
+
+
+def rebuild_summary_tables(conn=None):
+    """
+    Recompute every summary table from its base table.
+
+    The triggers keep the counters exact, so this is only needed to repair
+    drift, e.g. after rows were changed with triggers dropped. Rows moved to
+    an attached archive database (see app.archive) are counted too.
+
+    Returns:
+        dict: Number of groups written per summary table
+    """
+    groups = {}
+    with borrow(conn) as conn:
+        cursor = conn.cursor()
+        for name, (base, _, _) in SUMMARY_TABLES.items():
+            cursor.execute(f"DELETE FROM {name}")
+            count_rows_into(cursor, name, f"main.{base}")
+            if has_table(conn, base, ARCHIVE_SCHEMA):
+                count_rows_into(cursor, name, f"{ARCHIVE_SCHEMA}.{base}")
+            groups[name] = cursor.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+    print(f"✅ Summary tables rebuilt: {', '.join(f'{name} ({n} groups)' for name, n in groups.items())}")
+    return groups
+
+
+if __name__ == "__main__":
+    from app.archive import attach_archive
+    from app.schema import ensure_schema
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    ensure_schema(db_path)
+    with connection(db_path) as conn:
+        # Archived rows are counted too
+        attach_archive(conn, create=False)
+        rebuild_summary_tables(conn)
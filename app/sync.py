@@ -0,0 +1,338 @@
+##Purpose**: Incremental re-sync of repeated CSV exports: only new and changed rows are written
+#
+# Each record of an export is hashed (its raw field text, in table column
+# order) and compared with the hash stored when that key was last synced
+# (the sync_hashes table, see app.schema). Only records with a new key or a
+# different hash are normalized and written; with delete=True, keys synced
+# before that are missing from the export are deleted. Parsing and hashing
+# run in a process pool over line-aligned byte ranges and the comparison is
+# vectorized with numpy, so a mostly unchanged export costs one read of the
+# file. Writes go through app.ingest's staging table.
+#
+# The first sync of a table that was loaded some other way finds no hashes:
+# every record is then compared with its row in the database, and only rows
+# that differ are updated. Edits made in the app to rows the export has not
+# changed are kept. Rows already moved to the archive (its file or its
+# partition files) are not brought back.
+#
+#     python -m app.sync cyber_incidents.csv cyber_incidents [path/to/database.db] [--delete] [--workers 4]
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from app.archive import drop_archived
+from app.db import DB_PATH, borrow, connection, has_table
+from app.ingest import (COMMIT_ROWS, INVALID_SAMPLES, REPOSITORIES, SPLIT_BYTES, create_staging_table, flush_staging,
+                        replaced_triggers, split_ranges, staging_insert_sql)
+from app.schema import create_sync_hashes_table
+
+# Keys per sync_hashes block (block = key // HASH_BLOCK_KEYS)
+HASH_BLOCK_KEYS = 65536
+
+# Keys deleted per transaction
+DELETE_BATCH_ROWS = 10_000
+
+_worker = {}
+
+
+def row_hash(fields):
+    """Signed 64-bit content hash of a record's raw field texts."""
+    digest = hashlib.blake2b("\x1f".join(fields).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def load_hashes(conn, table):
+    """(keys, hashes) int64 arrays, sorted by key, of the rows last synced into `table`."""
+    blocks = conn.execute("SELECT keys, hashes FROM sync_hashes WHERE table_name = ? ORDER BY block",
+                          (table,)).fetchall()
+    if not blocks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    keys = np.concatenate([np.frombuffer(keys, dtype="<i8") for keys, _ in blocks]).astype(np.int64)
+    hashes = np.concatenate([np.frombuffer(hashes, dtype="<i8") for _, hashes in blocks]).astype(np.int64)
+    return keys, hashes
+
+
+def _save_blocks(conn, table, keys, hashes, blocks):
+    """Rewrite the given blocks of sync_hashes from the full sorted (keys, hashes) arrays."""
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        conn.commit()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for block in blocks:
+            low, high = np.searchsorted(keys, [block * HASH_BLOCK_KEYS, (block + 1) * HASH_BLOCK_KEYS])
+            if low == high:
+                cursor.execute("DELETE FROM sync_hashes WHERE table_name = ? AND block = ?", (table, int(block)))
+                continue
+            cursor.execute(
+                "INSERT OR REPLACE INTO sync_hashes (table_name, block, keys, hashes) VALUES (?, ?, ?, ?)",
+                (table, int(block), keys[low:high].astype("<i8").tobytes(), hashes[low:high].astype("<i8").tobytes()),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _init_worker(filepath, table, positions, width, encoding, known_keys, known_hashes):
+    _worker.update(filepath=filepath, repository=REPOSITORIES[table], positions=positions, width=width,
+                   encoding=encoding, known_keys=known_keys, known_hashes=known_hashes)
+
+
+def _diff_range(byte_range):
+    """
+    Hash the records of one byte range and keep those the stored hashes do not match.
+
+    Returns:
+        dict: every valid key seen, the changed records (normalized) with
+        their keys and hashes, and the invalid count and samples
+    """
+    repository, positions, width = _worker["repository"], _worker["positions"], _worker["width"]
+    key_position = repository.columns.index(repository.key)
+    start, end = byte_range
+    with open(_worker["filepath"], "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode(_worker["encoding"])
+
+    keys, hashes, records = [], [], []
+    invalid, samples = 0, []
+    for record in csv.reader(io.StringIO(text, newline="")):
+        if not record:
+            continue
+        try:
+            if len(record) != width:
+                raise ValueError("wrong field count")
+            fields = [record[i] for i in positions]
+            keys.append(int(fields[key_position]))
+        except ValueError:
+            invalid += 1
+            if len(samples) < INVALID_SAMPLES:
+                samples.append(",".join(record)[:200])
+            continue
+        hashes.append(row_hash(fields))
+        records.append(fields)
+
+    keys = np.array(keys, dtype=np.int64)
+    hashes = np.array(hashes, dtype=np.int64)
+    known_keys, known_hashes = _worker["known_keys"], _worker["known_hashes"]
+    if len(known_keys):
+        position = np.minimum(np.searchsorted(known_keys, keys), len(known_keys) - 1)
+        changed = ~((known_keys[position] == keys) & (known_hashes[position] == hashes))
+    else:
+        changed = np.ones(len(keys), dtype=bool)
+
+    rows = []
+    for index in np.flatnonzero(changed):
+        row = [value if value != "" else None for value in records[index]]
+        row[key_position] = int(keys[index])
+        rows.append(repository._normalize_row(row))
+    return {"keys": keys, "rows": rows, "row_keys": keys[changed], "row_hashes": hashes[changed],
+            "invalid": invalid, "samples": samples}
+
+
+def _bounded_map(pool, func, items, window):
+    """pool results of func(item) in order, with at most `window` tasks submitted ahead."""
+    pending = deque()
+    for item in items:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def sync_csv(conn, filepath, table, delete=False, workers=None, split_bytes=SPLIT_BYTES, commit_rows=COMMIT_ROWS,
+             encoding="utf-8"):
+    """
+    Apply a re-exported CSV to `table`, writing only what changed since the last sync.
+
+    Records whose hash matches the stored one are skipped without being
+    normalized or written. Changed records are upserted (rows whose values
+    turn out identical are left alone) and their hashes stored. With
+    `delete`, previously synced keys absent from the export are deleted -
+    unless the export had rejected records, whose keys cannot be known.
+
+    Args:
+        conn: Database connection (None borrows a pooled one)
+        filepath: Complete CSV export whose header names the table columns
+        table: Target table (a key of app.ingest.REPOSITORIES)
+        delete: Delete rows synced before that the export no longer has
+        workers: Parse/hash processes (default: one per CPU)
+        split_bytes: Target bytes per parse task
+        commit_rows: Changed rows per writer transaction
+        encoding: CSV text encoding
+
+    Returns:
+        dict: rows read, inserted, updated, unchanged, deleted, skipped
+        (archived), rejected, and seconds per stage, or None if the file
+        does not exist
+    """
+    filepath = Path(filepath)
+    if not filepath.exists():
+        print(f"File not found: {filepath}")
+        return None
+    repository = REPOSITORIES[table]
+    columns, key = list(repository.columns), repository.key
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    with open(filepath, "rb") as f:
+        header_line = f.readline()
+    header = next(csv.reader([header_line.decode(encoding).lstrip("\ufeff")]))
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError(f"{filepath.name} is missing column(s): {', '.join(missing)}")
+    positions = [header.index(column) for column in columns]
+    ranges = split_ranges(filepath, split_bytes, start=len(header_line))
+
+    counts = {"rows_read": 0, "inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "archived": 0,
+              "rejected": 0}
+    samples, seen_keys, changed_keys, changed_hashes = [], [], [], []
+    seconds = {"load": 0.0, "diff": 0.0, "write": 0.0, "delete": 0.0, "store": 0.0}
+
+    with borrow(conn) as conn:
+        # Normally created by create_all_tables; only databases set up some other way need it here
+        if not has_table(conn, "sync_hashes"):
+            create_sync_hashes_table(conn)
+        known_keys, known_hashes = load_hashes(conn, table)
+        staging = create_staging_table(conn, table, key)
+        triggers = replaced_triggers(conn, table)
+        stage_sql = staging_insert_sql(staging, columns, key, "update")
+        seconds["load"] = time.perf_counter() - started
+        staged = 0
+
+        def flush():
+            counts["archived"] += drop_archived(conn, table, staging)
+            inserted, updated = flush_staging(conn, table, key, columns, staging, triggers, "update")
+            counts["inserted"] += inserted
+            counts["updated"] += updated
+
+        diff_started = time.perf_counter()
+        pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                    initargs=(str(filepath), table, positions, len(header), encoding,
+                                              known_keys, known_hashes))
+        try:
+            for result in _bounded_map(pool, _diff_range, ranges, window=workers * 2):
+                counts["rows_read"] += len(result["keys"])
+                counts["rejected"] += result["invalid"]
+                samples.extend(result["samples"][:INVALID_SAMPLES - len(samples)])
+                seen_keys.append(result["keys"])
+                if not result["rows"]:
+                    continue
+                write_started = time.perf_counter()
+                changed_keys.append(result["row_keys"])
+                changed_hashes.append(result["row_hashes"])
+                conn.executemany(stage_sql, result["rows"])
+                conn.commit()
+                staged += len(result["rows"])
+                if staged >= commit_rows:
+                    flush()
+                    staged = 0
+                seconds["write"] += time.perf_counter() - write_started
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        seconds["diff"] = time.perf_counter() - diff_started - seconds["write"]
+
+        try:
+            if staged:
+                write_started = time.perf_counter()
+                flush()
+                seconds["write"] += time.perf_counter() - write_started
+        finally:
+            conn.execute(f"DROP TABLE IF EXISTS {staging}")
+            conn.commit()
+
+        delete_started = time.perf_counter()
+        gone = np.empty(0, dtype=np.int64)
+        if delete and counts["rejected"]:
+            print(f"Not deleting from {table}: {counts['rejected']} rejected record(s) in {filepath.name} "
+                  f"have unknown keys.")
+        elif delete and len(known_keys):
+            gone = known_keys[~np.isin(known_keys, np.concatenate(seen_keys) if seen_keys else gone)]
+            cursor = conn.cursor()
+            for batch_start in range(0, len(gone), DELETE_BATCH_ROWS):
+                batch = json.dumps(gone[batch_start:batch_start + DELETE_BATCH_ROWS].tolist())
+                if conn.in_transaction:
+                    conn.commit()
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    counts["deleted"] += cursor.execute(
+                        f"DELETE FROM main.{table} WHERE {key} IN (SELECT value FROM json_each(?))", (batch,)
+                    ).rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        seconds["delete"] = time.perf_counter() - delete_started
+
+        store_started = time.perf_counter()
+        if changed_keys or len(gone):
+            new_keys = np.concatenate(changed_keys) if changed_keys else np.empty(0, dtype=np.int64)
+            new_hashes = np.concatenate(changed_hashes) if changed_hashes else np.empty(0, dtype=np.int64)
+            kept = ~np.isin(known_keys, gone)
+            # Reversed so that for a key repeated in the export the last record wins, as in the table
+            all_keys = np.concatenate([new_keys[::-1], known_keys[kept]])
+            all_hashes = np.concatenate([new_hashes[::-1], known_hashes[kept]])
+            all_keys, first = np.unique(all_keys, return_index=True)
+            blocks = np.unique(np.concatenate([new_keys, gone]) // HASH_BLOCK_KEYS)
+            _save_blocks(conn, table, all_keys, all_hashes[first], blocks)
+        seconds["store"] = time.perf_counter() - store_started
+
+    counts["unchanged"] = counts["rows_read"] - counts["inserted"] - counts["updated"] - counts["archived"]
+    elapsed = time.perf_counter() - started
+    print(f"Synced {table} from {filepath.name}: {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['deleted']} deleted, {counts['unchanged']} unchanged")
+    return {
+        "table": table,
+        **counts,
+        "rejected_samples": samples,
+        "workers": workers,
+        "seconds": {stage: round(value, 3) for stage, value in seconds.items()},
+        "total_seconds": round(elapsed, 3),
+        "rows_per_sec": round(counts["rows_read"] / elapsed) if elapsed else 0,
+    }
+
+
+def format_report(report):
+    """Readable summary of a sync_csv() result."""
+    stages = ", ".join(f"{stage} {value:.2f}s" for stage, value in report["seconds"].items())
+    lines = [
+        f"{report['table']}: {report['rows_read']:,} rows read - {report['inserted']:,} inserted, "
+        f"{report['updated']:,} updated, {report['deleted']:,} deleted, {report['unchanged']:,} unchanged, "
+        f"{report['archived']:,} archived (skipped), {report['rejected']:,} rejected",
+        f"  {report['total_seconds']:.2f}s total ({report['rows_per_sec']:,} rows/s, {report['workers']} workers): "
+        f"{stages}",
+    ]
+    lines += [f"  rejected: {sample}" for sample in report["rejected_samples"]]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # create_all_tables rather than ensure_schema, which would also start the background threads
+    from app.schema import create_all_tables
+
+    parser = argparse.ArgumentParser(description="Apply only the changes in a re-exported CSV file.")
+    parser.add_argument("csv")
+    parser.add_argument("table", choices=sorted(REPOSITORIES))
+    parser.add_argument("db", nargs="?", default=DB_PATH)
+    parser.add_argument("--delete", action="store_true", help="delete previously synced rows missing from the export")
+    parser.add_argument("--workers", type=int, default=None, help="parse/hash processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    with connection(args.db) as conn:
+        create_all_tables(conn)
+        result = sync_csv(conn, args.csv, args.table, delete=args.delete, workers=args.workers)
+    if result:
+        print(format_report(result))
@@ -0,0 +1,140 @@
+##Purpose**: One canonical text format for every stored date/time column
+
+from datetime import date, datetime
+
+import pandas as pd
+
+# Canonical storage formats (ISO-8601, sortable as text, understood by SQLite's date functions)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_FORMAT = "%Y-%m-%d"
+
+# Formats accepted on the way in. Slash dates are day-first, as in the CSV exports.
+INPUT_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d/%m/%y",
+]
+
+# Which column of each table holds a timestamp or a plain date
+TIMESTAMP_COLUMNS = {
+    "cyber_incidents": ("timestamp", TIMESTAMP_FORMAT),
+    "it_tickets": ("created_at", TIMESTAMP_FORMAT),
+    "metadata": ("upload_date", DATE_FORMAT),
+}
+
+# Tables whose date/time column may be NULL. Elsewhere the column is NOT NULL,
+# so a value that cannot be parsed is kept as it was rather than dropped.
+NULLABLE_TIMESTAMPS = {"cyber_incidents"}
+
+
+def _to_datetime(value):
+    """Parse a supported value into a datetime, or None if it has no real date."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+
+    text = str(value).strip()
+    # Already canonical (most of every export): skip the strptime loop
+    if len(text) == 19 and text[10] == " ":
+        try:
+            parsed = datetime.fromisoformat(text)
+            if parsed.tzinfo is None:
+                return parsed
+        except ValueError:
+            pass
+    for fmt in INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    # Placeholders such as "00:00.0" (a time with the date lost in an export) end up here
+    return None
+
+
+def normalize_timestamp(value):
+    """Return `value` as 'YYYY-MM-DD HH:MM:SS', or None if it holds no date."""
+    parsed = _to_datetime(value)
+    return parsed.strftime(TIMESTAMP_FORMAT) if parsed else None
+
+
+def normalize_date(value):
+    """Return `value` as 'YYYY-MM-DD', or None if it holds no date."""
+    parsed = _to_datetime(value)
+    return parsed.strftime(DATE_FORMAT) if parsed else None
+
+
+def normalize_column(table, value):
+    """Normalize a value for the date/time column of `table`."""
+    _, fmt = TIMESTAMP_COLUMNS[table]
+    normalized = normalize_date(value) if fmt == DATE_FORMAT else normalize_timestamp(value)
+    if normalized is None and table not in NULLABLE_TIMESTAMPS:
+        return value
+    return normalized
+
+
+def normalize_row(table, row, position):
+    """Return `row` (a tuple) with its date/time value at `position` normalized."""
+    row = list(row)
+    row[position] = normalize_column(table, row[position])
+    return tuple(row)
+
+
+def parse_timestamps(series, fmt=TIMESTAMP_FORMAT):
+    """
+    Convert a column of stored (canonical) values to datetime64.
+
+    Stored values all share one fixed format, so pandas takes its vectorized
+    exact-format path instead of guessing a format per value. NULLs become NaT.
+    """
+    return pd.to_datetime(series, format=fmt, errors="coerce")
+
+
+def typed_frame(df, table):
+    """Convert the date/time column of a freshly read frame in place and return it."""
+    column, fmt = TIMESTAMP_COLUMNS[table]
+    if column in df.columns:
+        df[column] = parse_timestamps(df[column], fmt)
+    return df
+
+
+def backfill_timestamps(conn, table, batch_size=10000):
+    """
+    Rewrite every stored value of a table's date/time column in canonical form.
+
+    Walks the table in rowid order and only updates rows whose value changes.
+
+    Returns:
+        int: Number of rows rewritten
+    """
+    column, _ = TIMESTAMP_COLUMNS[table]
+    cursor = conn.cursor()
+    rewritten, last_rowid = 0, -1
+    while True:
+        rows = cursor.execute(
+            f"SELECT rowid, {column} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        last_rowid = rows[-1][0]
+        updates = []
+        for rowid, value in rows:
+            normalized = normalize_column(table, value)
+            if normalized != value:
+                updates.append((normalized, rowid))
+        if updates:
+            cursor.executemany(f"UPDATE {table} SET {column} = ? WHERE rowid = ?", updates)
+            rewritten += len(updates)
+    return rewritten
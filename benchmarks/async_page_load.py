@@ -0,0 +1,106 @@
+"""
+Multi-table page load: serial reads on one connection vs. AsyncDB.gather().
+
+Builds a throwaway database with synthetic incidents, tickets and metadata,
+then loads what a combined overview page would need (all three tables plus
+their grouped counts) first one call after another, as the pages do today,
+and then concurrently through app.async_db.
+
+Run from the project root:
+    python -m benchmarks.async_page_load [--rows 200000] [--workers 4] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from app.async_db import AsyncDB
+from app.db import connection, get_pool
+from app.incidents import get_all_incidents
+from app.it_tickets import get_all_it_tickets
+from app.metadata import get_all_metadata
+from app.schema import ensure_schema
+from benchmarks.dashboard_indexes import seed
+
+
+def group_counts(table, column):
+    def load(conn):
+        return conn.execute(f"SELECT {column}, COUNT(*) FROM {table} GROUP BY {column}").fetchall()
+    load.__name__ = f"{table}_{column}_counts"
+    return load
+
+
+PAGE_CALLS = [
+    get_all_incidents,
+    get_all_it_tickets,
+    get_all_metadata,
+    # Uncovered groupings, so they scan rather than hit a summary table
+    group_counts("cyber_incidents", "substr(timestamp, 1, 7)"),
+    group_counts("it_tickets", "substr(created_at, 1, 7)"),
+]
+
+
+def seed_metadata(conn, rows):
+    conn.executemany(
+        "INSERT INTO metadata VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, f"dataset_{i}", i * 10, 5 + i % 20, ("data_scientist", "cyber_admin", "it_admin")[i % 3],
+          "2024-01-27") for i in range(rows)),
+    )
+    conn.commit()
+
+
+def load_serial(db_path):
+    with connection(db_path) as conn:
+        return [call(conn) for call in PAGE_CALLS]
+
+
+def load_concurrent(db):
+    return asyncio.run(db.gather(*PAGE_CALLS))
+
+
+def best_of(repeat, load):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        ensure_schema(db_path)
+        with connection(db_path) as conn:
+            seed(conn, args.rows)
+            seed_metadata(conn, args.rows // 10)
+
+        db = AsyncDB(db_path, max_workers=args.workers, timeout=0)
+        try:
+            # Warm the page cache and every worker's connection first
+            load_serial(db_path)
+            load_concurrent(db)
+            serial = best_of(args.repeat, lambda: load_serial(db_path))
+            concurrent = best_of(args.repeat, lambda: load_concurrent(db))
+        finally:
+            db.close()
+            get_pool(db_path).close_all()
+
+    print("=" * 60)
+    print(f"Page load: {len(PAGE_CALLS)} calls, {args.rows:,} incidents/tickets, {args.workers} workers")
+    print("-" * 60)
+    print(f"{'serial (one connection)':<32}{serial:>12.1f} ms")
+    print(f"{'concurrent (AsyncDB.gather)':<32}{concurrent:>12.1f} ms")
+    print(f"{'speed-up':<32}{serial / concurrent:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Memory and speed of the declared category dtypes on a synthetic ticket frame.
+
+Builds a 1M-row it_tickets-shaped DataFrame the way read_sql_query returns
+it, then compares the low-cardinality columns (priority, status,
+assigned_to) held as object strings, as pandas' default str dtype, and as
+the categories app.dtypes declares: memory, the one-off conversion, and the
+operations the pages run on them.
+
+Run from the project root:
+    python -m benchmarks.category_dtypes [--rows 1000000] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from app.dtypes import CATEGORY_COLUMNS, categorize
+
+TABLE = "it_tickets"
+COLUMNS = CATEGORY_COLUMNS[TABLE]
+
+
+def synthetic_tickets(rows, seed_value=1510):
+    rng = random.Random(seed_value)
+    priorities = ["Low", "Medium", "High", "Critical"]
+    statuses = ["Open", "In Progress", "Resolved", "Closed"]
+    assignees = [f"IT_Support_{letter}" for letter in "ABCDEFGHIJ"]
+    return pd.DataFrame({
+        "ticket_id": range(rows),
+        "priority": [rng.choice(priorities) for _ in range(rows)],
+        "status": [rng.choice(statuses) for _ in range(rows)],
+        "assigned_to": [rng.choice(assignees) for _ in range(rows)],
+        "resolution_time_hours": [rng.randrange(1, 72) for _ in range(rows)],
+    })
+
+
+OPERATIONS = {
+    "value_counts(status)": lambda df: df["status"].value_counts(),
+    "crosstab(priority, status)": lambda df: pd.crosstab(df["priority"], df["status"]),
+    "filter status == 'Open'": lambda df: df[df["status"] == "Open"],
+    "groupby(assigned_to).mean": lambda df: df.groupby("assigned_to", observed=True)["resolution_time_hours"].mean(),
+    "isin(priority, High/Critical)": lambda df: df[df["priority"].isin(["High", "Critical"])],
+}
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def memory_mb(df):
+    return df[COLUMNS].memory_usage(deep=True, index=False).sum() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    base = synthetic_tickets(args.rows)
+    frames = {
+        "object": base.astype({column: object for column in COLUMNS}),
+        "str (default)": base.astype({column: "str" for column in COLUMNS}),
+    }
+    started = time.perf_counter()
+    frames["category"] = categorize(frames["str (default)"].copy(), TABLE)
+    convert_ms = (time.perf_counter() - started) * 1000
+
+    print("=" * 84)
+    print(f"{args.rows:,} tickets; columns {', '.join(COLUMNS)}")
+    print("-" * 84)
+    print(f"{'':<36}" + "".join(f"{name:>16}" for name in frames))
+    print(f"{'memory of the 3 columns (MB)':<36}" + "".join(f"{memory_mb(df):>16.1f}" for df in frames.values()))
+    for name, operation in OPERATIONS.items():
+        timings = [best_of(args.repeat, lambda df=df: operation(df)) for df in frames.values()]
+        print(f"{name + ' (ms)':<36}" + "".join(f"{ms:>16.1f}" for ms in timings))
+    print("-" * 84)
+    print(f"One-off categorize() after the read: {convert_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Dashboard query timings before and after the schema migrations' indexes.
+
+Builds a throwaway database with the base tables only (schema version 0),
+fills cyber_incidents and it_tickets with synthetic rows, times the queries
+the dashboards run, applies migrate_schema() and times them again.
+
+Run from the project root:
+    python -m benchmarks.dashboard_indexes [--rows 1000000] [--repeat 5]
+"""
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.schema import (
+    create_cyber_incidents_table,
+    create_datasets_metadata_table,
+    create_it_tickets_table,
+    get_schema_version,
+    migrate_schema,
+)
+
+DASHBOARD_QUERIES = {
+    "open incidents": "SELECT COUNT(*) FROM cyber_incidents WHERE status = 'Open'",
+    "severity breakdown": "SELECT severity, COUNT(*) FROM cyber_incidents GROUP BY severity",
+    "severity x category": "SELECT severity, category, COUNT(*) FROM cyber_incidents GROUP BY severity, category",
+    "critical phishing": "SELECT COUNT(*) FROM cyber_incidents WHERE severity = 'Critical' AND category = 'Phishing'",
+    "priority x status": "SELECT priority, status, COUNT(*) FROM it_tickets GROUP BY priority, status",
+    "tickets per assignee": "SELECT COUNT(*) FROM it_tickets WHERE assigned_to = 'IT_Support_B'",
+    "tickets last 7 days": "SELECT COUNT(*) FROM it_tickets WHERE created_at >= date('now', '-7 days')",
+}
+
+
+def seed(conn, rows, seed_value=1510):
+    """Fill both tables with `rows` synthetic records each."""
+    rng = random.Random(seed_value)
+    now = datetime.now()
+    severities = ["Low", "Medium", "High", "Critical"]
+    categories = ["Malware", "Phishing", "Denial of Service", "Insider Threat", "Data Breach", "Vulnerability Scan", "Other"]
+    incident_statuses = ["Open", "In Progress", "Closed", "Resolved"]
+    priorities = ["Low", "Medium", "High", "Critical"]
+    ticket_statuses = ["Open", "In Progress", "Resolved", "Closed"]
+    assignees = [f"IT_Support_{letter}" for letter in "ABCDEFGHIJ"]
+
+    def stamp():
+        return (now - timedelta(minutes=rng.randrange(3 * 365 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S")
+
+    conn.executemany(
+        "INSERT INTO cyber_incidents VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, stamp(), rng.choice(severities), rng.choice(categories), rng.choice(incident_statuses),
+          f"Incident {i} description") for i in range(rows)),
+    )
+    conn.executemany(
+        "INSERT INTO it_tickets VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((i, rng.choice(priorities), f"Ticket {i} problem description", rng.choice(ticket_statuses),
+          rng.choice(assignees), stamp(), rng.randrange(1, 72)) for i in range(rows)),
+    )
+    conn.commit()
+
+
+def time_queries(conn, repeat):
+    """Best-of-`repeat` wall time (ms) for each dashboard query."""
+    timings = {}
+    for name, sql in DASHBOARD_QUERIES.items():
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql).fetchall()
+            best = min(best, time.perf_counter() - started)
+        timings[name] = best * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "bench.db")
+        create_cyber_incidents_table(conn)
+        create_datasets_metadata_table(conn)
+        create_it_tickets_table(conn)
+
+        started = time.perf_counter()
+        seed(conn, args.rows)
+        print(f"Seeded {args.rows:,} incidents and {args.rows:,} tickets in {time.perf_counter() - started:.1f}s")
+
+        before = time_queries(conn, args.repeat)
+        started = time.perf_counter()
+        migrate_schema(conn)
+        print(f"Migrated to schema version {get_schema_version(conn)} in {time.perf_counter() - started:.1f}s")
+        after = time_queries(conn, args.repeat)
+        conn.close()
+
+    print("=" * 64)
+    print(f"{'query':<24}{'before (ms)':>13}{'after (ms)':>13}{'speed-up':>12}")
+    print("-" * 64)
+    for name in DASHBOARD_QUERIES:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<24}{before[name]:>13.2f}{after[name]:>13.2f}{speedup:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Parallel CSV ingestion (app.ingest) against the streaming migrate_csv().
+
+Writes a synthetic export, measures the parse phase alone at 1, 2, 4 ...
+workers (up to the CPU count) to show how it scales, then loads the file
+into fresh databases with ingest_csv() and with the repository's
+migrate_csv().
+
+Run from the project root:
+    python -m benchmarks.ingest [--rows 1000000] [--table it_tickets] [--workers 1 2 4 8]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.db import connection
+from app.ingest import REPOSITORIES, format_report, ingest_csv
+from app.schema import create_all_tables
+from benchmarks.synthetic import write_csv
+
+
+def worker_counts(limit):
+    counts, n = [], 1
+    while n < limit:
+        counts.append(n)
+        n *= 2
+    return counts + [limit]
+
+
+def fresh_database(directory, name):
+    path = Path(directory) / name
+    with connection(path) as conn, contextlib.redirect_stdout(io.StringIO()):
+        create_all_tables(conn)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--table", default="it_tickets", choices=["cyber_incidents", "it_tickets"])
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="worker counts for the parse phase")
+    args = parser.parse_args()
+    counts = args.workers or worker_counts(os.cpu_count() or 1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = Path(directory) / f"{args.table}.csv"
+        write_csv(csv_path, args.table, args.rows)
+        print("=" * 84)
+        print(f"{args.rows:,} {args.table} rows, {csv_path.stat().st_size / 1e6:.0f} MB, {os.cpu_count()} CPUs")
+        print("-" * 84)
+
+        print("Parse phase only (rows are discarded):")
+        db_path = fresh_database(directory, "ingest.db")
+        baseline = None
+        for workers in counts:
+            with connection(db_path) as conn, contextlib.redirect_stdout(io.StringIO()):
+                report = ingest_csv(conn, csv_path, args.table, workers=workers, parse_only=True)
+            rate = report["parse"]["rows_per_sec"]
+            baseline = baseline or rate
+            print(f"  {workers:>3} workers  {report['parse']['seconds']:>7.2f}s  {rate:>10,} rows/s  "
+                  f"x{rate / baseline:.2f}")
+        print("-" * 84)
+
+        with connection(db_path) as conn, contextlib.redirect_stdout(io.StringIO()):
+            report = ingest_csv(conn, csv_path, args.table, workers=counts[-1])
+        print(f"ingest_csv ({counts[-1]} workers):")
+        print(format_report(report))
+
+        db_path = fresh_database(directory, "migrate.db")
+        started = time.perf_counter()
+        with connection(db_path) as conn, contextlib.redirect_stdout(io.StringIO()):
+            REPOSITORIES[args.table].migrate_csv(csv_path, conn=conn)
+        seconds = time.perf_counter() - started
+        print("-" * 84)
+        print(f"migrate_csv: {seconds:.2f}s ({args.rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
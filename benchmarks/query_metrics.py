@@ -0,0 +1,79 @@
+"""
+Cost of app.query_metrics: the same reads on a plain and an instrumented connection.
+
+Times a loop of primary-key lookups (the per-statement overhead dominates)
+and a whole-table read_sql_query (the per-row fetch overhead dominates), on
+a connection opened while metrics are off and on.
+
+Run from the project root:
+    python -m benchmarks.query_metrics [--rows 100000] [--lookups 20000] [--repeat 5]
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from app.query_metrics import connection_factory, disable_query_metrics, enable_query_metrics, query_stats
+from benchmarks.synthetic import load
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def lookups(conn, count, rows):
+    for ticket_id in range(0, rows, max(1, rows // count)):
+        conn.execute("SELECT status FROM it_tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "metrics.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute("""CREATE TABLE it_tickets (ticket_id INTEGER PRIMARY KEY, priority TEXT, description TEXT,
+                            status TEXT, assigned_to TEXT, created_at TEXT, resolution_time_hours INTEGER)""")
+            load(conn, "it_tickets", args.rows)
+
+        timings = {}
+        for label, enabled in (("metrics off", False), ("metrics on", True)):
+            if enabled:
+                enable_query_metrics(slow_ms=float("inf"))
+            else:
+                disable_query_metrics()
+            conn = sqlite3.connect(path, factory=connection_factory())
+            timings[label] = (
+                best_of(args.repeat, lambda: lookups(conn, args.lookups, args.rows)),
+                best_of(args.repeat, lambda: pd.read_sql_query("SELECT * FROM it_tickets", conn)),
+            )
+            conn.close()
+        recorded = sum(entry["calls"] for entry in query_stats())
+        disable_query_metrics()
+
+    print("=" * 72)
+    print(f"{'':<16}{f'{args.lookups:,} PK lookups (ms)':>28}{f'{args.rows:,}-row read (ms)':>28}")
+    print("-" * 72)
+    for label, (lookup_ms, read_ms) in timings.items():
+        print(f"{label:<16}{lookup_ms:>28.1f}{read_ms:>28.1f}")
+    print("-" * 72)
+    (off_lookup, off_read), (on_lookup, on_read) = timings.values()
+    print(f"Overhead per statement: {(on_lookup - off_lookup) * 1000 / args.lookups:.1f} µs; "
+          f"per fetched row: {(on_read - off_read) * 1e6 / args.rows:.0f} ns ({recorded:,} statements recorded)")
+
+
+if __name__ == "__main__":
+    main()
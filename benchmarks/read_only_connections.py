@@ -0,0 +1,86 @@
+"""
+Dashboard read latency: the read-write pool vs. the read-only (mode=ro, mmap) pool.
+
+Seeds a throwaway database with synthetic incidents and tickets, then runs
+the reads the dashboards make through a pooled connection of each mode and
+reports the median latency of each.
+
+Run from the project root:
+    python -m benchmarks.read_only_connections [--rows 500000] [--repeat 50]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.db import READ_ONLY_MODE, ConnectionPool, connection, get_pool
+from app.pagination import fetch_page
+from app.schema import ensure_schema
+from benchmarks.dashboard_indexes import seed
+
+DASHBOARD_READS = {
+    "ticket by id": lambda conn, rng, rows: conn.execute(
+        "SELECT * FROM it_tickets WHERE ticket_id = ?", (rng.randrange(rows),)
+    ).fetchone(),
+    "raw table page": lambda conn, rng, rows: fetch_page(
+        conn, "it_tickets", 50, "created_at", after=("2024-01-01 00:00:00", rng.randrange(rows))
+    ),
+    "status scan": lambda conn, rng, rows: conn.execute(
+        "SELECT status, COUNT(*) FROM cyber_incidents GROUP BY status"
+    ).fetchall(),
+    "description search": lambda conn, rng, rows: conn.execute(
+        "SELECT COUNT(*) FROM it_tickets WHERE description LIKE ?", (f"%{rng.randrange(1000)}%",)
+    ).fetchone(),
+}
+
+
+def time_reads(pool, rows, repeat):
+    """Median latency (ms) of each dashboard read on one pooled connection."""
+    rng = random.Random(1510)
+    timings = {}
+    for name, read in DASHBOARD_READS.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with pool.connection() as conn:
+                read(conn, rng, rows)
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        ensure_schema(db_path)
+        with connection(db_path) as conn:
+            seed(conn, args.rows)
+        get_pool(db_path).close_all()
+
+        results = {}
+        for mode in ("wal", READ_ONLY_MODE):
+            pool = ConnectionPool(db_path, mode=mode)
+            try:
+                time_reads(pool, args.rows, 3)  # warm the OS and page caches
+                results[mode] = time_reads(pool, args.rows, args.repeat)
+            finally:
+                pool.close_all()
+
+    print("=" * 64)
+    print(f"{'read':<24}{'read-write (ms)':>16}{'read-only (ms)':>16}{'change':>8}")
+    print("-" * 64)
+    for name in DASHBOARD_READS:
+        before, after = results["wal"][name], results[READ_ONLY_MODE][name]
+        print(f"{name:<24}{before:>16.3f}{after:>16.3f}{(after - before) / before:>+8.0%}")
+
+
+if __name__ == "__main__":
+    main()
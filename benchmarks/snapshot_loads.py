@@ -0,0 +1,97 @@
+"""
+Cold-load benchmark: pd.read_sql_query over SQLite vs. a memory-mapped Arrow snapshot.
+
+Seeds a throwaway database with synthetic tickets, writes the it_tickets
+snapshot, applies a few writes after it, then loads the table both ways.
+Each load runs in a fresh process so the time and peak memory are cold
+(peak memory is read from /proc, so it is Linux-only).
+
+Needs pyarrow. Run from the project root:
+    python -m benchmarks.snapshot_loads [--rows 1000000] [--writes-after 1000]
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from app.analytics import table_frame
+from app.changes import LiveTable
+from app.db import connection
+from app.schema import ensure_schema
+from app.snapshots import snapshots_available, write_snapshot
+from benchmarks.dashboard_indexes import seed
+
+TABLE = "it_tickets"
+
+
+def _status_mb(field):
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _load(db_path, how, results):
+    # ru_maxrss survives fork/exec, so reset the peak (Linux) and read VmHWM instead
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    baseline = _status_mb("VmRSS")
+    started = time.perf_counter()
+    with connection(db_path) as conn:
+        if how == "sqlite":
+            df = table_frame(conn, TABLE)
+        else:
+            # Snapshot plus the writes made after it, as the live tables load
+            df = LiveTable(TABLE).refresh(conn)
+    results.put((len(df), (time.perf_counter() - started) * 1000, _status_mb("VmHWM") - baseline))
+
+
+def cold_load(db_path, how):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_load, args=(db_path, how, results))
+    process.start()
+    rows, ms, peak_mb = results.get()
+    process.join()
+    return rows, ms, peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--writes-after", type=int, default=1000)
+    args = parser.parse_args()
+
+    if not snapshots_available():
+        print("❌ pyarrow is not installed; nothing to compare")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        ensure_schema(db_path)
+        with connection(db_path) as conn:
+            seed(conn, args.rows)
+            started = time.perf_counter()
+            write_snapshot(conn, TABLE)
+            print(f"Snapshot of {args.rows:,} tickets written in {time.perf_counter() - started:.1f}s")
+            conn.executemany(
+                "UPDATE it_tickets SET status = 'Closed' WHERE ticket_id = ?",
+                ((ticket_id,) for ticket_id in range(0, args.rows, max(1, args.rows // args.writes_after))),
+            )
+
+        sqlite_rows, sqlite_ms, sqlite_mb = cold_load(db_path, "sqlite")
+        snapshot_rows, snapshot_ms, snapshot_mb = cold_load(db_path, "snapshot")
+
+    print("=" * 64)
+    print(f"{'cold load of ' + TABLE:<28}{'rows':>10}{'time (ms)':>12}{'peak +MB':>12}")
+    print("-" * 64)
+    print(f"{'SQLite read_sql_query':<28}{sqlite_rows:>10,}{sqlite_ms:>12.0f}{sqlite_mb:>12.0f}")
+    print(f"{'Arrow snapshot + delta':<28}{snapshot_rows:>10,}{snapshot_ms:>12.0f}{snapshot_mb:>12.0f}")
+    print(f"{'speed-up':<28}{'':>10}{sqlite_ms / snapshot_ms:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Scale benchmark of the whole data layer, with JSON results for comparing commits.
+
+Builds a throwaway database with the base tables only (schema version 0),
+loads benchmarks.synthetic data at the chosen scale, then times:
+
+    schema.*     every migration in MIGRATIONS, applied once to the loaded data
+    crud.*       each app/ CRUD function (inserts, reads, updates, deletes,
+                 bulk variants and CSV migration) on the loaded tables
+    dashboard.*  the data path behind each dashboard page, with the result
+                 cache cleared before every run so the database work is timed
+
+Results go to stdout as a table and, with --output, to a JSON file holding
+the commit, environment, row counts and {name: {median_ms, min_ms, runs}}.
+--compare prints the ratio against an earlier JSON file and exits with
+status 1 when any benchmark got slower than --threshold.
+
+Run from the project root:
+    python -m benchmarks.suite [--scale 10k|1m|10m] [--repeat 5] [--only crud.]
+                               [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from app import incidents, it_tickets, metadata, users
+from app.analytics import (
+    dataset_columns_by_name,
+    incident_counts_by,
+    incident_summary,
+    incident_volume,
+    metadata_summary,
+    priority_status_percentages,
+    ticket_counts_by,
+    ticket_summary,
+    ticket_volume,
+)
+from app.cache import clear_cache
+from app.changes import live_table_frame
+from app.db import close_all_pools, connection, read_connection
+from app.pagination import estimate_row_count, fetch_page
+from app.schema import (
+    MIGRATIONS,
+    create_cyber_incidents_table,
+    create_datasets_metadata_table,
+    create_it_tickets_table,
+    create_migration_state_table,
+    create_users_table,
+    migrate_schema,
+)
+from app.search import search_incidents, search_tickets
+from benchmarks.synthetic import generate, load, table_rows, write_csv
+
+# Rows written per run by the bulk and CSV-migration benchmarks
+BULK_ROWS = 1_000
+CSV_ROWS = 10_000
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def timed(func, repeat, setup=None):
+    """
+    Best and median wall time of func(*setup()) over `repeat` runs.
+
+    setup() runs before each call, outside the timing; both run with stdout
+    silenced, since the CRUD helpers print a line per call.
+    """
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            args = setup() or () if setup else ()
+            started = time.perf_counter()
+            func(*args)
+            timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3), "runs": repeat}
+
+
+def build_database(path, scale, seed):
+    """Base tables plus synthetic rows (schema version 0). Returns rows per table."""
+    rows = table_rows(scale)
+    with connection(path) as conn, contextlib.redirect_stdout(io.StringIO()):
+        for create in (create_users_table, create_cyber_incidents_table, create_datasets_metadata_table,
+                       create_it_tickets_table, create_migration_state_table):
+            create(conn)
+        for table, count in rows.items():
+            load(conn, table, count, seed)
+    return rows
+
+
+def schema_benchmarks(path):
+    """Each migration once, in order, over the loaded rows (they only ever run once per database)."""
+    results = {}
+    with connection(path) as conn:
+        for version, _, _ in MIGRATIONS:
+            results[f"schema.v{version}"] = timed(lambda: migrate_schema(conn, version), 1)
+    return results
+
+
+# Domain table -> (module, key column, CRUD helpers, column set by the single
+# and bulk updates with its new value, filters selecting rows for the bulk update)
+CRUD_TABLES = {
+    "cyber_incidents": (incidents, "incident_id", {
+        "insert": "insert_incident", "read": "get_all_incidents", "update": "update_incident_status",
+        "delete": "delete_incident", "insert_bulk": "insert_incidents_bulk",
+        "update_bulk": "update_incident_status_bulk", "delete_bulk": "delete_incidents_bulk",
+        "migrate": "migrate_all_incidents",
+    }, "Resolved", {"status": "Open", "severity": "Low"}),
+    "it_tickets": (it_tickets, "ticket_id", {
+        "insert": "insert_it_tickets", "read": "get_all_it_tickets", "update": "update_ticket_status",
+        "delete": "delete_ticket", "insert_bulk": "insert_it_tickets_bulk",
+        "update_bulk": "update_ticket_status_bulk", "delete_bulk": "delete_tickets_bulk",
+        "migrate": "migrate_it_tickets",
+    }, "Resolved", {"status": "Open", "priority": "Low"}),
+    "metadata": (metadata, "dataset_id", {
+        "insert": "insert_datasets_metadata", "read": "get_all_metadata", "update": "update_dataset_name",
+        "delete": "delete_dataset", "insert_bulk": "insert_datasets_metadata_bulk",
+        "migrate": "migrate_all_metadata",
+    }, "renamed_dataset", None),
+}
+
+
+def crud_benchmarks(path, rows, repeat, workdir, seed):
+    """Every CRUD function in app/, on the loaded tables."""
+    results = {}
+    # Keys above everything loaded, so inserted rows never collide
+    keys = itertools.count(max(rows.values()) + 1)
+
+    def fresh(table, count):
+        first = next(keys)
+        for _ in range(count - 1):
+            next(keys)
+        return next(generate(table, count, seed + first, chunk_rows=count, first_id=first))
+
+    def fresh_row(table):
+        return fresh(table, 1).astype(object).iloc[0].tolist()
+
+    with connection(path) as conn:
+        # timed() runs each closure straight away, so they may use the loop variables
+        for table, (module, key, helpers, new_value, bulk_filters) in CRUD_TABLES.items():
+            prefix = f"crud.{module.__name__.rsplit('.', 1)[-1]}."
+            call = {role: getattr(module, helper) for role, helper in helpers.items()}
+
+            def inserted_row():
+                row = fresh_row(table)
+                call["insert"](conn, *row)
+                return (row[0],)
+
+            def inserted_keys():
+                frame = fresh(table, BULK_ROWS)
+                call["insert_bulk"](conn, frame)
+                return (frame[key].tolist(),)
+
+            def csv_file():
+                first = fresh(table, 1)[key].iloc[0]
+                path = workdir / f"{table}_{first}.csv"
+                return (write_csv(path, table, CSV_ROWS, seed + int(first), first_id=int(first) * CSV_ROWS),)
+
+            results[prefix + helpers["insert"]] = timed(
+                lambda row: call["insert"](conn, *row), repeat, lambda: (fresh_row(table),))
+            results[prefix + helpers["read"]] = timed(lambda: call["read"](conn), repeat)
+            results[prefix + helpers["update"]] = timed(
+                lambda: call["update"](conn, rows[table] // 2, new_value), repeat)
+            results[prefix + helpers["delete"]] = timed(lambda row_key: call["delete"](conn, row_key), repeat,
+                                                        inserted_row)
+            results[prefix + helpers["insert_bulk"]] = timed(
+                lambda frame: call["insert_bulk"](conn, frame), repeat, lambda: (fresh(table, BULK_ROWS),))
+            if "update_bulk" in helpers:
+                results[prefix + helpers["update_bulk"]] = timed(
+                    lambda: call["update_bulk"](conn, new_value, filters=bulk_filters), repeat)
+                results[prefix + helpers["delete_bulk"]] = timed(
+                    lambda row_keys: call["delete_bulk"](conn, row_keys), repeat, inserted_keys)
+            results[prefix + helpers["migrate"]] = timed(
+                lambda csv_path: call["migrate"](conn, csv_path, resume=False), repeat, csv_file)
+
+        password_hash = "$2b$12$" + "0" * 53
+        results["crud.users.insert_user"] = timed(
+            lambda username: users.insert_user(conn, username, password_hash), repeat,
+            lambda: (f"bench_user_{next(keys)}",))
+        results["crud.users.get_user_by_username"] = timed(
+            lambda: users.get_user_by_username(conn, f"user_{rows['users'] // 2}"), repeat)
+    return results
+
+
+def dashboard_benchmarks(path, repeat):
+    """The reads behind each page, uncached, through the pages' read-only connections."""
+    today = date.today()
+    with read_connection(path) as conn:
+        paths = {
+            # 1_Cyber_Incidents
+            "dashboard.incidents.incident_summary": lambda: incident_summary(conn),
+            "dashboard.incidents.counts_by_severity_status": lambda: incident_counts_by(conn, ["severity", "status"]),
+            "dashboard.incidents.counts_by_category": lambda: incident_counts_by(conn, "category"),
+            "dashboard.incidents.weekly_volume": lambda: incident_volume(conn, "week", by="severity"),
+            "dashboard.incidents.first_page": lambda: fetch_page(conn, "cyber_incidents", 50, "timestamp", True),
+            "dashboard.incidents.row_estimate": lambda: estimate_row_count(conn, "cyber_incidents"),
+            "dashboard.incidents.search": lambda: search_incidents(conn, "payroll serv", {"severity": "Critical"}),
+            # 2_IT_Tickets
+            "dashboard.tickets.ticket_summary": lambda: ticket_summary(conn, today=today),
+            "dashboard.tickets.counts_by_assignee": lambda: ticket_counts_by(conn, "assigned_to"),
+            "dashboard.tickets.priority_status_percentages": lambda: priority_status_percentages(conn),
+            "dashboard.tickets.daily_volume": lambda: ticket_volume(conn, "day", by="priority"),
+            "dashboard.tickets.first_page": lambda: fetch_page(conn, "it_tickets", 50, "created_at", True),
+            "dashboard.tickets.row_estimate": lambda: estimate_row_count(conn, "it_tickets"),
+            "dashboard.tickets.search": lambda: search_tickets(conn, "vpn remote", {"status": "Open"}),
+            # 3_Datasets_Metadata
+            "dashboard.metadata.metadata_summary": lambda: metadata_summary(conn, today=today),
+            "dashboard.metadata.dataset_columns_by_name": lambda: dataset_columns_by_name(conn),
+            "dashboard.metadata.first_page": lambda: fetch_page(conn, "metadata", 50),
+            # Analysis views: the live ticket frame, already current
+            "dashboard.tickets.live_frame": lambda: live_table_frame(conn, "it_tickets"),
+        }
+        # Warm the live frame so the timed runs measure a refresh, not the first load
+        live_table_frame(conn, "it_tickets")
+        return {name: timed(func, repeat, clear_cache) for name, func in paths.items()}
+
+
+def environment():
+    """Commit and versions the results were measured with."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "measured_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print median ratios against a baseline run; return the names that got slower than `threshold`."""
+    slower = []
+    print(f"{'benchmark':<56}{'baseline ms':>14}{'now ms':>12}{'ratio':>9}")
+    for name, timing in results.items():
+        before = baseline["results"].get(name)
+        if before is None or not before["median_ms"]:
+            continue
+        ratio = timing["median_ms"] / before["median_ms"]
+        flag = ""
+        if ratio > 1 + threshold:
+            slower.append(name)
+            flag = "  ❌ slower"
+        print(f"{name:<56}{before['median_ms']:>14.2f}{timing['median_ms']:>12.2f}{ratio:>9.2f}{flag}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="10k", help="10k, 1m, 10m or a row count")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1510)
+    parser.add_argument("--only", help="Run only benchmarks whose name starts with this (schema., crud., dashboard.)")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", type=Path, help="Earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown (as a fraction of the baseline median) that counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        path = workdir / "suite.db"
+        started = time.perf_counter()
+        rows = build_database(path, args.scale, args.seed)
+        print(f"Loaded {', '.join(f'{table} {n:,}' for table, n in rows.items())} "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        # Migrations run first (the CRUD and dashboard paths need the upgraded schema)
+        results = schema_benchmarks(path)
+        groups = [("crud.", lambda: crud_benchmarks(path, rows, args.repeat, workdir, args.seed)),
+                  ("dashboard.", lambda: dashboard_benchmarks(path, args.repeat))]
+        for prefix, run in groups:
+            if args.only and not (prefix.startswith(args.only) or args.only.startswith(prefix)):
+                continue
+            results.update(run())
+        close_all_pools()
+
+    if args.only:
+        results = {name: timing for name, timing in results.items() if name.startswith(args.only)}
+
+    print("=" * 84)
+    print(f"{'benchmark':<60}{'median ms':>12}{'min ms':>12}")
+    print("-" * 84)
+    for name, timing in results.items():
+        print(f"{name:<60}{timing['median_ms']:>12.2f}{timing['min_ms']:>12.2f}")
+
+    report = {**environment(), "scale": args.scale, "seed": args.seed, "repeat": args.repeat,
+              "rows": rows, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        print("=" * 91)
+        print(f"Against {args.compare} (commit {baseline.get('commit')}, scale {baseline.get('scale')})")
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print(f"❌ {len(slower)} benchmark(s) more than {args.threshold:.0%} slower")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Incremental CSV re-sync (app.sync) of a repeated, mostly unchanged export.
+
+Writes a synthetic export and loads it with ingest_csv(), then times:
+the first sync (no stored hashes yet, so every row is compared with the
+database), a re-sync of the identical file, and a re-sync of a copy in
+which a fraction of rows changed status, some rows are new and some are
+gone (with delete=True).
+
+Run from the project root:
+    python -m benchmarks.sync [--rows 1000000] [--table cyber_incidents] [--changed 0.01] [--workers 4]
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import tempfile
+from pathlib import Path
+
+from app.db import connection
+from app.ingest import ingest_csv
+from app.schema import create_all_tables
+from app.sync import format_report, sync_csv
+from benchmarks.synthetic import write_csv
+
+
+def changed_copy(source, target, fraction, seed_step=7919):
+    """Copy of an export with ~fraction of rows changed, fraction/2 removed and fraction/2 appended."""
+    every = max(1, round(1 / fraction))
+    with open(source, newline="", encoding="utf-8") as f_in, open(target, "w", newline="", encoding="utf-8") as f_out:
+        reader, writer = csv.reader(f_in), csv.writer(f_out)
+        header = next(reader)
+        writer.writerow(header)
+        status = header.index("status")
+        extra = []
+        for number, record in enumerate(reader):
+            slot = (number * seed_step) % every
+            if slot == 0:
+                record[status] = "Reopened"
+            elif slot == 1 and len(extra) * 2 < number // every:
+                extra.append(record)
+                continue
+            writer.writerow(record)
+        for offset, record in enumerate(extra):
+            record[0] = str(10 ** 9 + offset)
+            writer.writerow(record)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--table", default="cyber_incidents", choices=["cyber_incidents", "it_tickets"])
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of rows changed in the re-export")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        export = write_csv(Path(directory) / "export.csv", args.table, args.rows)
+        reexport = changed_copy(export, Path(directory) / "reexport.csv", args.changed)
+        db_path = Path(directory) / "sync.db"
+        with connection(db_path) as conn:
+            with contextlib.redirect_stdout(io.StringIO()):
+                create_all_tables(conn)
+                ingest_csv(conn, export, args.table, workers=args.workers)
+
+            print("=" * 84)
+            print(f"{args.rows:,} {args.table} rows, re-export with {args.changed:.1%} changed")
+            for label, path, delete in [("first sync (no stored hashes)", export, False),
+                                        ("same export again", export, False),
+                                        ("changed re-export, --delete", reexport, True)]:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    report = sync_csv(conn, path, args.table, delete=delete, workers=args.workers)
+                print("-" * 84)
+                print(label)
+                print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Seeded, vectorized synthetic data for the four platform tables.
+
+Rows are generated with numpy in fixed-size chunks, so 10M-row tables never
+sit in memory at once. Value frequencies are skewed the way real queues are:
+most incidents are Low/Medium and a few categories dominate, a quarter of
+the assignees take most tickets (Zipf), and timestamps cluster in working
+hours over the last three years.
+
+Used by benchmarks.suite; on its own it writes a database:
+    python -m benchmarks.synthetic path/to/new.db [--scale 1m] [--seed 1510]
+"""
+
+import argparse
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from app.db import connection
+
+# Named scales: incident and ticket rows; metadata and users get 1% (min 10)
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+CHUNK_ROWS = 100_000
+
+SEVERITIES = (["Low", "Medium", "High", "Critical"], [0.42, 0.33, 0.18, 0.07])
+CATEGORIES = (["Phishing", "Malware", "Vulnerability Scan", "Denial of Service", "Insider Threat", "Data Breach", "Other"],
+              [0.34, 0.22, 0.16, 0.10, 0.07, 0.04, 0.07])
+INCIDENT_STATUSES = (["Closed", "Resolved", "In Progress", "Open"], [0.45, 0.25, 0.18, 0.12])
+PRIORITIES = (["Low", "Medium", "High", "Critical"], [0.38, 0.37, 0.19, 0.06])
+TICKET_STATUSES = (["Closed", "Resolved", "In Progress", "Open"], [0.40, 0.30, 0.17, 0.13])
+UPLOADERS = (["data_scientist", "cyber_admin", "it_admin"], [0.6, 0.25, 0.15])
+
+# Words the descriptions are assembled from (gives FTS a realistic vocabulary)
+DESCRIPTION_SUBJECTS = np.array(["Suspicious email", "Credential harvesting page", "Ransomware sample", "Port scan",
+                                 "VPN login failure", "Printer outage", "Laptop overheating", "Password reset",
+                                 "Unusual outbound traffic", "Expired certificate", "Disk nearly full", "Slow database"])
+DESCRIPTION_CONTEXTS = np.array(["reported by finance", "on the payroll server", "from an external IP",
+                                 "after the weekend patch", "affecting remote staff", "in the London office",
+                                 "flagged by the SIEM", "during month-end close"])
+
+START = np.datetime64("2023-01-01T00:00:00")
+SPAN_MINUTES = 3 * 365 * 24 * 60
+
+
+def table_rows(scale):
+    """Rows per table for a named scale (or a plain row count)."""
+    rows = SCALES.get(str(scale).lower(), None) or int(scale)
+    small = max(10, rows // 100)
+    return {"cyber_incidents": rows, "it_tickets": rows, "metadata": small, "users": small}
+
+
+def _choice(rng, values_weights, size):
+    values, weights = values_weights
+    return np.asarray(values)[rng.choice(len(values), size=size, p=weights)]
+
+
+def _zipf_choice(rng, values, size, exponent=1.1):
+    weights = 1.0 / np.arange(1, len(values) + 1) ** exponent
+    return np.asarray(values)[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+def _timestamps(rng, size, fmt_seconds=True):
+    """Canonical 'YYYY-MM-DD HH:MM:SS' strings, weighted towards 08:00-18:00."""
+    days = rng.integers(0, SPAN_MINUTES // (24 * 60), size=size)
+    hours = np.where(rng.random(size) < 0.75, rng.integers(8, 18, size=size), rng.integers(0, 24, size=size))
+    minutes = days * 24 * 60 + hours * 60 + rng.integers(0, 60, size=size)
+    stamps = START + minutes.astype("timedelta64[m]") + rng.integers(0, 60, size=size).astype("timedelta64[s]")
+    text = np.datetime_as_string(stamps, unit="s" if fmt_seconds else "D")
+    return np.char.replace(text, "T", " ")
+
+
+def _descriptions(rng, ids, size):
+    subjects = DESCRIPTION_SUBJECTS[rng.integers(0, len(DESCRIPTION_SUBJECTS), size=size)]
+    contexts = DESCRIPTION_CONTEXTS[rng.integers(0, len(DESCRIPTION_CONTEXTS), size=size)]
+    return np.char.add(np.char.add(np.char.add(subjects, " "), contexts), np.char.add(" #", ids.astype(str)))
+
+
+def generate(table, rows, seed=1510, chunk_rows=CHUNK_ROWS, first_id=0):
+    """
+    Yield DataFrames (in the table's column order) totalling `rows` rows.
+
+    The same (table, rows, seed) always produces the same data.
+    """
+    rng = np.random.default_rng([seed, zlib.crc32(table.encode())])
+    assignees = [f"IT_Support_{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(40)]
+    for start in range(0, rows, chunk_rows):
+        size = min(chunk_rows, rows - start)
+        ids = np.arange(first_id + start, first_id + start + size)
+        if table == "cyber_incidents":
+            frame = {
+                "incident_id": ids,
+                "timestamp": _timestamps(rng, size),
+                "severity": _choice(rng, SEVERITIES, size),
+                "category": _choice(rng, CATEGORIES, size),
+                "status": _choice(rng, INCIDENT_STATUSES, size),
+                "description": _descriptions(rng, ids, size),
+            }
+        elif table == "it_tickets":
+            frame = {
+                "ticket_id": ids,
+                "priority": _choice(rng, PRIORITIES, size),
+                "description": _descriptions(rng, ids, size),
+                "status": _choice(rng, TICKET_STATUSES, size),
+                "assigned_to": _zipf_choice(rng, assignees, size),
+                "created_at": _timestamps(rng, size),
+                # Long-tailed resolution times, in whole hours
+                "resolution_time_hours": np.minimum(rng.lognormal(2.5, 1.0, size=size), 720).astype(int) + 1,
+            }
+        elif table == "metadata":
+            frame = {
+                "dataset_id": ids,
+                "name": np.char.add("dataset_", ids.astype(str)),
+                "rows": rng.lognormal(9, 2, size=size).astype(int) + 1,
+                "columns": rng.integers(3, 200, size=size),
+                "uploaded_by": _choice(rng, UPLOADERS, size),
+                "upload_date": _timestamps(rng, size, fmt_seconds=False),
+            }
+        elif table == "users":
+            frame = {
+                "username": np.char.add("user_", ids.astype(str)),
+                # Stand-in for a bcrypt hash (same length); nothing logs in with it
+                "password_hash": np.char.add("$2b$12$", np.char.zfill(ids.astype(str), 53)),
+                "role": np.where(rng.random(size) < 0.1, "admin", "user"),
+            }
+        else:
+            raise ValueError(f"No generator for table '{table}'")
+        yield pd.DataFrame(frame)
+
+
+def load(conn, table, rows, seed=1510):
+    """Insert `rows` generated rows straight into `table` (one transaction per chunk). Returns seconds."""
+    started = time.perf_counter()
+    for frame in generate(table, rows, seed):
+        columns = list(frame.columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        records = frame.astype(object).itertuples(index=False, name=None)
+        conn.executemany(sql, records)
+        conn.commit()
+    return time.perf_counter() - started
+
+
+def write_csv(path, table, rows, seed=1510, first_id=0):
+    """Write generated rows as a CSV export with a header (for the migrate_* functions)."""
+    for number, frame in enumerate(generate(table, rows, seed, first_id=first_id)):
+        frame.to_csv(path, mode="w" if number == 0 else "a", header=number == 0, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    from app.schema import ensure_schema
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db")
+    parser.add_argument("--scale", default="10k", help="10k, 1m, 10m or a row count")
+    parser.add_argument("--seed", type=int, default=1510)
+    args = parser.parse_args()
+
+    ensure_schema(args.db)
+    with connection(args.db) as conn:
+        for table, rows in table_rows(args.scale).items():
+            seconds = load(conn, table, rows, args.seed)
+            print(f"✅ {table}: {rows:,} rows in {seconds:.1f}s")
@@ -0,0 +1,72 @@
+"""
+Cost of turning stored date/time text into datetimes on every page load.
+
+Compares the old read path - mixed formats ("27/01/2024 05:00", "2024-01-27",
+"00:00.0") through pd.to_datetime(errors='coerce') - with the canonical
+ISO-8601 values written since schema version 2, parsed with parse_timestamps().
+Also reports how many real dates the old path silently turned into NaT.
+
+Run from the project root:
+    python -m benchmarks.timestamp_parsing [--rows 1000000] [--repeat 3]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from app.timestamps import normalize_timestamp, parse_timestamps
+
+
+def mixed_values(rows, seed_value=1510):
+    """Stored values as they look before the backfill."""
+    rng = random.Random(seed_value)
+    start = datetime(2023, 1, 1)
+    values = []
+    for _ in range(rows):
+        moment = start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+        kind = rng.random()
+        if kind < 0.6:
+            values.append(moment.strftime("%d/%m/%Y %H:%M"))      # CSV export
+        elif kind < 0.9:
+            values.append(moment.strftime("%Y-%m-%d"))            # New Ticket form
+        else:
+            values.append("00:00.0")                              # lost date placeholder
+    return values
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    mixed = pd.Series(mixed_values(args.rows))
+    canonical = pd.Series([normalize_timestamp(value) for value in mixed])
+    real_dates = int(canonical.notna().sum())
+
+    old_seconds, old_result = best_of(args.repeat, lambda: pd.to_datetime(mixed, errors="coerce"))
+    new_seconds, new_result = best_of(args.repeat, lambda: parse_timestamps(canonical))
+
+    print("=" * 64)
+    print(f"Parsing {args.rows:,} stored values ({real_dates:,} hold a real date)")
+    print("-" * 64)
+    print(f"{'read path':<34}{'seconds':>10}{'dates lost':>14}")
+    print(f"{'mixed text, errors=coerce':<34}{old_seconds:>10.3f}{real_dates - int(old_result.notna().sum()):>14,}")
+    print(f"{'canonical ISO-8601':<34}{new_seconds:>10.3f}{real_dates - int(new_result.notna().sum()):>14,}")
+    print(f"speed-up: {old_seconds / new_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Concurrency benchmark: dashboard read throughput while a form keeps writing.
+
+Seeds a throwaway it_tickets table, then runs reader threads that repeat the
+IT Tickets dashboard status query, first on their own and then next to a
+writer thread inserting tickets one commit at a time (like the New Ticket form).
+Each journal mode is measured with its own connection pool.
+
+Run from the project root:
+    python -m benchmarks.wal_concurrency [--rows 50000] [--readers 4] [--seconds 3]
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.db import ConnectionPool, open_mode_pragmas
+from app.schema import create_it_tickets_table
+
+READ_QUERY = "SELECT status, COUNT(*) FROM it_tickets GROUP BY status"
+
+
+def seed(db_path, rows):
+    """Create it_tickets and fill it with `rows` synthetic tickets."""
+    conn = sqlite3.connect(db_path)
+    create_it_tickets_table(conn)
+    conn.executemany(
+        "INSERT INTO it_tickets VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (i, ("Low", "Medium", "High", "Critical")[i % 4], f"Ticket {i}",
+             ("Open", "In Progress", "Resolved", "Closed")[i % 4],
+             f"IT_Support_{'ABC'[i % 3]}", "2024-01-27 05:00:00", i % 48)
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_phase(pool, readers, seconds, with_writer, next_id):
+    """Run readers (and optionally one writer) for `seconds`; return counters."""
+    stop = threading.Event()
+    counts = {"reads": 0, "read_errors": 0, "writes": 0, "write_errors": 0}
+    lock = threading.Lock()
+
+    def reader():
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                with pool.connection() as conn:
+                    conn.execute(READ_QUERY).fetchall()
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            counts["reads"] += done
+            counts["read_errors"] += errors
+
+    def writer():
+        ticket_id = next_id
+        while not stop.is_set():
+            try:
+                with pool.connection() as conn:
+                    conn.execute(
+                        "INSERT INTO it_tickets VALUES (?, 'High', 'bench', 'Open', 'IT_Support_A', '2024-01-27 05:00:00', 0)",
+                        (ticket_id,),
+                    )
+                counts["writes"] += 1
+                ticket_id += 1
+            except sqlite3.OperationalError:
+                counts["write_errors"] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    counts["reads_per_sec"] = counts["reads"] / seconds
+    counts["writes_per_sec"] = counts["writes"] / seconds
+    return counts
+
+
+def benchmark_mode(mode, rows, readers, seconds, busy_timeout_ms):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        seed(db_path, rows)
+        # "rollback" mirrors the old defaults: DELETE journal, synchronous=FULL
+        synchronous = "NORMAL" if mode == "wal" else "FULL"
+        pool = ConnectionPool(db_path, pragmas=open_mode_pragmas(mode, synchronous, busy_timeout_ms))
+        try:
+            idle = run_phase(pool, readers, seconds, False, rows)
+            busy = run_phase(pool, readers, seconds, True, rows)
+        finally:
+            pool.close_all()
+    return idle, busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--busy-timeout-ms", type=int, default=5000)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"WAL concurrency benchmark: {args.rows:,} tickets, {args.readers} readers, {args.seconds}s per phase")
+    print("=" * 72)
+    print(f"{'mode':<10}{'reads/s idle':>14}{'reads/s +writer':>17}{'held':>8}{'writes/s':>10}{'errors':>8}")
+    for mode in ("rollback", "wal"):
+        idle, busy = benchmark_mode(mode, args.rows, args.readers, args.seconds, args.busy_timeout_ms)
+        held = busy["reads_per_sec"] / idle["reads_per_sec"] if idle["reads_per_sec"] else 0
+        errors = busy["read_errors"] + busy["write_errors"]
+        print(f"{mode:<10}{idle['reads_per_sec']:>14,.0f}{busy['reads_per_sec']:>17,.0f}{held:>8.0%}"
+              f"{busy['writes_per_sec']:>10,.0f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,105 +1,30 @@
-##Purpose**: All functions for managing cyber incidents
-
-import pandas as pd
-from app.data.db import connect_database, DATA_DIR
-
-
-
-def insert_incident(incident_id, timestamp, severity, category, status, description):
-    """Insert a new cyber incident based on the CSV schema."""
-    conn = connect_database()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        INSERT INTO cyber_incidents 
-        (incident_id, timestamp, severity, category, status, description)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (incident_id, timestamp, severity, category, status, description))
-
-    conn.commit()
-    conn.close()
-
-    return incident_id
-
-
-
-def migrate_all_incidents(filepath=DATA_DIR / "cyber_incidents.csv"):
-    if not filepath.exists():
-        print(f"File not found: {filepath}")
-        print("   No incidents to migrate.")
-        return
-
-    conn = connect_database()
-    
-    try:
-        cyber_incidents_data = pd.read_csv(filepath)
-        num_rows = cyber_incidents_data.shape[0]
-        cyber_incidents_data.to_sql('cyber_incidents',conn,if_exists='append',index=False)
-        print(f"Migrated {num_rows} cyber_incidents from {filepath.name}")
-    
-    except Exception as e:
-        print(f"Error migrating incidents: {e}")
-    
-    finally:
-        conn.close()
-    
-
-
-
-
-def get_all_incidents():
-    """Get all incidents as DataFrame."""
-    conn = connect_database()
-    df = pd.read_sql_query(
-        "SELECT * FROM cyber_incidents",
-        conn
-    )
-    conn.close()
-    return df
-
-def update_incident_status(incident_id, new_status):
-    """ Update the status of an incident.  """
-    conn = connect_database()
-    cursor = conn.cursor()
-
-
-    update_query = "UPDATE cyber_incidents SET status = ? WHERE incidents_id = ?"
-    cursor.execute(update_query, (new_status, incident_id))
-
-    if cursor.rowcount > 0:
-        conn.commit()
-        print(f"Updated status for incident ID {incident_id} to '{new_status}'.")
-    
-        cursor.execute("SELECT * FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
-        update_record = cursor.fetchone()
-        print(f"Updated record details: {update_record}")
-    else:
-        print(f"Warning: No incident found with ID {incident_id}.")
-    conn.close()
-
-
-def delete_incident(incident_id):
-    """Delete an incident from the database"""
-    conn = connect_database
-    cursor = conn.cursor()
-
-    # Define the DELETE query
-    delete_query = "DELETE FROM cyber_incidents WHERE incident_id = ?"
-        
-    # Execute the query
-    cursor.execute(delete_query, (incident_id,))
-        
-    rows_deleted = cursor.rowcount
-    
-     # 5. Commit the changes
-    if rows_deleted > 0:
-        conn.commit()
-        print(f"Successfully deleted {rows_deleted} incident(s) with ID: {incident_id}")
-    else:
-        print(f"No incident found with ID: {incident_id}. Nothing deleted.")
-            
-     # 6. Ensure the connection is closed
-    if conn:
-        conn.close()
-
-    # Part 8 . Analytical Queries (The Big 6)
+##Purpose**: All functions for managing cyber incidents
+# Older entry points without a connection argument; they run on the shared
+# repository in app.repository (the same code the app package and pages use).
+
+from app import incidents as _incidents
+from app.db import DATA_DIR
+
+
+def insert_incident(incident_id, timestamp, severity, category, status, description):
+    """Insert a new cyber incident based on the CSV schema."""
+    return _incidents.insert_incident(None, incident_id, timestamp, severity, category, status, description)
+
+
+def migrate_all_incidents(filepath=DATA_DIR / "cyber_incidents.csv"):
+    return _incidents.migrate_all_incidents(None, filepath)
+
+
+def get_all_incidents():
+    """Get all incidents as DataFrame."""
+    return _incidents.get_all_incidents()
+
+
+def update_incident_status(incident_id, new_status):
+    """ Update the status of an incident.  """
+    _incidents.update_incident_status(None, incident_id, new_status)
+
+
+def delete_incident(incident_id):
+    """Delete an incident from the database"""
+    _incidents.delete_incident(None, incident_id)
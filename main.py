@@ -1,12 +1,13 @@
 # Purpose**: Demonstrate all functionality
 
 
-from app.data.db import connect_database
-from app.data.schema import create_all_tables, create_it_tickets_table
+from app.async_db import fetch_many
+from app.db import pool_stats
+from app.schema import create_all_tables, create_it_tickets_table
 from app.services.user_service import register_user, login_user, migrate_users_from_file
-from app.data.incidents import insert_incident, get_all_incidents, migrate_all_incidents
-from app.data.metadata import  migrate_all_metadata, get_all_metadata
-from app.data.it_tickets import  migrate_it_tickets, get_all_it_tickets
+from app.incidents import insert_incident, get_all_incidents, migrate_all_incidents
+from app.metadata import  migrate_all_metadata, get_all_metadata
+from app.it_tickets import  migrate_it_tickets, get_all_it_tickets
 
 def main():
     print("=" * 60)
@@ -41,19 +42,22 @@ def main():
     print(f"Created incident #{incident_id}")
     '''
     
-    # 5. Query data
-    df_incidents = get_all_incidents()
-    print(f"Total incidents: {len(df_incidents)}")
-    
+    # 5. Query data (the three tables are read concurrently)
+    frames = fetch_many({
+        "incidents": get_all_incidents,
+        "metadata": get_all_metadata,
+        "it_tickets": get_all_it_tickets,
+    })
+    print(f"Total incidents: {len(frames['incidents'])}")
+
     print('-' * 60)
-    df_metadat = get_all_metadata()
-    print(f"Total metadata informations: {len(df_metadat)}")
+    print(f"Total metadata informations: {len(frames['metadata'])}")
 
     print('-' * 60)
-    df_it_tickets = get_all_it_tickets()
-    print(f"Total it tickets: {len(df_it_tickets)}")
+    print(f"Total it tickets: {len(frames['it_tickets'])}")
 
     print("=" * 60)
+    print(f"Connection pool: {pool_stats()}")
     
 
 if __name__ == "__main__":
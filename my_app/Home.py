@@ -1,49 +1,22 @@
 import streamlit as st
 import sqlite3
+import sys
 import bcrypt
+from pathlib import Path
+
+# Make the project root importable so the app shares the app package
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.repository import UserRepository
+from app.schema import ensure_schema
 
 # --- Configuration ---
 DB_FILE = "intelligence_platform.db"
 TABLE_NAME = "users"
 
-st.set_page_config(page_title="Login / Register", page_icon="🔑", layout="centered")
-
+# Create/upgrade the database schema once per server process
+ensure_schema(DB_FILE)
 
-# -------------------- DATA LAYER --------------------
-class UserRepository:
-    def __init__(self, db_file=DB_FILE):
-        self.db_file = db_file
-        self._init_db()
-
-    def _connect(self):
-        return sqlite3.connect(self.db_file)
-
-    def _init_db(self):
-        with self._connect() as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    username TEXT PRIMARY KEY,
-                    password_hash TEXT
-                )
-            """)
-            conn.commit()
-
-    def get_user_hash(self, username):
-        with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT password_hash FROM users WHERE username = ?",
-                (username,),
-            )
-            row = cur.fetchone()
-        return row[0] if row else None
-
-    def create_user(self, username, password_hash):
-        with self._connect() as conn:
-            conn.execute(
-                "INSERT INTO users (username, password_hash) VALUES (?, ?)",
-                (username, password_hash),
-            )
-            conn.commit()
+st.set_page_config(page_title="Login / Register", page_icon="🔑", layout="centered")
 
 
 # -------------------- AUTH LOGIC --------------------
@@ -60,21 +33,21 @@ class AuthService:
         return bcrypt.checkpw(password.encode(), stored_hash.encode())
 
     def login(self, username, password):
-        stored_hash = self.repo.get_user_hash(username)
-        if not stored_hash:
+        user = self.repo.get_by_username(username, "login")
+        if user is None or not user.password_hash:
             return False, "User not found."
 
-        if not self._check_password(password, stored_hash):
+        if not self._check_password(password, user.password_hash):
             return False, "Incorrect password."
 
         return True, "Login successful."
 
     def register(self, username, password):
-        if self.repo.get_user_hash(username):
+        if self.repo.get_by_username(username, "login") is not None:
             return False, "Username already exists."
 
         password_hash = self._hash_password(password)
-        self.repo.create_user(username, password_hash)
+        self.repo.insert(username=username, password_hash=password_hash)
         return True, "Account created."
 
 
@@ -138,6 +111,7 @@ class LoginApp:
 
 
 # -------------------- APP BOOTSTRAP --------------------
-repo = UserRepository()
+# The users table is created by ensure_schema; the repository only reads and writes it
+repo = UserRepository(DB_FILE)
 auth = AuthService(repo)
 LoginApp(auth).run()
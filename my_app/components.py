@@ -0,0 +1,210 @@
+##Purpose**: Streamlit widgets shared by the dashboard pages
+
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from app.cache import cached_call
+from app.changes import latest_change
+from app.pagination import DEFAULT_PAGE_SIZE, PAGE_KEYS, PAGE_SIZES, estimate_row_count, fetch_page
+from app.search import DEFAULT_SEARCH_LIMIT, SEARCH_TABLES, search
+
+
+def paginated_table(get_connection, table, key, columns=None, sort_columns=None, transform=None, selectable=False):
+    """
+    Render one page of a table with page-size, sort and previous/next controls.
+
+    Only the current page is read from SQLite and sent to the browser. The
+    cursors of the pages already visited are kept in st.session_state so
+    "Previous" returns to exactly the same rows.
+
+    Args:
+        get_connection: The page's get_db_connection function
+        table: Table name (see app.pagination.PAGE_KEYS)
+        key: Unique widget key prefix for this table on the page
+        columns: Columns to show (defaults to all)
+        sort_columns: Columns offered in the sort box (defaults to `columns`)
+        transform: Optional callable that formats the page DataFrame for display
+        selectable: Let the user tick rows in the grid
+
+    Returns:
+        list: Keys of the rows ticked on this page (always empty unless selectable)
+    """
+    page_key = PAGE_KEYS[table]
+    sort_columns = sort_columns or columns or [page_key]
+
+    col_sort, col_order, col_size = st.columns([2, 1, 1])
+    sort_column = col_sort.selectbox("Sort by", sort_columns, key=f"{key}_sort")
+    descending = col_order.selectbox("Order", ["Ascending", "Descending"], key=f"{key}_order") == "Descending"
+    page_size = col_size.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                   key=f"{key}_size")
+
+    # Cursors of the pages visited so far; start over when the ordering changes
+    state_key = f"{key}_pager"
+    ordering = (sort_column, descending, page_size)
+    pager = st.session_state.get(state_key)
+    if pager is None or pager["ordering"] != ordering:
+        pager = {"ordering": ordering, "cursors": [None]}
+        st.session_state[state_key] = pager
+
+    try:
+        with get_connection() as conn:
+            # Served from the shared cache until the table is written to
+            page_df, next_cursor = cached_call(conn, [table], fetch_page, table, page_size, sort_column,
+                                               descending, after=pager["cursors"][-1], columns=columns)
+            row_count, exact = cached_call(conn, [table], estimate_row_count, table)
+    except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
+        st.error(f"Error fetching data: {e}")
+        return []
+
+    page_number = len(pager["cursors"])
+    page_count = max(1, -(-row_count // page_size))
+    display_df = transform(page_df) if transform else page_df
+    selected = []
+    if selectable:
+        event = st.dataframe(display_df, use_container_width=True, hide_index=True,
+                             on_select="rerun", selection_mode="multi-row", key=f"{key}_grid")
+        selected = page_df[page_key].iloc[event.selection.rows].tolist()
+    else:
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
+
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    if col_prev.button("◀ Previous", key=f"{key}_prev", disabled=page_number == 1):
+        pager["cursors"].pop()
+        st.rerun()
+    total = f"{row_count:,}" if exact else f"~{row_count:,}"
+    col_info.caption(f"Page {page_number} of {'' if exact else '~'}{page_count} · {total} rows")
+    if col_next.button("Next ▶", key=f"{key}_next", disabled=next_cursor is None):
+        pager["cursors"].append(next_cursor)
+        st.rerun()
+    return selected
+
+
+def bulk_actions(repository, selected, key, statuses, noun):
+    """
+    Status and delete actions for the rows ticked in a selectable paginated_table.
+
+    Each action is one set-based statement (Repository.update_many /
+    delete_many) in one transaction, however many rows are ticked.
+
+    Args:
+        repository: The page's app.repository Repository
+        selected: Keys returned by paginated_table(..., selectable=True)
+        key: Unique widget key prefix
+        statuses: Status values offered
+        noun: What a row is called in messages, e.g. "incident"
+    """
+    if not selected:
+        st.caption(f"Tick rows in the table to update or delete several {noun}s at once.")
+        return
+
+    st.markdown(f"**{len(selected)} {noun}(s) selected**")
+    col_status, col_apply, col_confirm, col_delete = st.columns([2, 1, 1, 1])
+    new_status = col_status.selectbox("New status", statuses, key=f"{key}_status", label_visibility="collapsed")
+    apply = col_apply.button("Set status", key=f"{key}_apply")
+    confirm = col_confirm.checkbox("Confirm delete", key=f"{key}_confirm")
+    delete = col_delete.button("🗑️ Delete selected", key=f"{key}_delete", disabled=not confirm)
+
+    try:
+        if apply:
+            updated = repository.update_many(selected, status=new_status)
+            notify(f"  Status of {updated} {noun}(s) set to **{new_status}**.")
+        elif delete:
+            deleted = repository.delete_many(selected)
+            notify(f"  {deleted} {noun}(s) deleted.")
+    except sqlite3.Error as e:
+        st.error(f"  Error updating {noun}s: {e}")
+
+
+def search_box(get_connection, table, key, filter_options=None, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Render a full-text search box over a table's descriptions, with its hits.
+
+    Matching is done by the table's FTS5 index (see app.search); each hit is
+    shown with a snippet of its description, matched words in bold.
+
+    Args:
+        get_connection: The page's get_db_connection function
+        table: Table name (see app.search.SEARCH_TABLES)
+        key: Unique widget key prefix for this search on the page
+        filter_options: Optional dict of column -> choices offered as filters
+        limit: Maximum number of hits shown
+    """
+    _, id_column, columns = SEARCH_TABLES[table]
+    filter_options = filter_options or {}
+
+    query = st.text_input("Search descriptions", key=f"{key}_query", placeholder="e.g. phishing attachment")
+    filters = {}
+    if filter_options:
+        for column, box in zip(filter_options, st.columns(len(filter_options))):
+            filters[column] = box.multiselect(column.replace("_", " ").title(), filter_options[column],
+                                              key=f"{key}_{column}")
+    if not query.strip():
+        return
+
+    try:
+        with get_connection() as conn:
+            hits = search(conn, table, query, filters, limit)
+    except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
+        st.error(f"Error searching: {e}")
+        return
+
+    if hits.empty:
+        st.info("No matches.")
+        return
+    st.caption(f"Top {len(hits)} matches, best first")
+    for hit in hits.itertuples(index=False):
+        details = " · ".join(str(getattr(hit, column)) for column in columns if column != id_column)
+        st.markdown(f"**#{getattr(hit, id_column)}** · {details}  \n{hit.snippet}")
+
+
+# Seconds between change-feed polls on the live dashboards
+LIVE_REFRESH_SECONDS = 5
+
+
+def live_updates(get_connection, tables, key, interval=LIVE_REFRESH_SECONDS):
+    """
+    Rerun the page when any of `tables` changes, in this or any other session.
+
+    A fragment polls the change feed every `interval` seconds with one index
+    seek per table. Only when the newest seq has moved does it rerun the whole
+    page, which then re-reads just the cache entries of the changed tables.
+    """
+    state_key = f"{key}_last_change"
+
+    def latest():
+        with get_connection() as conn:
+            return latest_change(conn, tables)
+
+    # Baseline for this run of the page: what the dashboard above was built from
+    try:
+        st.session_state[state_key] = latest()
+    except sqlite3.Error:
+        return
+
+    @st.fragment(run_every=interval)
+    def poll():
+        try:
+            seen = latest()
+        except sqlite3.Error:
+            return
+        if seen != st.session_state.get(state_key):
+            st.session_state[state_key] = seen
+            st.rerun()
+        st.caption(f"🟢 Live · checked {datetime.now():%H:%M:%S}")
+
+    poll()
+
+
+def notify(message, kind="success"):
+    """Show `message` after rerunning the page, so the dashboard reflects the write."""
+    st.session_state.setdefault("notifications", []).append((kind, message))
+    st.rerun()
+
+
+def show_notifications():
+    """Display (once) the messages queued by notify()."""
+    for kind, message in st.session_state.pop("notifications", []):
+        getattr(st, kind)(message)
@@ -1,14 +1,28 @@
 import streamlit as st
 import sqlite3
+import sys
 import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
+from pathlib import Path
+
+# Make the project root importable so the pages share the app package
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.analytics import ticket_counts_by, ticket_summary
+from app.db import read_connection
+from app.schema import ensure_schema
+from app.repository import TicketRepository
+from my_app.components import bulk_actions, live_updates, notify, paginated_table, search_box, show_notifications
 
 
 # --- Configuration ---
 DB_FILE = "intelligence_platform.db" # Using the same database file
 TABLE_NAME = "it_tickets"
 
+# Create/upgrade the database schema once per server process
+ensure_schema(DB_FILE)
+TICKETS = TicketRepository(DB_FILE)
+
 # Define options for the input formS
 TICKET_PRIORITIES = ['Low', 'Medium', 'High', 'Critical']
 TICKET_STATUSES = ['Open', 'In Progress', 'Resolved', 'Closed']
@@ -18,95 +32,67 @@ ASSIGNED_USERS = ['IT_Support_A', 'IT_Support_B', 'IT_Support_C']
 # Database Functions 
 
 def get_db_connection():
-    """Establishes and returns the SQLite database connection."""
+    """Checks out the pooled read-only connection this page's dashboards read through."""
+    return read_connection(DB_FILE)
+
+def format_ticket_page(page_df):
+    """Formats a page of raw ticket rows for display."""
+    # Convert date format for display purposes (dd/mm/yy)
+    page_df['created_at'] = page_df['created_at'].dt.strftime('%d/%m/%y')
+    # Format resolution_time_hours for display
+    page_df['resolution_time_hours'] = page_df['resolution_time_hours'].round(1)
+    return page_df
+
+def fetch_ticket_kpis():
+    """Fetches the dashboard KPIs and chart counts, aggregated in SQL."""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
-
-def fetch_ticket_data(table):
-    """Fetches all data and returns it as a Pandas DataFrame."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            query = f"SELECT * FROM {table}"
-            df = pd.read_sql_query(query, conn)
-            
-            # Ensure the created_at column is ready for charting/display
-            if 'created_at' in df.columns:
-                df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-                
-                # Convert date format for display purposes (dd/mm/yy)
-                df['Display_Date'] = df['created_at'].dt.strftime('%d/%m/%y')
-                
-            return df
-        except pd.io.sql.DatabaseError as e:
-            st.error(f"Error fetching data: {e}")
-            return pd.DataFrame()
-    return pd.DataFrame()
+        with get_db_connection() as conn:
+            summary = ticket_summary(conn)
+            status_counts = ticket_counts_by(conn, 'status')
+            priority_counts = ticket_counts_by(conn, 'priority')
+        return summary, status_counts, priority_counts
+    except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
+        st.error(f"Error fetching data: {e}")
+        return None, pd.DataFrame(), pd.DataFrame()
 
 def add_new_ticket(ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours):
     """Inserts a new ticket record into the database."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            # The table must exist with these columns for this to work.
-            insert_query = f"""
-            INSERT INTO {TABLE_NAME} (ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """
-            cursor.execute(insert_query, (ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours))
-            conn.commit()
-            st.success("✅ New IT Ticket Recorded Successfully! **Please refresh the page to update the dashboard.**")
-        except sqlite3.IntegrityError as e:
-            st.error(f"❌ Error: Ticket ID **{ticket_id}** may already exist. {e}")
-        except sqlite3.Error as e:
-            st.error(f"❌ Error adding ticket: {e}")
+    try:
+        TICKETS.insert(ticket_id=ticket_id, priority=priority, description=description, status=status,
+                       assigned_to=assigned_to, created_at=created_at, resolution_time_hours=resolution_time_hours)
+        notify("✅ New IT Ticket Recorded Successfully!")
+    except sqlite3.IntegrityError as e:
+        st.error(f"❌ Error: Ticket ID **{ticket_id}** may already exist. {e}")
+    except sqlite3.Error as e:
+        st.error(f"❌ Error adding ticket: {e}")
 
 # Update function for ticket status and resolution time
 def update_ticket_status_and_resolution(ticket_id, new_status, new_resolution_time):
     """Updates the status and resolution time of an existing ticket record."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            update_query = f"""
-            UPDATE {TABLE_NAME} SET status = ?, resolution_time_hours = ? WHERE ticket_id = ?
-            """
-            cursor.execute(update_query, (new_status, new_resolution_time, ticket_id))
-            conn.commit()
-
-            if cursor.rowcount > 0:
-                st.success(f" Status and Resolution Time for Ticket **{ticket_id}** updated. **Please refresh the page to update the dashboard.**")
-            else:
-                st.warning(f" Ticket ID **{ticket_id}** not found. Update was not performed.")
+    try:
+        updated = TICKETS.update(ticket_id, status=new_status, resolution_time_hours=new_resolution_time)
+
+        if updated > 0:
+            notify(f" Status and Resolution Time for Ticket **{ticket_id}** updated.")
+        else:
+            st.warning(f" Ticket ID **{ticket_id}** not found. Update was not performed.")
 
-        except sqlite3.Error as e:
-            st.error(f"  Error updating ticket: {e}")
+    except sqlite3.Error as e:
+        st.error(f"  Error updating ticket: {e}")
 
 def delete_ticket(ticket_id):
     """Deletes a ticket record based on the ticket_id."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            delete_query = f"""
-            DELETE FROM {TABLE_NAME} WHERE ticket_id = ?
-            """
-            cursor.execute(delete_query, (ticket_id,))
-            conn.commit()
-
-            # Check how many rows were affected
-            if cursor.rowcount > 0:
-                st.success(f"  Ticket **{ticket_id}** successfully deleted. **Please refresh the page to update the dashboard.**")
-            else:
-                st.warning(f"  Ticket ID **{ticket_id}** not found in the database.")
+    try:
+        deleted = TICKETS.delete(ticket_id)
 
-        except sqlite3.Error as e:
-            st.error(f"  Error deleting ticket: {e}")
+        # Check how many rows were affected
+        if deleted > 0:
+            notify(f"  Ticket **{ticket_id}** successfully deleted.")
+        else:
+            st.warning(f"  Ticket ID **{ticket_id}** not found in the database.")
+
+    except sqlite3.Error as e:
+        st.error(f"  Error deleting ticket: {e}")
 
 
 # Streamlit Layout
@@ -114,6 +100,9 @@ def delete_ticket(ticket_id):
 st.set_page_config(layout="wide", page_title="IT Ticket Dashboard")
 st.title("👨‍💻 IT Ticket Dashboard")
 
+# Messages from the last write, shown after the rerun that picked it up
+show_notifications()
+
 # Ensure state keys exist (in case user opens this page first)
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -139,22 +128,21 @@ tab_dashboard, tab_add_ticket, tab_update_ticket, tab_delete_ticket = st.tabs([
 with tab_dashboard:
     st.header("Ticket Summary")
 
-    data_df = fetch_ticket_data(TABLE_NAME)
+    # Poll the change feed and rerun when this table is written to from any session
+    live_updates(get_db_connection, [TABLE_NAME], key="tickets_live")
+
+    # KPIs and chart counts are aggregated in SQL, so only a few rows come back
+    summary, status_counts, priority_counts = fetch_ticket_kpis()
 
-    if not data_df.empty:
+    if summary and summary['total'] > 0:
 
         # Key Metrics 
-        total = len(data_df)
+        total = summary['total']
         # Sum resolution time only for tickets that have a value
-        total_resolution = data_df['resolution_time_hours'].sum() if 'resolution_time_hours' in data_df.columns and not data_df['resolution_time_hours'].empty else 0
+        total_resolution = summary['total_resolution_hours']
         
-        # Calculate tickets created today
-        today = datetime.now().date()
-        if 'created_at' in data_df.columns:
-            # Filter for dates that match today's date
-            created_today = data_df[data_df['created_at'].dt.date == today].shape[0]
-        else:
-            created_today = 0
+        # Tickets created today (indexed range on created_at)
+        created_today = summary['created_today']
 
 
         col_total, col_resolution, col_today = st.columns(3)
@@ -170,9 +158,8 @@ with tab_dashboard:
 
         # Chart 1: Status Distribution
         with col_chart_1:
-            if 'status' in data_df.columns:
+            if not status_counts.empty:
                 st.subheader("Ticket Status Distribution")
-                status_counts = data_df['status'].value_counts().reset_index()
                 status_counts.columns = ['Status', 'Count']
                 fig_status = px.pie(
                     status_counts, 
@@ -185,11 +172,11 @@ with tab_dashboard:
 
         # Chart 2: Priority Distribution
         with col_chart_2:
-            if 'priority' in data_df.columns:
+            if not priority_counts.empty:
                 st.subheader("Ticket Priority Distribution")
                 priority_order = TICKET_PRIORITIES # Use the defined order for consistency
                 # Ensure all defined priorities are present in the chart, even with 0 counts
-                priority_counts = data_df['priority'].value_counts().reindex(priority_order, fill_value=0).reset_index()
+                priority_counts = priority_counts.set_index('priority')['count'].reindex(priority_order, fill_value=0).reset_index()
                 priority_counts.columns = ['Priority', 'Count']
                 
                 fig_priority = px.bar(
@@ -202,28 +189,33 @@ with tab_dashboard:
                     labels={'Priority': 'Priority Level', 'Count': 'Number of Tickets'}
                 )
                 st.plotly_chart(fig_priority, use_container_width=True)
-            elif data_df.empty:
+            else:
                 st.subheader("Ticket Priority Distribution")
                 st.info("Add data to view this chart.")
 
         st.markdown("---")
 
-        # Raw Data Table 
-        st.subheader("Raw Ticket Data")
-        
-        # Select and rename columns for display
-        display_cols = ['ticket_id', 'priority', 'description', 'status', 'assigned_to', 'resolution_time_hours', 'Display_Date']
-        
-        # Create a dictionary to rename the 'Display_Date' column to 'created_at' for the UI
-        rename_map = {'Display_Date': 'created_at'}
-        
-        # Select the columns, sort, and rename 'Display_Date' back to 'created_at' for user view
-        data_to_display = data_df[display_cols].sort_values(by='ticket_id', ascending=True).rename(columns=rename_map)
-        
-        # Format resolution_time_hours for display
-        data_to_display['resolution_time_hours'] = data_to_display['resolution_time_hours'].round(1)
+        # Full-text search over descriptions (FTS5 index, ranked by relevance)
+        st.subheader("Search Tickets")
+        search_box(
+            get_db_connection, TABLE_NAME, key="tickets_search",
+            filter_options={'priority': TICKET_PRIORITIES, 'status': TICKET_STATUSES},
+        )
 
-        st.dataframe(data_to_display, use_container_width=True)
+        st.markdown("---")
+
+        # Raw Data Table (one keyset-paginated page at a time, sorted in SQL)
+        st.subheader("Raw Ticket Data")
+        display_cols = ['ticket_id', 'priority', 'description', 'status', 'assigned_to', 'resolution_time_hours', 'created_at']
+        selected_ids = paginated_table(
+            get_db_connection, TABLE_NAME, key="tickets_raw",
+            columns=display_cols,
+            sort_columns=['ticket_id', 'created_at', 'priority', 'status', 'assigned_to', 'resolution_time_hours'],
+            transform=format_ticket_page,
+            selectable=True,
+        )
+        # Status change / delete for every ticked row in one statement
+        bulk_actions(TICKETS, selected_ids, key="tickets_bulk", statuses=TICKET_STATUSES, noun="ticket")
 
     else:
         st.warning(f"No data available in the '{TABLE_NAME}' table. Use the 'New Ticket' tab to add records.")
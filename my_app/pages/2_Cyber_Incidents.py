@@ -1,13 +1,27 @@
 import streamlit as st
 import sqlite3
+import sys
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
+from pathlib import Path
+
+# Make the project root importable so the pages share the app package
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.analytics import incident_counts_by, incident_summary
+from app.db import read_connection
+from app.schema import ensure_schema
+from app.repository import IncidentRepository
+from my_app.components import bulk_actions, live_updates, notify, paginated_table, search_box, show_notifications
 
 # Database and table migrated/connected
 DB_FILE = "intelligence_platform.db"
 TABLE_NAME = "cyber_incidents" 
 
+# Create/upgrade the database schema once per server process
+ensure_schema(DB_FILE)
+INCIDENTS = IncidentRepository(DB_FILE)
+
 # Define options for the input form
 INCIDENT_SEVERITIES = ['Low', 'Medium', 'High', 'Critical']
 INCIDENT_CATEGORIES = ['Malware', 'Phishing', 'Denial of Service', 'Insider Threat', 'Data Breach', 'Vulnerability Scan', 'Other']
@@ -15,100 +29,71 @@ INCIDENT_STATUSES = ['Open', 'In Progress', 'Closed', 'Pending Review']
 
 # Database Functions 
 def get_db_connection():
-    """Establishes and returns the SQLite database connection."""
+    """Checks out the pooled read-only connection this page's dashboards read through."""
+    return read_connection(DB_FILE)
+
+
+def fetch_incident_kpis():
+    """Fetches the dashboard KPIs and chart counts, aggregated in SQL."""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
-
-
-def fetch_incident_data(table):
-    """Fetches all data and returns it as a Pandas DataFrame."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            query = f"SELECT * FROM {table}" 
-            df = pd.read_sql_query(query, conn)
-            # Ensure the timestamp column is ready to be displayed
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-            return df
-        except pd.io.sql.DatabaseError as e:
-            st.error(f"Error fetching data: {e}")
-            return pd.DataFrame()
-    return pd.DataFrame()
+        with get_db_connection() as conn:
+            summary = incident_summary(conn)
+            category_counts = incident_counts_by(conn, 'category')
+            severity_counts = incident_counts_by(conn, 'severity')
+        return summary, category_counts, severity_counts
+    except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
+        st.error(f"Error fetching data: {e}")
+        return None, pd.DataFrame(), pd.DataFrame()
 
 # Add a incident
 def add_new_incident(incident_id, timestamp, severity, category, status, description):
     """Inserts a new incident record into the database."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            insert_query = f"""
-            INSERT INTO {TABLE_NAME} (incident_id, timestamp, severity, category, status, description) 
-            VALUES (?, ?, ?, ?, ?, ?)
-            """
-            cursor.execute(insert_query, (incident_id, timestamp, severity, category, status, description))
-            conn.commit()
-            st.success("  New Incident Recorded Successfully! **Please refresh the page to update the dashboard.**")
-            fetch_incident_data("cyber_incidents")
-        except sqlite3.IntegrityError as e:
-            st.error(f" Error: Incident ID **{incident_id}** may already exist. {e}")
-        except sqlite3.Error as e:
-            st.error(f" Error adding incident: {e}")
+    try:
+        INCIDENTS.insert(incident_id=incident_id, timestamp=timestamp, severity=severity,
+                         category=category, status=status, description=description)
+        notify("  New Incident Recorded Successfully!")
+    except sqlite3.IntegrityError as e:
+        st.error(f" Error: Incident ID **{incident_id}** may already exist. {e}")
+    except sqlite3.Error as e:
+        st.error(f" Error adding incident: {e}")
 
 # Update the status of a chosen incident 
 def update_incident_status(incident_id, new_status):
     """Updates the status of an existing incident record."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            update_query = f"""
-            UPDATE {TABLE_NAME} SET status = ? WHERE incident_id = ?
-            """
-            cursor.execute(update_query, (new_status, incident_id))
-            conn.commit()
+    try:
+        updated = INCIDENTS.update(incident_id, status=new_status)
+        
+        if updated > 0:
+            notify(f" Status for Incident **{incident_id}** updated to **{new_status}**.")
+        else:
+            st.warning(f" Incident ID **{incident_id}** not found. Status was not updated.")
             
-            if cursor.rowcount > 0:
-                st.success(f" Status for Incident **{incident_id}** updated to **{new_status}**. **Please refresh the page to update the dashboard.**")
-            else:
-                st.warning(f" Incident ID **{incident_id}** not found. Status was not updated.")
-                
-        except sqlite3.Error as e:
-            st.error(f" Error updating incident status: {e}")
+    except sqlite3.Error as e:
+        st.error(f" Error updating incident status: {e}")
 
 # Delete an incident record             
 def delete_incident(incident_id):
     """Deletes an incident record based on the incident_id."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            delete_query = f"""
-            DELETE FROM {TABLE_NAME} WHERE incident_id = ?
-            """
-            cursor.execute(delete_query, (incident_id,))
-            conn.commit()
+    try:
+        deleted = INCIDENTS.delete(incident_id)
+        
+        # Check how many rows were affected
+        if deleted > 0:
+            notify(f" Incident **{incident_id}** successfully deleted.")
+        else:
+            st.warning(f" Incident ID **{incident_id}** not found in the database.")
             
-            # Check how many rows were affected
-            if cursor.rowcount > 0:
-                st.success(f" Incident **{incident_id}** successfully deleted. **Please refresh the page to update the dashboard.**")
-                fetch_incident_data("cyber_incidents")
-            else:
-                st.warning(f" Incident ID **{incident_id}** not found in the database.")
-                
-        except sqlite3.Error as e:
-            st.error(f" Error deleting incident: {e}")
+    except sqlite3.Error as e:
+        st.error(f" Error deleting incident: {e}")
 
 
 # Streamlit Layout 
 st.set_page_config(layout="wide", page_title="Cybersecurity Dashboard") 
 st.title("🛡️Cyber Incident Dashboard")
 
+# Messages from the last write, shown after the rerun that picked it up
+show_notifications()
+
 # Ensure state keys exist (in case user opens this page first)
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -133,15 +118,19 @@ tab_dashboard, tab_add_incident, tab_update_status, tab_delete_incident = st.tab
 # Dashboard Overview
 with tab_dashboard:
     st.header("Incident Summary")
+
+    # Poll the change feed and rerun when this table is written to from any session
+    live_updates(get_db_connection, [TABLE_NAME], key="incidents_live")
     
-    data_df = fetch_incident_data(TABLE_NAME)
+    # KPIs and chart counts are aggregated in SQL, so only a few rows come back
+    summary, category_counts, severity_counts = fetch_incident_kpis()
 
-    if not data_df.empty:
+    if summary and summary['total'] > 0:
         
         # Key Metrics
-        total = len(data_df)
-        open_count = data_df[data_df['status'].str.lower() == 'open'].shape[0] if 'status' in data_df.columns else 0
-        closed_count = total - open_count
+        total = summary['total']
+        open_count = summary['open']
+        closed_count = summary['closed']
         
         col_total, col_open, col_closed = st.columns(3)
         col_total.metric("Total Incidents", total)
@@ -155,29 +144,44 @@ with tab_dashboard:
 
         # Chart 1: Category Distribution
         with col_chart_1:
-            if 'category' in data_df.columns:
+            if not category_counts.empty:
                 st.subheader("Category Distribution")
-                category_counts = data_df['category'].value_counts().reset_index()
                 category_counts.columns = ['Incident Category', 'Count']
                 fig_category = px.bar(category_counts, x='Incident Category', y='Count', title='Count by Incident Category')
                 st.plotly_chart(fig_category, use_container_width=True)
             
         # Chart 2: Severity Breakdown
         with col_chart_2:
-            if 'severity' in data_df.columns:
+            if not severity_counts.empty:
                 st.subheader("Severity Breakdown")
                 severity_order = INCIDENT_SEVERITIES
-                severity_counts = data_df['severity'].value_counts().reindex(severity_order).fillna(0).reset_index()
+                severity_counts = severity_counts.set_index('severity')['count'].reindex(severity_order).fillna(0).reset_index()
                 severity_counts.columns = ['Severity', 'Count']
 
                 fig_severity = px.pie(severity_counts, names='Severity', values='Count', title='Percentage by Severity')
                 st.plotly_chart(fig_severity, use_container_width=True)
         
         st.markdown("---")
+
+        # Full-text search over descriptions (FTS5 index, ranked by relevance)
+        st.subheader("Search Incidents")
+        search_box(
+            get_db_connection, TABLE_NAME, key="incidents_search",
+            filter_options={'severity': INCIDENT_SEVERITIES, 'status': INCIDENT_STATUSES},
+        )
+
+        st.markdown("---")
         
 # Raw Data Table 
         st.subheader("Raw Data")
-        st.dataframe(data_df.sort_values(by='incident_id', ascending=True), use_container_width=True)
+        # One keyset-paginated page at a time, sorted in SQL
+        selected_ids = paginated_table(
+            get_db_connection, TABLE_NAME, key="incidents_raw",
+            sort_columns=['incident_id', 'timestamp', 'severity', 'category', 'status'],
+            selectable=True,
+        )
+        # Status change / delete for every ticked row in one statement
+        bulk_actions(INCIDENTS, selected_ids, key="incidents_bulk", statuses=INCIDENT_STATUSES, noun="incident")
         
     else:
         st.warning(f"No data available in the '{TABLE_NAME}' table. Use the 'New Incident' tab to add records.")
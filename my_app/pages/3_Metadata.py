@@ -1,13 +1,27 @@
 import streamlit as st
 import sqlite3
+import sys
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
+from pathlib import Path
+
+# Make the project root importable so the pages share the app package
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.analytics import dataset_columns_by_name, metadata_counts_by, metadata_summary
+from app.db import read_connection
+from app.schema import ensure_schema
+from app.repository import MetadataRepository
+from my_app.components import live_updates, notify, paginated_table, show_notifications
 
 # --- Configuration ---
 DB_FILE = "intelligence_platform.db" # Using the same database file
 TABLE_NAME = "metadata"
 
+# Create/upgrade the database schema once per server process
+ensure_schema(DB_FILE)
+DATASETS = MetadataRepository(DB_FILE)
+
 # Define options for the input form
 UPLOAD_USERS = ['data_scientist', 'cyber_admin', 'it_admin']
 
@@ -15,97 +29,67 @@ UPLOAD_USERS = ['data_scientist', 'cyber_admin', 'it_admin']
 #   Database Functions
 
 def get_db_connection():
-    """Establishes and returns the SQLite database connection."""
+    """Checks out the pooled read-only connection this page's dashboards read through."""
+    return read_connection(DB_FILE)
+
+def format_metadata_page(page_df):
+    """Formats a page of raw metadata rows for display."""
+    # Convert date format for display purposes (dd/mm/yy)
+    page_df['upload_date'] = page_df['upload_date'].dt.strftime('%d/%m/%y')
+    return page_df
+
+def fetch_metadata_kpis():
+    """Fetches the dashboard KPIs and chart data, aggregated in SQL."""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
-
-def fetch_metadata_data(table):
-    """Fetches all data and returns it as a Pandas DataFrame."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            query = f"SELECT * FROM {table}"
-            df = pd.read_sql_query(query, conn)
-            # Ensure the upload_date column is ready for charting/display
-            if 'upload_date' in df.columns:
-                df['upload_date'] = pd.to_datetime(df['upload_date'], errors='coerce')
-                
-                # Note: The underlying column 'upload_date' is still datetime/date type for charts/filtering
-                # This makes a string column for display in the dataframe.
-                df['Display_Date'] = df['upload_date'].dt.strftime('%d/%m/%y')
-                
-            return df
-        except pd.io.sql.DatabaseError as e:
-            st.error(f"Error fetching data: {e}")
-            return pd.DataFrame()
-    return pd.DataFrame()
+        with get_db_connection() as conn:
+            summary = metadata_summary(conn)
+            uploader_counts = metadata_counts_by(conn, 'uploaded_by')
+            columns_by_name = dataset_columns_by_name(conn)
+        return summary, uploader_counts, columns_by_name
+    except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
+        st.error(f"Error fetching data: {e}")
+        return None, pd.DataFrame(), pd.DataFrame()
 
 # Add a new dataset metadata record
 def add_new_dataset(dataset_id, name, rows, columns, uploaded_by, upload_date):
     """Inserts a new metadata record into the database."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            # The table must exist with these columns for this to work.
-            insert_query = f"""
-            INSERT INTO {TABLE_NAME} (dataset_id, name, rows, columns, uploaded_by, upload_date)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """
-            cursor.execute(insert_query, (dataset_id, name, rows, columns, uploaded_by, upload_date))
-            conn.commit()
-            st.success("  New Dataset Metadata Recorded Successfully! **Please refresh the page to update the dashboard.**")
-        except sqlite3.IntegrityError as e:
-            st.error(f"   Error: Dataset ID **{dataset_id}** may already exist. {e}")
-        except sqlite3.Error as e:
-            st.error(f"   Error adding dataset: {e}")
+    try:
+        DATASETS.insert(dataset_id=dataset_id, name=name, rows=rows, columns=columns,
+                        uploaded_by=uploaded_by, upload_date=upload_date)
+        notify("  New Dataset Metadata Recorded Successfully!")
+    except sqlite3.IntegrityError as e:
+        st.error(f"   Error: Dataset ID **{dataset_id}** may already exist. {e}")
+    except sqlite3.Error as e:
+        st.error(f"   Error adding dataset: {e}")
 
 # Update a name of a dataset meatadata record 
 def update_dataset_name(dataset_id, new_name):
     """Updates the name of an existing dataset record."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            update_query = f"""
-            UPDATE {TABLE_NAME} SET name = ? WHERE dataset_id = ?
-            """
-            cursor.execute(update_query, (new_name, dataset_id))
-            conn.commit()
-
-            if cursor.rowcount > 0:
-                st.success(f"  Name for Dataset **{dataset_id}** updated to **{new_name}**. **Please refresh the page to update the dashboard.**")
-            else:
-                st.warning(f"  Dataset ID **{dataset_id}** not found. Name was not updated.")
+    try:
+        updated = DATASETS.update(dataset_id, name=new_name)
+
+        if updated > 0:
+            notify(f"  Name for Dataset **{dataset_id}** updated to **{new_name}**.")
+        else:
+            st.warning(f"  Dataset ID **{dataset_id}** not found. Name was not updated.")
 
-        except sqlite3.Error as e:
-            st.error(f"  Error updating dataset name: {e}")
+    except sqlite3.Error as e:
+        st.error(f"  Error updating dataset name: {e}")
 
 # Delete a dataset metadata record
 def delete_dataset(dataset_id):
     """Deletes a dataset record based on the dataset_id."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            delete_query = f"""
-            DELETE FROM {TABLE_NAME} WHERE dataset_id = ?
-            """
-            cursor.execute(delete_query, (dataset_id,))
-            conn.commit()
-
-            # Check how many rows were affected
-            if cursor.rowcount > 0:
-                st.success(f"  Dataset **{dataset_id}** successfully deleted. **Please refresh the page to update the dashboard.**")
-            else:
-                st.warning(f"  Dataset ID **{dataset_id}** not found in the database.")
+    try:
+        deleted = DATASETS.delete(dataset_id)
 
-        except sqlite3.Error as e:
-            st.error(f"  Error deleting dataset: {e}")
+        # Check how many rows were affected
+        if deleted > 0:
+            notify(f"  Dataset **{dataset_id}** successfully deleted.")
+        else:
+            st.warning(f"  Dataset ID **{dataset_id}** not found in the database.")
+
+    except sqlite3.Error as e:
+        st.error(f"  Error deleting dataset: {e}")
 
 
 # Streamlit Layout 
@@ -113,6 +97,9 @@ def delete_dataset(dataset_id):
 st.set_page_config(layout="wide", page_title="Simple Metadata Dashboard")
 st.title("🗄️ Dataset Metadata Dashboard")
 
+# Messages from the last write, shown after the rerun that picked it up
+show_notifications()
+
 # Ensure state keys exist (in case user opens this page first)
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -139,21 +126,20 @@ tab_dashboard, tab_add_dataset, tab_update_metadata, tab_delete_dataset = st.tab
 with tab_dashboard:
     st.header("Metadata Summary")
 
-    data_df = fetch_metadata_data(TABLE_NAME)
+    # Poll the change feed and rerun when this table is written to from any session
+    live_updates(get_db_connection, [TABLE_NAME], key="metadata_live")
+
+    # KPIs and chart data are aggregated in SQL, so only a few rows come back
+    summary, uploader_counts, columns_by_name = fetch_metadata_kpis()
 
-    if not data_df.empty:
+    if summary and summary['total'] > 0:
 
         # Key Metrics (KPIs) 
-        total = len(data_df)
-        total_rows = data_df['rows'].sum() if 'rows' in data_df.columns else 0
-
-        # Calculate datasets uploaded today
-        today = datetime.now().date()
-        if 'upload_date' in data_df.columns:
-            # Filter for dates that match today's date
-            uploaded_today = data_df[data_df['upload_date'].dt.date == today].shape[0]
-        else:
-            uploaded_today = 0
+        total = summary['total']
+        total_rows = summary['total_rows']
+
+        # Datasets uploaded today (upload_date is stored as 'YYYY-MM-DD')
+        uploaded_today = summary['uploaded_today']
 
 
         col_total, col_rows, col_today = st.columns(3)
@@ -168,20 +154,19 @@ with tab_dashboard:
 
         # Chart 1: Uploaded By Distribution
         with col_chart_1:
-            if 'uploaded_by' in data_df.columns:
+            if not uploader_counts.empty:
                 st.subheader("Uploader Distribution")
-                uploader_counts = data_df['uploaded_by'].value_counts().reset_index()
                 uploader_counts.columns = ['Uploader', 'Count']
                 fig_uploader = px.bar(uploader_counts, x='Uploader', y='Count', title='Count by Uploader')
                 st.plotly_chart(fig_uploader, use_container_width=True)
 
         # Chart 2: Dataset Size by Name 
         with col_chart_2:
-            if 'columns' in data_df.columns and 'name' in data_df.columns:
+            if not columns_by_name.empty:
                 st.subheader("Column Count by Dataset Name")
                 # Create a bar chart showing the number of columns for each dataset name
                 fig_cols_by_name = px.bar(
-                    data_df.sort_values(by='columns', ascending=False), # Sort for better visual comparison
+                    columns_by_name, # Already sorted widest first by the query
                     x='name',
                     y='columns',
                     color='columns', # Color intensity based on column count
@@ -190,7 +175,7 @@ with tab_dashboard:
                 )
                 fig_cols_by_name.update_layout(xaxis_tickangle=-45) # Rotate x-axis labels for readability
                 st.plotly_chart(fig_cols_by_name, use_container_width=True)
-            elif data_df.empty:
+            else:
                 st.subheader("Column Count by Dataset Name")
                 st.info("Add data to view this chart.")
 
@@ -198,17 +183,13 @@ with tab_dashboard:
 
         # Raw Data Table 
         st.subheader("Raw Data")
-        
-        # Select and rename columns for display
-        display_cols = ['dataset_id', 'name', 'rows', 'columns', 'uploaded_by', 'Display_Date']
-        
-        # Create a dictionary to rename the 'Display_Date' column to 'upload_date' for the UI
-        rename_map = {'Display_Date': 'upload_date'}
-        
-        # Select the columns, sort, and rename 'Display_Date' back to 'upload_date' for user view
-        data_to_display = data_df[display_cols].sort_values(by='dataset_id', ascending=True).rename(columns=rename_map)
-        
-        st.dataframe(data_to_display, use_container_width=True)
+        # One keyset-paginated page at a time, sorted in SQL
+        display_cols = ['dataset_id', 'name', 'rows', 'columns', 'uploaded_by', 'upload_date']
+        paginated_table(
+            get_db_connection, TABLE_NAME, key="metadata_raw",
+            columns=display_cols,
+            transform=format_metadata_page,
+        )
 
     else:
         st.warning(f"No data available in the '{TABLE_NAME}' table. Use the 'New Dataset' tab to add records.")
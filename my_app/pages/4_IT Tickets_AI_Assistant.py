@@ -1,43 +1,51 @@
 import streamlit as st
 import sqlite3
+import sys
 import pandas as pd
 import plotly.express as px
 from google import genai
 from datetime import datetime
+from pathlib import Path
+
+# Make the project root importable so the pages share the app package
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.analytics import daily_ticket_counts, priority_status_percentages, table_columns, ticket_summary
+from app.db import read_connection
+from app.schema import ensure_schema
 
 # Configuration 
 DB_FILE = "intelligence_platform.db"
 TABLE_NAME = "it_tickets" 
+
+# Create/upgrade the database schema once per server process
+ensure_schema(DB_FILE)
 REQUIRED_COLS = ['ticket_id', 'priority', 'status', 'created_at']
 
 # Database Functions
 def get_db_connection():
-    """Establishes and returns the SQLite database connection."""
+    """Checks out the pooled read-only connection this page's dashboards read through."""
+    return read_connection(DB_FILE)
+
+def fetch_ticket_analysis(table):
+    """
+    Fetches the aggregates this page charts, computed in SQL.
+
+    Returns the table's columns, the summary counts, the daily volume and the
+    priority x status percentages instead of every ticket row.
+    """
     try:
-        conn = sqlite3.connect(DB_FILE)
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
-
-def fetch_ticket_data(table):
-    """Fetches all IT ticket data and returns it as a Pandas DataFrame."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            query = f"SELECT * FROM {table}" 
-            df = pd.read_sql_query(query, conn)
-            
-            if 'created_at' in df.columns:
-                df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-                
-            return df
-        except pd.io.sql.DatabaseError as e:
-            st.warning(f"Warning: Error fetching data from table '{table}': {e}. Please ensure the table exists.")
-            return pd.DataFrame()
-        finally:
-            conn.close()
-    return pd.DataFrame()
+        with get_db_connection() as conn:
+            columns = table_columns(conn, table)
+            missing_cols = [col for col in REQUIRED_COLS if col not in columns]
+            if missing_cols:
+                return missing_cols, None, pd.DataFrame(), pd.DataFrame()
+            summary = ticket_summary(conn)
+            trend_df = daily_ticket_counts(conn)
+            percentages = priority_status_percentages(conn)
+        return [], summary, trend_df, percentages
+    except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
+        st.warning(f"Warning: Error fetching data from table '{table}': {e}. Please ensure the table exists.")
+        return [], None, pd.DataFrame(), pd.DataFrame()
 
 
 # Gemini API Client Initialization 
@@ -68,31 +76,26 @@ if not st.session_state.logged_in:
     st.stop()
 
 
-# Preparing data
-data_df = fetch_ticket_data(TABLE_NAME)
-
-if data_df.empty:
-    st.warning(f"No data found in the '{TABLE_NAME}' table. Please add some IT tickets to the database.")
-    # Stop execution if no data is present, as analysis is impossible.
-    # Note: Chat Assistant can still run without data, but we stop for the combined app.
-    st.stop()
+# Preparing data (aggregated in SQL, so only a few rows leave the database)
+missing_cols, summary, trend_df, correlation_pivot = fetch_ticket_analysis(TABLE_NAME)
 
 # Global Column Check 
-missing_cols = [col for col in REQUIRED_COLS if col not in data_df.columns]
 if missing_cols:
     st.error(f"❌ Data Error: The following required columns are missing from the '{TABLE_NAME}' table: **{', '.join(missing_cols)}**. Please ensure your database table structure matches the expected schema.")
     st.stop()
 
+if not summary or summary['total'] == 0:
+    st.warning(f"No data found in the '{TABLE_NAME}' table. Please add some IT tickets to the database.")
+    # Stop execution if no data is present, as analysis is impossible.
+    # Note: Chat Assistant can still run without data, but we stop for the combined app.
+    st.stop()
+
 # Tab 1: Data Analysis & Correlation 
 with tab_analysis:
     st.header("1. Ticket Volume Trend")
 
-    # Preprocess for trend chart (Daily volume)
-    data_df['created_date'] = data_df['created_at'].dt.date
-    trend_df = data_df.groupby('created_date').size().reset_index(name='Ticket_Count')
-
-    total_tickets = len(data_df)
-    open_tickets = data_df[data_df['status'] == 'Open'].shape[0]
+    total_tickets = summary['total']
+    open_tickets = summary['open']
 
     col_total, col_open = st.columns(2)
     col_total.metric("Total Records", total_tickets)
@@ -116,12 +119,8 @@ with tab_analysis:
     st.header("2. Priority vs. Status Correlation")
     st.markdown("This chart visualizes the distribution of tickets across **statuses** for each **priority** level.")
 
-    # Create the cross-tabulation table
-    correlation_table = pd.crosstab(
-        data_df['priority'], 
-        data_df['status'], 
-        normalize='index' 
-    ).mul(100).round(1).reset_index()
+    # Cross-tabulation table (status % per priority), one row per priority
+    correlation_table = correlation_pivot.reset_index()
 
     # Melt the DataFrame for Plotly 
     correlation_long_df = correlation_table.melt(
@@ -1,38 +1,43 @@
 import streamlit as st
 import sqlite3
+import sys
 import pandas as pd
 from google import genai
+from pathlib import Path
+
+# Make the project root importable so the pages share the app package
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.changes import live_table_frame
+from app.db import read_connection
+from app.schema import ensure_schema
+from my_app.components import paginated_table
 
 # Configuration 
 DB_FILE = "intelligence_platform.db"
 TABLE_NAME = "cyber_incidents" 
 
+# Create/upgrade the database schema once per server process
+ensure_schema(DB_FILE)
+
 # Database Functions
 def get_db_connection():
-    """Establishes and returns the SQLite database connection."""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
+    """Checks out the pooled read-only connection this page's dashboards read through."""
+    return read_connection(DB_FILE)
 
 def fetch_incident_data():
     """Fetches all incident data and returns it as a Pandas DataFrame."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            # Fetch essential columns for analysis and display
-            query = f"SELECT incident_id, severity, category, description, status FROM {TABLE_NAME}" 
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            # Rename 'category' to 'incident_type' for consistent display/prompting
-            df.rename(columns={'category': 'incident_type'}, inplace=True)
-            return df
-        except pd.io.sql.DatabaseError as e:
-            st.error(f"Error fetching data: {e}. Check if table '{TABLE_NAME}' exists and columns are correct.")
-            return pd.DataFrame()
-    return pd.DataFrame()
+    try:
+        with get_db_connection() as conn:
+            # Fetch essential columns for analysis and display; after the first read
+            # only rows named in the change feed are re-read
+            columns = ['incident_id', 'severity', 'category', 'description', 'status']
+            df = live_table_frame(conn, TABLE_NAME, columns=columns)
+        # Rename 'category' to 'incident_type' for consistent display/prompting
+        df.rename(columns={'category': 'incident_type'}, inplace=True)
+        return df
+    except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
+        st.error(f"Error fetching data: {e}. Check if table '{TABLE_NAME}' exists and columns are correct.")
+        return pd.DataFrame()
 
 
 # Gemini API Client Initialization 
@@ -167,7 +172,11 @@ with tab_analyzer:
 
     st.divider()
     st.subheader("Raw Incident Data Table")
-    st.dataframe(data_df, use_container_width=True)
+    # One keyset-paginated page at a time, sorted in SQL
+    paginated_table(
+        get_db_connection, TABLE_NAME, key="incidents_ai_raw",
+        columns=['incident_id', 'severity', 'category', 'description', 'status'],
+    )
 
 # 2. AI Chat Assistant Tab
 with tab_assistant:
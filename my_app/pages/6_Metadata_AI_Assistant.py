@@ -1,42 +1,39 @@
 import streamlit as st
 import sqlite3
+import sys
 import pandas as pd
 from google import genai
 from datetime import datetime
+from pathlib import Path
+
+# Make the project root importable so the pages share the app package
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.changes import live_table_frame
+from app.db import read_connection
+from app.schema import ensure_schema
 
 # Configuration
 DB_FILE = "intelligence_platform.db"
 TABLE_NAME = "metadata" # Target table for metadata analysis
 
+# Create/upgrade the database schema once per server process
+ensure_schema(DB_FILE)
+
 # Database Functions
 def get_db_connection():
-    """Establishes and returns the SQLite database connection."""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
+    """Checks out the pooled read-only connection this page's dashboards read through."""
+    return read_connection(DB_FILE)
 
 def fetch_metadata_data(table):
     """Fetches all data from the specified table and returns it as a Pandas DataFrame."""
-    conn = get_db_connection()
-    if conn:
-        try:
-            query = f"SELECT * FROM {table}" 
-            df = pd.read_sql_query(query, conn)
-            
-            if 'upload_date' in df.columns:
-                # Convert date column to datetime objects
-                df['upload_date'] = pd.to_datetime(df['upload_date'], errors='coerce') 
-            
-            return df
-        except pd.io.sql.DatabaseError as e:
-            st.error(f"Error fetching data from table '{table}': {e}. Please ensure the table exists.")
-            return pd.DataFrame()
-        finally:
-            conn.close()
-    return pd.DataFrame()
+    try:
+        # After the first read only rows named in the change feed are re-read
+        with get_db_connection() as conn:
+            df = live_table_frame(conn, table)
+        return df
+    except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
+        st.error(f"Error fetching data from table '{table}': {e}. Please ensure the table exists.")
+        return pd.DataFrame()
 
 
 # Gemini API Client Initialization 
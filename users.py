@@ -1,24 +1,14 @@
-from app.data.db import connect_database
-
-def get_user_by_username(username):
-    """Retrieve user by username."""
-    conn = connect_database()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM users WHERE username = ?",
-        (username,)
-    )
-    user = cursor.fetchone()
-    conn.close()
-    return user
-
-def insert_user(username, password_hash, role='user'):
-    """Insert new user."""
-    conn = connect_database()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-        (username, password_hash, role)
-    )
-    conn.commit()
-    conn.close()
\ No newline at end of file
+# Older entry points without a connection argument; they run on the shared
+# repository in app.repository (the same code the app package and pages use).
+
+from app import users as _users
+
+
+def get_user_by_username(username):
+    """Retrieve user by username."""
+    return _users.get_user_by_username(None, username)
+
+
+def insert_user(username, password_hash, role='user'):
+    """Insert new user."""
+    _users.insert_user(None, username, password_hash, role)